@@ -0,0 +1,63 @@
+"""
+Measures `get_context` cost for long histories with the incrementally maintained context string,
+against rebuilding the "role: content" join from the message dicts on every call.
+
+Usage:
+    python benchmarks/context_assembly.py [--sizes 10000 50000] [--repeat 200]
+"""
+import argparse
+import time
+
+from agent_memory.strategies.os_like_memory import OSLikeMemory
+from agent_memory.strategies.sequential import SequentialMemory
+from agent_memory.strategies.sliding_window import SlidingWindowMemory
+
+
+def rebuild_join(memory) -> str:
+    """The previous implementation: format and join every message on each call."""
+    if isinstance(memory, OSLikeMemory):
+        messages = []
+        for page in memory.pages:
+            messages.extend(page.messages)
+        messages.extend(memory.current_page)
+    else:
+        messages = memory.history
+    return "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'strategy':<22} {'messages':>9} {'rebuild us':>12} {'cached us':>11} {'turn us':>9}")
+    for size in args.sizes:
+        strategies = {
+            "SequentialMemory": SequentialMemory(),
+            "SlidingWindowMemory": SlidingWindowMemory(window_size=size),
+            "OSLikeMemory": OSLikeMemory(page_size=100, max_pages=size // 100),
+        }
+        for name, memory in strategies.items():
+            for i in range(size):
+                memory.add_message("user" if i % 2 else "assistant", f"Message {i} with some typical chat content.")
+            assert memory.get_context() == rebuild_join(memory)
+
+            rebuild = timed(lambda: rebuild_join(memory), args.repeat)
+            cached = timed(memory.get_context, args.repeat)
+
+            # A turn appends a message (evicting the oldest one for the bounded strategies) and reads the context.
+            counter = iter(range(size, size + args.repeat))
+            turn = timed(lambda: (memory.add_message("user", f"Message {next(counter)}"), memory.get_context()), args.repeat)
+            print(f"{name:<22} {size:>9} {rebuild:>12.1f} {cached:>11.3f} {turn:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Replays a corpus of conversations through the memory strategies and compares their latency and LLM cost.
+
+Every session replays one conversation into a fresh memory, the way an Agent drives it: each message is
+added with `add_message`, and after every user message the context is built with `get_context`, passing the
+message as the query to strategies that take one. The strategies' own LLM calls (summaries) go to a
+deterministic FakeLLM with a configurable latency, and retrieval embeddings are the local HashingEmbeddings,
+so the benchmark runs offline. Sessions run in parallel in a process pool, each in a fresh process so that
+its peak RSS is its own.
+
+For every strategy the report has the p50/p99 latency of `add_message` and `get_context`, the LLM calls
+and prompt tokens per turn, the context size in tokens and the peak RSS of a session. `--output` writes it
+as JSON for regression tracking.
+
+The corpus is a JSONL file with one conversation per line:
+    {"id": "...", "messages": [{"role": "user", "content": "..."}, {"role": "assistant", "content": "..."}]}
+Without `--corpus`, a synthetic corpus of `--sessions` conversations of `--turns` turns is generated.
+
+Usage:
+    python benchmarks/conversations.py [--corpus conversations.jsonl] [--sessions 16] [--turns 20]
+        [--strategies sequential,summarization] [--llm-latency 0.01] [--max-tokens 500] [--workers 4]
+        [--output results.json]
+"""
+import argparse
+import inspect
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agent_memory.embeddings import HashingEmbeddings
+from agent_memory.llms.fake_llm import FakeLLM
+from agent_memory.tokenizers import get_default_token_counter
+
+# name: (module, class, constructor arguments). Strategies whose constructor takes no `llm` get none.
+STRATEGIES: Dict[str, Tuple[str, str, Dict[str, Any]]] = {
+    "sequential": ("sequential", "SequentialMemory", {}),
+    "sliding_window": ("sliding_window", "SlidingWindowMemory", {"window_size": 6}),
+    "summarization": ("summarization", "SummarizationMemory", {"incremental": True}),
+    "retrieval": ("retrieval", "RetrievalMemory", {"chunk_size": 400, "incremental": True, "embeddings": HashingEmbeddings()}),
+    "memory_augmented_transformer": ("memory_augmented_transformer", "MemoryAugmentedTransformerMemory", {"incremental": True}),
+    "hierarchical": ("hierarchical", "HierarchicalMemory", {"short_term_threshold": 4}),
+    "graph_based": ("graph_based", "GraphBasedMemory", {}),
+    "compression_consolidation": ("compression_consolidation", "CompressionConsolidationMemory", {"compression_threshold": 4}),
+    "os_like_memory": ("os_like_memory", "OSLikeMemory", {"page_size": 2, "max_pages": 3}),
+}
+# The transformer strategy downloads BERT, so it only runs when asked for.
+DEFAULT_STRATEGIES = [name for name in STRATEGIES if name != "memory_augmented_transformer"]
+
+TOPICS = ["Paris", "budget", "Kubernetes", "recipe", "marathon", "Python", "invoice", "garden", "Tokyo", "guitar"]
+WORDS = ["plan", "update", "deadline", "question", "details", "price", "schedule", "idea", "issue", "option", "team", "review"]
+
+
+def synthetic_corpus(sessions: int, turns: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Generates conversations that come back to a few topics, so that retrieval and graph strategies have something to find."""
+    rng = random.Random(seed)
+    corpus = []
+    for session in range(sessions):
+        topics = rng.sample(TOPICS, 3)
+        messages = []
+        for turn in range(turns):
+            topic = rng.choice(topics)
+            words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 30)))
+            messages.append({"role": "user", "content": f"Turn {turn}: about {topic}, {words}?"})
+            messages.append({"role": "assistant", "content": f"On {topic}: {words}."})
+        corpus.append({"id": f"session-{session}", "messages": messages})
+    return corpus
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as corpus_file:
+        return [json.loads(line) for line in corpus_file if line.strip()]
+
+
+def create_memory(name: str, llm: FakeLLM) -> Any:
+    import importlib
+
+    module_name, class_name, kwargs = STRATEGIES[name]
+    module = importlib.import_module(f"agent_memory.strategies.{module_name}")
+    strategy = getattr(module, class_name)
+    if "llm" in inspect.signature(strategy.__init__).parameters:
+        kwargs = {"llm": llm, **kwargs}
+    return strategy(**kwargs)
+
+
+def timed(function: Callable, *args: Any, **kwargs: Any) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_session(task: Tuple[str, Dict[str, Any], float, Optional[int]]) -> Dict[str, Any]:
+    """Replays one conversation into a fresh memory. Runs in a pool worker."""
+    name, conversation, latency, max_tokens = task
+    token_counter = get_default_token_counter()
+    llm = FakeLLM(latency=latency)
+    memory = create_memory(name, llm)
+    takes_query = "query" in inspect.signature(memory.get_context).parameters
+    add_times, context_times, context_tokens = [], [], []
+    turns = 0
+    for message in conversation["messages"]:
+        _, elapsed = timed(memory.add_message, message["role"], message["content"])
+        add_times.append(elapsed)
+        if message["role"] != "user":
+            continue
+        turns += 1
+        kwargs = {"max_tokens": max_tokens}
+        if takes_query:
+            kwargs["query"] = message["content"]
+        context, elapsed = timed(memory.get_context, **kwargs)
+        context_times.append(elapsed)
+        context_tokens.append(token_counter.count(context))
+    flush = getattr(memory, "flush", None)
+    if flush is not None:
+        flush()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "strategy": name,
+        "turns": turns,
+        "add_message": add_times,
+        "get_context": context_times,
+        "context_tokens": context_tokens,
+        "llm": llm.stats(),
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+        "peak_rss_mib": peak_rss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    }
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """The nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def summarize(sessions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    add_times = [t for session in sessions for t in session["add_message"]]
+    context_times = [t for session in sessions for t in session["get_context"]]
+    context_tokens = [n for session in sessions for n in session["context_tokens"]]
+    turns = sum(session["turns"] for session in sessions) or 1
+    return {
+        "sessions": len(sessions),
+        "turns": turns,
+        "add_message_ms": {"p50": percentile(add_times, 0.5) * 1000, "p99": percentile(add_times, 0.99) * 1000},
+        "get_context_ms": {"p50": percentile(context_times, 0.5) * 1000, "p99": percentile(context_times, 0.99) * 1000},
+        "llm_calls_per_turn": sum(session["llm"]["calls"] for session in sessions) / turns,
+        "llm_prompt_tokens_per_turn": sum(session["llm"]["prompt_tokens"] for session in sessions) / turns,
+        "context_tokens": {
+            "mean": sum(context_tokens) / len(context_tokens) if context_tokens else 0.0,
+            "p99": percentile(context_tokens, 0.99),
+            "max": max(context_tokens, default=0),
+        },
+        "peak_rss_mib": max(session["peak_rss_mib"] for session in sessions),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="A JSONL corpus of conversations. Defaults to a synthetic corpus.")
+    parser.add_argument("--sessions", type=int, default=16, help="The number of synthetic conversations.")
+    parser.add_argument("--turns", type=int, default=20, help="The number of turns of every synthetic conversation.")
+    parser.add_argument("--strategies", default=",".join(DEFAULT_STRATEGIES), help=f"Comma-separated, among: {', '.join(STRATEGIES)}.")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="The latency of every fake LLM call, in seconds.")
+    parser.add_argument("--max-tokens", type=int, default=None, help="The token budget passed to get_context.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="The number of worker processes.")
+    parser.add_argument("--output", help="Writes the results as JSON to this path.")
+    args = parser.parse_args()
+
+    strategies = [name.strip() for name in args.strategies.split(",") if name.strip()]
+    unknown = [name for name in strategies if name not in STRATEGIES]
+    if unknown:
+        parser.error(f"unknown strategies: {', '.join(unknown)}")
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.sessions, args.turns)
+
+    tasks = [(name, conversation, args.llm_latency, args.max_tokens) for name in strategies for conversation in corpus]
+    start = time.perf_counter()
+    # A fresh process per session, so that every peak RSS measures a single session.
+    with multiprocessing.Pool(processes=args.workers, maxtasksperchild=1) as pool:
+        sessions = pool.map(run_session, tasks, chunksize=1)
+    elapsed = time.perf_counter() - start
+
+    results = {name: summarize([session for session in sessions if session["strategy"] == name]) for name in strategies}
+    print(f"{len(corpus)} conversations, {len(strategies)} strategies, {elapsed:.1f}s")
+    print("Latencies in milliseconds.")
+    print(f"{'strategy':<28} {'add p50':>9} {'add p99':>9} {'ctx p50':>9} {'ctx p99':>9} {'calls/turn':>11} {'prompt tok/turn':>16} {'ctx tokens':>11} {'RSS MiB':>8}")
+    for name, result in results.items():
+        print(
+            f"{name:<28} {result['add_message_ms']['p50']:>9.3f} {result['add_message_ms']['p99']:>9.3f}"
+            f" {result['get_context_ms']['p50']:>9.3f} {result['get_context_ms']['p99']:>9.3f}"
+            f" {result['llm_calls_per_turn']:>11.2f} {result['llm_prompt_tokens_per_turn']:>16.1f}"
+            f" {result['context_tokens']['mean']:>11.1f} {result['peak_rss_mib']:>8.1f}"
+        )
+    if args.output:
+        report = {
+            "config": {
+                "corpus": args.corpus,
+                "conversations": len(corpus),
+                "llm_latency": args.llm_latency,
+                "max_tokens": args.max_tokens,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "strategies": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Compares the graph backends of GraphBasedMemory: resident memory after storing a large synthetic
+conversation, build time, and traversal speed (k-hop expansions and query retrieval).
+
+Each backend is measured in a fresh interpreter, so that the resident set sizes are comparable.
+
+Usage:
+    python benchmarks/graph_backends.py [--messages 50000] [--traversals 500]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+BACKENDS = ["networkx", "compact"]
+
+
+def rss_bytes() -> int:
+    """Returns the current resident set size of the process."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        # ru_maxrss is the peak, in kilobytes on Linux and bytes on macOS.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def measure(backend_name: str, messages: int, traversals: int) -> dict:
+    from agent_memory.strategies.graph_backends import CompactGraphBackend, NetworkXGraphBackend
+    from agent_memory.strategies.graph_based import GraphBasedMemory
+    from agent_memory.tokenizers import ApproximateTokenCounter
+
+    rng = random.Random(0)
+    topics = [f"topic{i}" for i in range(2000)]
+    entities = [f"Entity{i}" for i in range(500)]
+    contents = [f"Talking about {' '.join(rng.sample(topics, 3))} with {rng.choice(entities)}." for _ in range(messages)]
+
+    backend = NetworkXGraphBackend() if backend_name == "networkx" else CompactGraphBackend()
+    before = rss_bytes()
+    start = time.perf_counter()
+    memory = GraphBasedMemory(backend=backend, token_counter=ApproximateTokenCounter())
+    for i, content in enumerate(contents):
+        memory.add_message(role="user" if i % 2 == 0 else "assistant", content=content)
+    build = time.perf_counter() - start
+    rss = rss_bytes() - before
+
+    # Warm up once, so that the compact backend's adjacency compilation is not counted as traversal.
+    list(backend.neighbors(0))
+    seeds = [rng.randrange(backend.number_of_nodes()) for _ in range(traversals)]
+    start = time.perf_counter()
+    reached = 0
+    for seed in seeds:
+        frontier, visited = [seed], {seed}
+        for _ in range(2):
+            next_frontier = []
+            for node in frontier:
+                for neighbor in backend.neighbors(node):
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        reached += len(visited)
+    traversal = (time.perf_counter() - start) / traversals
+
+    queries = [f"what about {rng.choice(topics)} and {rng.choice(entities)}?" for _ in range(traversals)]
+    start = time.perf_counter()
+    for query in queries:
+        memory.get_context(query=query, max_nodes=20)
+    query = (time.perf_counter() - start) / traversals
+
+    return {
+        "nodes": backend.number_of_nodes(), "edges": backend.number_of_edges(), "rss_bytes": rss,
+        "build_seconds": build, "two_hop_seconds": traversal, "reached": reached / traversals, "query_seconds": query,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--traversals", type=int, default=500)
+    parser.add_argument("--backend", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(measure(args.backend, args.messages, args.traversals)))
+        return
+
+    print(f"{'backend':<10} {'nodes':>8} {'edges':>8} {'RSS (MiB)':>10} {'B/msg':>7} {'build (s)':>10} {'2-hop (us)':>11} {'query (us)':>11}")
+    for backend in BACKENDS:
+        output = subprocess.run(
+            [sys.executable, __file__, "--backend", backend, "--messages", str(args.messages), "--traversals", str(args.traversals)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output)
+        print(f"{backend:<10} {result['nodes']:>8} {result['edges']:>8} {result['rss_bytes'] / 2**20:>10.1f} "
+              f"{result['rss_bytes'] / args.messages:>7.0f} {result['build_seconds']:>10.2f} "
+              f"{result['two_hop_seconds'] * 1e6:>11.1f} {result['query_seconds'] * 1e6:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Measures GraphBasedMemory.get_context latency on a large synthetic conversation, with and without a query.
+
+Each message mentions a few topic keywords and one of a fixed set of entities, so queries match a small
+fraction of the messages and entity nodes connect distant parts of the conversation.
+
+Usage:
+    python benchmarks/graph_retrieval.py [--messages 50000] [--queries 200] [--max-nodes 20]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from agent_memory.strategies.graph_based import GraphBasedMemory
+from agent_memory.tokenizers import ApproximateTokenCounter
+
+TOPICS = [f"topic{i}" for i in range(2000)]
+ENTITIES = [f"Entity{i}" for i in range(500)]
+
+
+def build(messages: int, seed: int = 0) -> GraphBasedMemory:
+    rng = random.Random(seed)
+    memory = GraphBasedMemory(token_counter=ApproximateTokenCounter())
+    for i in range(messages):
+        words = " ".join(rng.sample(TOPICS, 3))
+        memory.add_message(role="user" if i % 2 == 0 else "assistant", content=f"Talking about {words} with {rng.choice(ENTITIES)}.")
+    return memory
+
+
+def timed(fn, repeat: int) -> list:
+    latencies = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name: str, latencies: list) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<45} p50 {statistics.median(latencies) * 1000:8.2f} ms   p99 {p99 * 1000:8.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-nodes", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    memory = build(args.messages)
+    elapsed = time.perf_counter() - start
+    print(f"built {args.messages} messages ({memory.graph.number_of_nodes()} nodes) in {elapsed:.2f} s, "
+          f"{elapsed / args.messages * 1e6:.1f} us/message")
+
+    rng = random.Random(1)
+    queries = [f"what did we say about {rng.choice(TOPICS)} and {rng.choice(TOPICS)}?" for _ in range(args.queries)]
+    report("query, max_nodes", timed(lambda i: memory.get_context(query=queries[i], max_nodes=args.max_nodes), args.queries))
+    report("query, max_tokens=500", timed(lambda i: memory.get_context(query=queries[i], max_tokens=500), args.queries))
+    report("query, hops=1", timed(lambda i: memory.get_context(query=queries[i], max_nodes=args.max_nodes, hops=1), args.queries))
+    report("no query, max_tokens=500", timed(lambda i: memory.get_context(max_tokens=500), 20))
+    report("no query, full context", timed(lambda i: memory.get_context(), 5))
+
+
+if __name__ == "__main__":
+    main()
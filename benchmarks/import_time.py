@@ -0,0 +1,60 @@
+"""
+Reports the time it takes to import each memory strategy in a fresh interpreter, and which heavy
+dependencies the import pulls in. Importing a strategy should not load torch, transformers, FAISS or
+LangChain until a strategy that needs them is actually used.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 3]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+MODULES = [
+    "agent_memory.agent",
+    "agent_memory.strategies.sequential",
+    "agent_memory.strategies.sliding_window",
+    "agent_memory.strategies.summarization",
+    "agent_memory.strategies.hierarchical",
+    "agent_memory.strategies.compression_consolidation",
+    "agent_memory.strategies.os_like_memory",
+    "agent_memory.strategies.graph_based",
+    "agent_memory.strategies.retrieval",
+    "agent_memory.strategies.memory_augmented_transformer",
+]
+
+HEAVY = ["torch", "transformers", "faiss", "langchain", "langchain_community", "langchain_openai", "langchain_core", "networkx", "numpy"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module: str) -> dict:
+    """Imports `module` in a fresh interpreter and returns the import time and the heavy modules it loaded."""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'module':<55} {'best (ms)':>10}  heavy modules loaded")
+    for module in MODULES:
+        runs = [measure(module) for _ in range(args.repeat)]
+        best = min(run["seconds"] for run in runs)
+        print(f"{module:<55} {best * 1000:>10.1f}  {', '.join(runs[0]['loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
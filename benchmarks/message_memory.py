@@ -0,0 +1,56 @@
+"""
+Reports the memory cost per stored message of the previous per-message dict representation
+and of the slotted `Message` record, both for the bare records and for a SequentialMemory holding them.
+
+Usage:
+    python benchmarks/message_memory.py [--messages 100000]
+"""
+import argparse
+import tracemalloc
+
+from agent_memory.strategies.message import Message
+from agent_memory.strategies.sequential import SequentialMemory
+
+
+def measure(build) -> float:
+    """Returns the bytes allocated by `build` and still alive afterwards."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+    n = args.messages
+
+    # The contents are created up front and shared, so that only the per-message overhead is measured.
+    contents = [f"Message {i} with some typical chat content." for i in range(n)]
+    roles = [("user" if i % 2 else "assistant") for i in range(n)]
+
+    def dicts():
+        return [{"role": role, "content": content} for role, content in zip(roles, contents)]
+
+    def messages():
+        return [Message(role, content) for role, content in zip(roles, contents)]
+
+    def sequential_memory():
+        memory = SequentialMemory()
+        for role, content in zip(roles, contents):
+            memory.add_message(role, content)
+        return memory
+
+    print(f"{'representation':<32} {'bytes/message':>14}")
+    print(f"{'dict (before)':<32} {measure(dicts) / n:>14.1f}")
+    print(f"{'Message (after)':<32} {measure(messages) / n:>14.1f}")
+    print(f"{'SequentialMemory, all included':<32} {measure(sequential_memory) / n:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares the per-message indexing cost of RetrievalMemory in rebuild mode and incremental mode.
+
+Embeddings are replaced by a deterministic local fake so that the benchmark measures the
+indexing work itself (number of embedded texts and wall time) without any network calls.
+
+Usage:
+    python benchmarks/retrieval_incremental.py [--messages 400] [--report-every 50]
+"""
+import argparse
+import hashlib
+import time
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+import agent_memory.strategies.retrieval as retrieval
+from agent_memory.strategies.retrieval import RetrievalMemory
+
+
+class CountingEmbeddings(Embeddings):
+    """Deterministic fake embeddings that count how many texts and characters were embedded."""
+
+    def __init__(self, size: int = 64):
+        self.size = size
+        self.embedded_texts = 0
+        self.embedded_chars = 0
+
+    def _embed(self, text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [digest[i % len(digest)] / 255.0 for i in range(self.size)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded_texts += len(texts)
+        self.embedded_chars += sum(len(text) for text in texts)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def run(incremental: bool, messages: int, report_every: int) -> None:
+    embeddings = CountingEmbeddings()
+    retrieval.OpenAIEmbeddings = lambda **kwargs: embeddings
+    memory = RetrievalMemory(chunk_size=200, incremental=incremental)
+
+    mode = "incremental" if incremental else "rebuild"
+    print(f"\n{mode}:")
+    print(f"{'messages':>10} {'embeds/msg':>12} {'chars/msg':>12} {'ms/msg':>10}")
+    texts, chars, start = 0, 0, time.perf_counter()
+    for i in range(1, messages + 1):
+        memory.add_message("user" if i % 2 else "assistant", f"Message number {i} about topic {i % 7}.")
+        if i % report_every == 0:
+            elapsed = time.perf_counter() - start
+            print(
+                f"{i:>10} {(embeddings.embedded_texts - texts) / report_every:>12.1f}"
+                f" {(embeddings.embedded_chars - chars) / report_every:>12.1f}"
+                f" {elapsed * 1000 / report_every:>10.3f}"
+            )
+            texts, chars, start = embeddings.embedded_texts, embeddings.embedded_chars, time.perf_counter()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--report-every", type=int, default=50)
+    args = parser.parse_args()
+    run(incremental=False, messages=args.messages, report_every=args.report_every)
+    run(incremental=True, messages=args.messages, report_every=args.report_every)
+
+
+if __name__ == "__main__":
+    main()
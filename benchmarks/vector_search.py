@@ -0,0 +1,81 @@
+"""
+Measures the local vector search layer used by RetrievalMemory: HashingEmbeddings throughput, and the
+search latency and recall of ExactIndex versus IVFIndex, for single and batched queries.
+
+Texts are synthetic messages from a few hundred threads, each with its own vocabulary of topics, so that
+the vectors form clusters as the messages of real conversations do and queries match a small fraction of
+them. Recall is the fraction of the results of the approximate index that score at least as high as the
+k-th exact result, which counts ties with it as hits.
+
+Usage:
+    python benchmarks/vector_search.py [--vectors 20000] [--dimensions 1024] [--queries 200] [--k 5] [--n-probe 8]
+"""
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from agent_memory.embeddings import HashingEmbeddings
+from agent_memory.search import ExactIndex, IVFIndex
+
+TOPICS = [f"topic{i}" for i in range(4000)]
+THREADS = [TOPICS[i:i + 20] for i in range(0, len(TOPICS), 20)]
+
+
+def texts(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        words = rng.sample(rng.choice(THREADS), 3) + [rng.choice(TOPICS)]
+        messages.append(f"We talked about {' '.join(words)} yesterday.")
+    return messages
+
+
+def report(name: str, latencies: list) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<45} p50 {statistics.median(latencies) * 1000:8.3f} ms   p99 {p99 * 1000:8.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--n-probe", type=int, default=8)
+    args = parser.parse_args()
+
+    embeddings = HashingEmbeddings(dimensions=args.dimensions)
+    documents = texts(args.vectors, seed=0)
+    start = time.perf_counter()
+    vectors = embeddings.embed_matrix(documents)
+    elapsed = time.perf_counter() - start
+    print(f"embedded {args.vectors} texts in {elapsed:.2f} s, {elapsed / args.vectors * 1e6:.1f} us/text")
+
+    queries = embeddings.embed_matrix(texts(args.queries, seed=1))
+    indexes = {"exact": ExactIndex(), f"ivf (n_probe={args.n_probe})": IVFIndex(n_probe=args.n_probe)}
+    for name, index in indexes.items():
+        start = time.perf_counter()
+        index.add(vectors)
+        print(f"{name:<45} built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    expected, _ = indexes["exact"].search(queries, args.k)
+    for name, index in indexes.items():
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, args.k)
+            latencies.append(time.perf_counter() - start)
+        report(f"{name} single query", latencies)
+        start = time.perf_counter()
+        found, _ = index.search(queries, args.k)
+        batched = (time.perf_counter() - start) / args.queries
+        recall = np.mean(found >= expected[:, -1:] - 1e-6)
+        print(f"{name + ' batched':<45} {batched * 1000:8.3f} ms/query   recall@{args.k} {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,7 @@
 import os
 from dotenv import load_dotenv
+import importlib
 from agent_memory.agent import Agent
-from agent_memory.strategies.sequential import SequentialMemory
-from agent_memory.strategies.sliding_window import SlidingWindowMemory
-from agent_memory.strategies.summarization import SummarizationMemory
-from agent_memory.strategies.retrieval import RetrievalMemory
-from agent_memory.strategies.memory_augmented_transformer import MemoryAugmentedTransformerMemory
-from agent_memory.strategies.hierarchical import HierarchicalMemory
-from agent_memory.strategies.graph_based import GraphBasedMemory
-from agent_memory.strategies.compression_consolidation import CompressionConsolidationMemory
-from agent_memory.strategies.os_like_memory import OSLikeMemory
 
 from agent_memory.config import LLM_PROVIDER
 from agent_memory.llms import get_llm
@@ -17,6 +9,12 @@ from agent_memory.llms import get_llm
 # Load environment variables
 load_dotenv()
 
+def load_strategy(module_name, class_name):
+    # Strategies are imported only when they are run, so that heavy dependencies
+    # such as torch or FAISS are not loaded for strategies that do not need them.
+    module = importlib.import_module(f"agent_memory.strategies.{module_name}")
+    return getattr(module, class_name)
+
 def run_agent_conversation(memory_strategy_class, strategy_name, **kwargs):
     print(f"\n--- Running Agent with {strategy_name} using {LLM_PROVIDER.upper()} LLM ---")
     
@@ -54,12 +52,16 @@ def run_agent_conversation(memory_strategy_class, strategy_name, **kwargs):
 
 if __name__ == "__main__":
     # Run examples for each memory strategy
-    run_agent_conversation(SequentialMemory, "SequentialMemory")
-    run_agent_conversation(SlidingWindowMemory, "SlidingWindowMemory", window_size=3)
-    run_agent_conversation(SummarizationMemory, "SummarizationMemory")
-    run_agent_conversation(RetrievalMemory, "RetrievalMemory") # RetrievalMemory still uses OpenAIEmbeddings directly
-    run_agent_conversation(MemoryAugmentedTransformerMemory, "MemoryAugmentedTransformerMemory")
-    run_agent_conversation(HierarchicalMemory, "HierarchicalMemory", short_term_threshold=2)
-    run_agent_conversation(GraphBasedMemory, "GraphBasedMemory")
-    run_agent_conversation(CompressionConsolidationMemory, "CompressionConsolidationMemory", compression_threshold=2)
-    run_agent_conversation(OSLikeMemory, "OSLikeMemory", page_size=2, max_pages=2)
\ No newline at end of file
+    strategies = [
+        ("sequential", "SequentialMemory", {}),
+        ("sliding_window", "SlidingWindowMemory", {"window_size": 3}),
+        ("summarization", "SummarizationMemory", {}),
+        ("retrieval", "RetrievalMemory", {}), # RetrievalMemory still uses OpenAIEmbeddings directly
+        ("memory_augmented_transformer", "MemoryAugmentedTransformerMemory", {}),
+        ("hierarchical", "HierarchicalMemory", {"short_term_threshold": 2}),
+        ("graph_based", "GraphBasedMemory", {}),
+        ("compression_consolidation", "CompressionConsolidationMemory", {"compression_threshold": 2}),
+        ("os_like_memory", "OSLikeMemory", {"page_size": 2, "max_pages": 2}),
+    ]
+    for module_name, class_name, kwargs in strategies:
+        run_agent_conversation(load_strategy(module_name, class_name), class_name, **kwargs)
@@ -1,4 +1,5 @@
-from typing import Type
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Type
+from .instrumentation import instrumentation
 from .llms.base import BaseLLM
 from .strategies.base import BaseMemory
 from .llms import get_llm
@@ -8,16 +9,32 @@ class Agent:
     A conversational agent that uses a memory strategy to maintain context.
     """
 
-    def __init__(self, memory_strategy: Type[BaseMemory], **kwargs):
+    def __init__(self, memory_strategy: Type[BaseMemory], max_context_tokens: Optional[int] = None, llm: Optional[BaseLLM] = None, memory_llm: Optional[BaseLLM] = None, **kwargs):
         """
         Initializes the Agent.
 
         Args:
             memory_strategy: The class of the memory strategy to use.
+            max_context_tokens: An optional token budget for the context sent to the LLM on each turn.
+            llm: An optional LLM client, e.g. one shared by many agents. Defaults to the shared client from `get_llm()`.
+            memory_llm: An optional LLM for the memory strategy's own calls, such as summaries, e.g. a `CachingLLM`
+                wrapping `llm`. Defaults to `llm`.
             **kwargs: Additional keyword arguments to pass to the memory strategy's constructor.
         """
-        self.llm = get_llm()
-        self.memory = memory_strategy(llm=self.llm, **kwargs)
+        self.llm = llm if llm is not None else get_llm()
+        self.max_context_tokens = max_context_tokens
+        self.memory = memory_strategy(llm=memory_llm if memory_llm is not None else self.llm, **kwargs)
+
+    def _context_kwargs(self, user_input: str) -> Dict[str, Any]:
+        """
+        Returns the arguments of the memory's `get_context` for a turn. Strategies supporting a query are
+        queried with the user's message, so that they retrieve what is relevant to it instead of returning
+        everything they hold, which bounds the size of the prompt on every turn.
+        """
+        kwargs: Dict[str, Any] = {"max_tokens": self.max_context_tokens}
+        if self.memory.supports_query:
+            kwargs["query"] = user_input
+        return kwargs
 
     def chat(self, user_input: str) -> str:
         """
@@ -29,16 +46,93 @@ class Agent:
         Returns:
             The agent's response.
         """
-        self.memory.add_message(role="user", content=user_input)
-        context = self.memory.get_context()
-        
-        # This is a simplified example. In a real-world scenario, you would format the context 
-        # into a proper prompt before sending it to the LLM.
-        response = self.llm.invoke(context)
+        with instrumentation.span("agent.chat"):
+            self.memory.add_message(role="user", content=user_input)
+            context = self.memory.get_context(**self._context_kwargs(user_input))
+
+            # This is a simplified example. In a real-world scenario, you would format the context
+            # into a proper prompt before sending it to the LLM.
+            response = self.llm.invoke(context)
+
+            self.memory.add_message(role="assistant", content=response.content)
+        return response.content
+
+    async def achat(self, user_input: str) -> str:
+        """
+        Has a conversation with the user without blocking the event loop,
+        so that many conversations can be served concurrently.
+
+        Args:
+            user_input: The user's message.
+
+        Returns:
+            The agent's response.
+        """
+        with instrumentation.span("agent.achat"):
+            await self.memory.aadd_message(role="user", content=user_input)
+            context = await self.memory.aget_context(**self._context_kwargs(user_input))
+            response = await self.llm.ainvoke(context)
 
-        self.memory.add_message(role="assistant", content=response.content)
+            await self.memory.aadd_message(role="assistant", content=response.content)
         return response.content
 
+    def stream_chat(self, user_input: str) -> Iterator[str]:
+        """
+        Has a conversation with the user, yielding the agent's response in chunks as the LLM generates it.
+
+        The assistant message is added to the memory once the response is complete. If the caller stops
+        consuming the chunks early, or the LLM fails midway, the partial response is discarded and the
+        memory only holds the user's message, as it would after a failed `chat`.
+
+        Args:
+            user_input: The user's message.
+
+        Yields:
+            The chunks of the agent's response.
+        """
+        # The span covers the whole stream, until the last chunk is consumed or the caller stops.
+        with instrumentation.span("agent.stream_chat"):
+            self.memory.add_message(role="user", content=user_input)
+            context = self.memory.get_context(**self._context_kwargs(user_input))
+            chunks = []
+            stream = self.llm.stream(context)
+            try:
+                for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+            finally:
+                # Release the provider's connection promptly when the caller stops early.
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+            self.memory.add_message(role="assistant", content="".join(chunks))
+
+    async def astream_chat(self, user_input: str) -> AsyncIterator[str]:
+        """
+        Asynchronously has a conversation with the user, yielding the agent's response in chunks.
+        The memory is updated as by `stream_chat`.
+
+        Args:
+            user_input: The user's message.
+
+        Yields:
+            The chunks of the agent's response.
+        """
+        with instrumentation.span("agent.astream_chat"):
+            await self.memory.aadd_message(role="user", content=user_input)
+            context = await self.memory.aget_context(**self._context_kwargs(user_input))
+            chunks = []
+            stream = self.llm.astream(context)
+            try:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+            finally:
+                aclose = getattr(stream, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+            await self.memory.aadd_message(role="assistant", content="".join(chunks))
+
     def clear_memory(self) -> None:
         """Clears the agent's memory."""
         self.memory.clear()
@@ -0,0 +1,3 @@
+from .cache import EmbeddingCache
+from .cached import CachedEmbeddings
+from .hashing import HashingEmbeddings
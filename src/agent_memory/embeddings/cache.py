@@ -0,0 +1,154 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    A content-addressed cache for embedding vectors.
+
+    Vectors are keyed by a hash of the embedding model id and the embedded text. Lookups go through a
+    bounded in-memory LRU tier first and then, if a path is given, through a memory-mapped on-disk tier
+    that survives process restarts. A single cache can be shared by several memory strategies.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None):
+        """
+        Initializes the EmbeddingCache.
+
+        Args:
+            max_entries: The maximum number of vectors kept in the in-memory LRU tier.
+            path: An optional directory for the persistent, memory-mapped tier.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._disk = _DiskTier(path) if path else None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_id: str, text: str) -> str:
+        """Returns the cache key for a text embedded by a given model."""
+        return hashlib.sha256(f"{model_id}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, model_id: str, text: str) -> Optional[np.ndarray]:
+        """Returns the cached vector for the text, or None if it has not been embedded yet."""
+        key = self.make_key(model_id, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+            elif self._disk is not None:
+                vector = self._disk.get(key)
+                if vector is not None:
+                    self._remember(key, vector)
+            if vector is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return vector
+
+    def put(self, model_id: str, text: str, vector) -> None:
+        """Stores the vector for the text in every tier of the cache."""
+        key = self.make_key(model_id, text)
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        with self._lock:
+            self._remember(key, vector)
+            if self._disk is not None:
+                self._disk.put(key, vector)
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """Inserts a vector into the LRU tier, evicting the least recently used entries."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit and miss counts and the number of entries in each tier."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk) if self._disk is not None else 0,
+            }
+
+    def clear(self) -> None:
+        """Clears the in-memory tier and resets the counters. The on-disk tier is kept."""
+        with self._lock:
+            self._memory.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+
+class _DiskTier:
+    """
+    An append-only on-disk store of float32 vectors.
+
+    Vectors of each dimension are appended to their own ``vectors-<dim>.f32`` file, which is read through
+    a memory map. ``keys.txt`` maps each key to its dimension and row.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._keys_path = os.path.join(path, "keys.txt")
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._maps: Dict[int, np.memmap] = {}
+        self._load_index()
+
+    def _vectors_path(self, dim: int) -> str:
+        return os.path.join(self.path, f"vectors-{dim}.f32")
+
+    def _rows(self, dim: int) -> int:
+        path = self._vectors_path(dim)
+        return os.path.getsize(path) // (dim * 4) if os.path.exists(path) else 0
+
+    def _load_index(self) -> None:
+        if not os.path.exists(self._keys_path):
+            return
+        rows: Dict[int, int] = {}
+        with open(self._keys_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) != 3:
+                    continue  # A partially written line from an interrupted process.
+                key, dim, row = parts[0], int(parts[1]), int(parts[2])
+                if dim not in rows:
+                    rows[dim] = self._rows(dim)
+                if row < rows[dim]:
+                    self._index[key] = (dim, row)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        location = self._index.get(key)
+        if location is None:
+            return None
+        dim, row = location
+        vectors = self._maps.get(dim)
+        if vectors is None or row >= vectors.shape[0]:
+            vectors = np.memmap(self._vectors_path(dim), dtype=np.float32, mode="r", shape=(self._rows(dim), dim))
+            self._maps[dim] = vectors
+        return np.array(vectors[row])
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        if key in self._index:
+            return
+        dim = vector.shape[0]
+        row = self._rows(dim)
+        with open(self._vectors_path(dim), "ab") as f:
+            f.write(vector.tobytes())
+        with open(self._keys_path, "a", encoding="utf-8") as f:
+            f.write(f"{key} {dim} {row}\n")
+        self._index[key] = (dim, row)
+
+    def __len__(self) -> int:
+        return len(self._index)
@@ -0,0 +1,48 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from .cache import EmbeddingCache
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps a LangChain embeddings model so that every text is embedded at most once per cache.
+    """
+
+    def __init__(self, embeddings: Any, cache: EmbeddingCache, model_id: Optional[str] = None):
+        """
+        Initializes the CachedEmbeddings.
+
+        Args:
+            embeddings: The embeddings model to wrap.
+            cache: The cache to read vectors from and store new vectors in.
+            model_id: The id used to namespace cache keys. Defaults to the wrapped model's name.
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_id = model_id or str(getattr(embeddings, "model", type(embeddings).__name__))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeds the texts, calling the wrapped model only for texts that are not cached."""
+        vectors: Dict[str, Any] = {}
+        missing: List[str] = []
+        for text in dict.fromkeys(texts):
+            vector = self.cache.get(self.model_id, text)
+            if vector is None:
+                missing.append(text)
+            else:
+                vectors[text] = vector
+
+        if missing:
+            for text, vector in zip(missing, self.embeddings.embed_documents(missing)):
+                self.cache.put(self.model_id, text, vector)
+                vectors[text] = vector
+        return [np.asarray(vectors[text], dtype=np.float32).tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embeds a query, using a separate cache namespace since some models embed queries differently."""
+        model_id = f"{self.model_id}:query"
+        vector = self.cache.get(model_id, text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(model_id, text, vector)
+        return np.asarray(vector, dtype=np.float32).tolist()
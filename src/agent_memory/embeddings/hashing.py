@@ -0,0 +1,82 @@
+import math
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from ..text import extract_keywords
+
+
+@lru_cache(maxsize=1 << 16)
+def _bucket(term: str, dimensions: int) -> Tuple[int, float]:
+    """Returns the column and sign of a term. CRC-32 is stable across processes, unlike `hash`."""
+    digest = zlib.crc32(term.encode("utf-8"))
+    return digest % dimensions, 1.0 if digest & 0x80000000 else -1.0
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Local, dependency-free embeddings made of hashed term features.
+
+    Each text is reduced to its keywords and pairs of consecutive keywords, optionally with the character
+    n-grams of its keywords, and every feature is hashed into one of `dimensions` signed columns (the
+    "hashing trick"). Term frequencies are dampened as 1 + log(tf), and vectors are L2-normalized, so that
+    dot products are cosine similarities. Texts sharing rare words score higher than texts sharing common
+    ones only to the extent that stopwords are dropped, as there are no corpus-wide document frequencies.
+    Nothing is learned or downloaded, the same text always gets the same vector in any process, and
+    embedding runs on the CPU in microseconds, which makes the embeddings suited to offline retrieval.
+    """
+
+    def __init__(self, dimensions: int = 1024, bigrams: bool = True, char_ngrams: int = 0):
+        """
+        Initializes the HashingEmbeddings.
+
+        Args:
+            dimensions: The size of the vectors.
+            bigrams: Whether pairs of consecutive keywords are features too, which rewards matching phrases.
+            char_ngrams: If positive, the character n-grams of this length of every keyword are features too,
+                which lets inflections such as "cat" and "cats" match.
+        """
+        self.dimensions = dimensions
+        self.bigrams = bigrams
+        self.char_ngrams = char_ngrams
+        self.model = f"hashing-{dimensions}-{int(bigrams)}-{char_ngrams}"
+
+    def _features(self, text: str) -> Counter:
+        keywords = extract_keywords(text)
+        features = Counter(keywords)
+        if self.bigrams:
+            features.update(f"{first} {second}" for first, second in zip(keywords, keywords[1:]))
+        if self.char_ngrams > 0:
+            n = self.char_ngrams
+            for keyword in keywords:
+                padded = f"#{keyword}#"
+                features.update(f"#{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        return features
+
+    def embed_matrix(self, texts: List[str]) -> np.ndarray:
+        """Returns the normalized vectors of the texts as the rows of a float32 matrix."""
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if not features:
+                continue
+            columns = np.empty(len(features), dtype=np.int64)
+            weights = np.empty(len(features), dtype=np.float32)
+            for i, (feature, count) in enumerate(features.items()):
+                column, sign = _bucket(feature, self.dimensions)
+                columns[i] = column
+                weights[i] = sign * (1.0 + math.log(count))
+            np.add.at(matrix[row], columns, weights)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_matrix(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_matrix([text])[0].tolist()
@@ -0,0 +1,311 @@
+import functools
+import inspect
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+class BaseSink(ABC):
+    """
+    Abstract Base Class for the destinations of instrumentation data.
+    Sinks are called synchronously on the instrumented code path, so they should be quick.
+    """
+
+    @abstractmethod
+    def record_span(self, name: str, duration: float, attributes: Dict[str, Any]) -> None:
+        """Records a timed operation. `duration` is in seconds."""
+        pass
+
+    @abstractmethod
+    def record_counter(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        """Records an increment of a counter."""
+        pass
+
+    @abstractmethod
+    def record_gauge(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        """Records the current value of a gauge."""
+        pass
+
+
+class AggregatingSink(BaseSink):
+    """
+    Aggregates instrumentation data in process, for tests, benchmarks and ad hoc inspection.
+    Metrics are keyed by name and, if `by_attributes` is True, by their attributes as well.
+    """
+
+    def __init__(self, by_attributes: bool = False):
+        self.by_attributes = by_attributes
+        self._lock = threading.Lock()
+        self.reset()
+
+    def _key(self, name: str, attributes: Dict[str, Any]) -> str:
+        if not self.by_attributes or not attributes:
+            return name
+        return name + "{" + ",".join(f"{key}={value}" for key, value in sorted(attributes.items())) + "}"
+
+    def record_span(self, name: str, duration: float, attributes: Dict[str, Any]) -> None:
+        key = self._key(name, attributes)
+        with self._lock:
+            span = self._spans.get(key)
+            if span is None:
+                self._spans[key] = {"count": 1, "total": duration, "max": duration}
+            else:
+                span["count"] += 1
+                span["total"] += duration
+                if duration > span["max"]:
+                    span["max"] = duration
+
+    def record_counter(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        key = self._key(name, attributes)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def record_gauge(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        key = self._key(name, attributes)
+        with self._lock:
+            gauge = self._gauges.get(key)
+            if gauge is None:
+                self._gauges[key] = {"last": value, "max": value}
+            else:
+                gauge["last"] = value
+                if value > gauge["max"]:
+                    gauge["max"] = value
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the aggregates: for every span its count and total and max duration in seconds, every
+        counter's sum, and every gauge's last and max values.
+        """
+        with self._lock:
+            return {
+                "spans": {key: dict(span) for key, span in self._spans.items()},
+                "counters": dict(self._counters),
+                "gauges": {key: dict(gauge) for key, gauge in self._gauges.items()},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spans: Dict[str, Dict[str, float]] = {}
+            self._counters: Dict[str, float] = {}
+            self._gauges: Dict[str, Dict[str, float]] = {}
+
+
+class LoggingSink(BaseSink):
+    """Writes every span, counter and gauge as a log record."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.DEBUG):
+        """
+        Initializes the LoggingSink.
+
+        Args:
+            logger: The logger to write to. Defaults to the `agent_memory.instrumentation` logger.
+            level: The level of the records.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+
+    def record_span(self, name: str, duration: float, attributes: Dict[str, Any]) -> None:
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "span %s %.3fms %s", name, duration * 1000, attributes)
+
+    def record_counter(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "counter %s +%s %s", name, value, attributes)
+
+    def record_gauge(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "gauge %s %s %s", name, value, attributes)
+
+
+class OpenTelemetrySink(BaseSink):
+    """
+    Exports instrumentation data as OpenTelemetry metrics: spans as duration histograms (in milliseconds),
+    counters as counters and gauges as gauges. Requires the `opentelemetry-api` package; configure an SDK
+    meter provider and exporter to send the metrics anywhere.
+    """
+
+    def __init__(self, meter: Optional[Any] = None):
+        """
+        Initializes the OpenTelemetrySink.
+
+        Args:
+            meter: An OpenTelemetry meter. Defaults to the `agent_memory` meter of the global meter provider.
+        """
+        if meter is None:
+            from opentelemetry import metrics
+            meter = metrics.get_meter("agent_memory")
+        self.meter = meter
+        self._instruments: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _instrument(self, name: str, create: Callable[..., Any], **kwargs: Any) -> Any:
+        instrument = self._instruments.get(name)
+        if instrument is None:
+            with self._lock:
+                instrument = self._instruments.get(name)
+                if instrument is None:
+                    instrument = self._instruments[name] = create(name, **kwargs)
+        return instrument
+
+    def record_span(self, name: str, duration: float, attributes: Dict[str, Any]) -> None:
+        self._instrument(f"{name}.duration", self.meter.create_histogram, unit="ms").record(duration * 1000, attributes)
+
+    def record_counter(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        self._instrument(name, self.meter.create_counter).add(value, attributes)
+
+    def record_gauge(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        # Synchronous gauges are recent in the API; older versions record the values as a histogram.
+        create = getattr(self.meter, "create_gauge", None) or self.meter.create_histogram
+        instrument = self._instrument(name, create)
+        (instrument.set if hasattr(instrument, "set") else instrument.record)(value, attributes)
+
+
+class Instrumentation:
+    """
+    The process-wide instrumentation switchboard.
+
+    BaseMemory and BaseLLM subclasses are instrumented automatically, and report spans, counters and gauges
+    here, which forwards them to the registered sinks. With no sink registered, instrumentation is disabled and
+    an instrumented call costs a single attribute check.
+    """
+
+    def __init__(self):
+        self.sinks: List[BaseSink] = []
+        self.enabled = False
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink: BaseSink) -> BaseSink:
+        """Registers a sink, enabling instrumentation, and returns it."""
+        with self._lock:
+            self.sinks = self.sinks + [sink]
+            self.enabled = True
+        return sink
+
+    def remove_sink(self, sink: BaseSink) -> None:
+        """Unregisters a sink. Instrumentation is disabled when the last sink is removed."""
+        with self._lock:
+            self.sinks = [registered for registered in self.sinks if registered is not sink]
+            self.enabled = bool(self.sinks)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[None]:
+        """Times the enclosed block as a span, if instrumentation is enabled."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, time.perf_counter() - start, attributes)
+
+    def record_span(self, name: str, duration: float, attributes: Dict[str, Any]) -> None:
+        for sink in self.sinks:
+            sink.record_span(name, duration, attributes)
+
+    def count(self, name: str, value: float = 1, **attributes: Any) -> None:
+        """Increments a counter, if instrumentation is enabled."""
+        if self.enabled:
+            for sink in self.sinks:
+                sink.record_counter(name, value, attributes)
+
+    def gauge(self, name: str, value: float, **attributes: Any) -> None:
+        """Records the current value of a gauge, if instrumentation is enabled."""
+        if self.enabled:
+            for sink in self.sinks:
+                sink.record_gauge(name, value, attributes)
+
+
+instrumentation = Instrumentation()
+
+
+def instrument(function: Callable, name: str, attributes: Dict[str, Any], before: Optional[Callable[..., None]] = None, after: Optional[Callable[..., None]] = None) -> Callable:
+    """
+    Wraps a method so that every call is timed as a span when instrumentation is enabled.
+    Coroutine functions, generators and async generators are timed until they complete.
+
+    Args:
+        function: The method to wrap.
+        name: The name of the span.
+        attributes: The attributes of the span.
+        before: An optional hook called with the instance and the call's arguments before the call.
+        after: An optional hook called with the instance and the result after the call. It is not called for generators.
+    """
+    state = instrumentation
+
+    def finish(start: float) -> None:
+        state.record_span(name, time.perf_counter() - start, attributes)
+
+    if inspect.isasyncgenfunction(function):
+        @functools.wraps(function)
+        async def wrapper(self, *args, **kwargs):
+            if not state.enabled:
+                async for item in function(self, *args, **kwargs):
+                    yield item
+                return
+            if before is not None:
+                before(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                async for item in function(self, *args, **kwargs):
+                    yield item
+            finally:
+                finish(start)
+    elif inspect.isgeneratorfunction(function):
+        @functools.wraps(function)
+        def wrapper(self, *args, **kwargs):
+            if not state.enabled:
+                return (yield from function(self, *args, **kwargs))
+            if before is not None:
+                before(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return (yield from function(self, *args, **kwargs))
+            finally:
+                finish(start)
+    elif inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def wrapper(self, *args, **kwargs):
+            if not state.enabled:
+                return await function(self, *args, **kwargs)
+            if before is not None:
+                before(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = await function(self, *args, **kwargs)
+            finally:
+                finish(start)
+            if after is not None:
+                after(self, result)
+            return result
+    else:
+        @functools.wraps(function)
+        def wrapper(self, *args, **kwargs):
+            if not state.enabled:
+                return function(self, *args, **kwargs)
+            if before is not None:
+                before(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = function(self, *args, **kwargs)
+            finally:
+                finish(start)
+            if after is not None:
+                after(self, result)
+            return result
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+def instrument_class(cls: type, prefix: str, methods: Dict[str, Dict[str, Optional[Callable[..., None]]]], attribute: str) -> None:
+    """
+    Instruments the given methods defined by a class itself, not the inherited ones, which are instrumented
+    where they are defined. Spans are named `{prefix}.{method}` and carry the class name under `attribute`.
+    """
+    for method_name, hooks in methods.items():
+        function = cls.__dict__.get(method_name)
+        if function is None or not callable(function) or getattr(function, "__instrumented__", False) or getattr(function, "__isabstractmethod__", False):
+            continue
+        setattr(cls, method_name, instrument(function, f"{prefix}.{method_name}", {attribute: cls.__name__}, **hooks))
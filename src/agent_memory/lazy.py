@@ -0,0 +1,75 @@
+import importlib
+import threading
+from typing import Any, Callable, Dict, Hashable, MutableMapping, Tuple
+
+def lazy_attribute(namespace: MutableMapping[str, Any], name: str, imports: Dict[str, Tuple[str, str]]) -> Any:
+    """
+    Returns `namespace[name]`, importing it on first use.
+
+    Modules with heavy dependencies declare them in `imports` as `{name: (module, attribute)}` instead of
+    importing them at the top, and resolve them through this function, both from their code and from a
+    module-level `__getattr__`. The imported value is stored in the module's globals, so later lookups are
+    plain dict hits and the name can still be monkeypatched like an eagerly imported one.
+
+    Args:
+        namespace: The globals of the module that declares the lazy names.
+        name: The name to resolve.
+        imports: The lazily imported names of the module.
+    """
+    try:
+        return namespace[name]
+    except KeyError:
+        pass
+    if name not in imports:
+        raise AttributeError(f"module {namespace.get('__name__')!r} has no attribute {name!r}")
+    module_name, attribute = imports[name]
+    value = getattr(importlib.import_module(module_name), attribute)
+    namespace[name] = value
+    return value
+
+
+class ModelRegistry:
+    """
+    A process-wide registry of loaded models.
+
+    Memory strategies load their models through the registry on first use, so that every instance using the
+    same model shares a single loaded copy. Loading is thread-safe and happens at most once per key.
+    """
+
+    def __init__(self):
+        self._models: Dict[Hashable, Any] = {}
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Returns the model registered under `key`, calling `loader` to load it if it is not loaded yet."""
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        # Load outside the registry lock, so that loading one model does not block lookups of others.
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    return self._models[key]
+            model = loader()
+            with self._lock:
+                self._models[key] = model
+                self._loading.pop(key, None)
+            return model
+
+    def clear(self) -> None:
+        """Drops every registered model, e.g. to release memory."""
+        with self._lock:
+            self._models.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._models
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._models)
+
+
+shared_models = ModelRegistry()
@@ -1,21 +1,44 @@
+from typing import Any
 from .base import BaseLLM
-from .openai_llm import OpenAILLM
-from .ollama_llm import OllamaLLM
-from ..config import LLM_PROVIDER, OLLAMA_MODEL, OLLAMA_BASE_URL
+from ..config import LLM_PROVIDER, OLLAMA_MODEL, OLLAMA_BASE_URL, OPENAI_API_KEY
+from ..lazy import lazy_attribute
+from .pool import shared_llms
 
 import os
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
+
+# The provider wrappers import their LangChain integrations, so they are only imported when used.
+_LAZY_IMPORTS = {
+    "OpenAILLM": ("agent_memory.llms.openai_llm", "OpenAILLM"),
+    "OllamaLLM": ("agent_memory.llms.ollama_llm", "OllamaLLM"),
+    "CachingLLM": ("agent_memory.llms.caching_llm", "CachingLLM"),
+    "FakeLLM": ("agent_memory.llms.fake_llm", "FakeLLM"),
+}
+
+def __getattr__(name: str) -> Any:
+    return lazy_attribute(globals(), name, _LAZY_IMPORTS)
 
 def get_llm() -> BaseLLM:
+    """
+    Returns the LLM wrapper of the configured provider.
+    The wrapper is created once per provider and configuration and shared by every caller, so agents
+    created per request reuse its warm, pooled connections.
+    """
     if os.environ.get("PYTEST_CURRENT_TEST"):
         # Return a mock LLM during testing
         mock_llm = MagicMock()
         mock_llm.invoke.return_value.content = "Mocked LLM response"
+        mock_llm.ainvoke = AsyncMock(return_value=mock_llm.invoke.return_value)
         return mock_llm
 
     if LLM_PROVIDER == "ollama":
-        return OllamaLLM(model=OLLAMA_MODEL, base_url=OLLAMA_BASE_URL)
+        from .ollama_llm import OllamaLLM
+        return shared_llms.get(("ollama", OLLAMA_MODEL, OLLAMA_BASE_URL), lambda: OllamaLLM(model=OLLAMA_MODEL, base_url=OLLAMA_BASE_URL))
     elif LLM_PROVIDER == "openai":
-        return OpenAILLM()
+        from .openai_llm import OpenAILLM
+        return shared_llms.get(("openai", OPENAI_API_KEY), OpenAILLM)
+    elif LLM_PROVIDER == "fake":
+        from .fake_llm import FakeLLM
+        return shared_llms.get(("fake",), FakeLLM)
     else:
         raise ValueError(f"Unsupported LLM provider: {LLM_PROVIDER}")
@@ -1,13 +1,79 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, AsyncIterator, Hashable, Iterator, Tuple
+from ..instrumentation import instrument_class, instrumentation
 
 class BaseLLM(ABC):
     """
     Abstract Base Class for all Language Model (LLM) integrations.
     Defines the common interface for interacting with different LLM providers.
+
+    The calls of every subclass are instrumented: they are timed as `llm.<method>` spans and counted, with
+    their prompt size, by `llm.calls`, `llm.prompt_chars` and `llm.prompt_tokens`. Wrappers that delegate to
+    another LLM, such as CachingLLM, set `instrumented = False` so that calls are not counted twice.
     """
 
+    instrumented = True
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        if cls.__dict__.get("instrumented", True):
+            instrument_class(cls, "llm", _INSTRUMENTED_METHODS, "llm")
+
     @abstractmethod
     def invoke(self, prompt: str) -> Any:
         """Invokes the LLM with a given prompt and returns its response."""
         pass
+
+    async def ainvoke(self, prompt: str) -> Any:
+        """
+        Asynchronously invokes the LLM with a given prompt and returns its response.
+        Wrappers should override this with a native async client; by default the blocking
+        `invoke` is run in a worker thread so that the event loop is not blocked.
+        """
+        return await asyncio.to_thread(self.invoke, prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Invokes the LLM with a given prompt and yields the text of its response as it is generated.
+        Wrappers should override this with their provider's streaming API; by default the whole
+        response of `invoke` is yielded as a single chunk.
+        """
+        yield self.invoke(prompt).content
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Asynchronously yields the text of the response to a given prompt as it is generated. Defaults to a single chunk from `ainvoke`."""
+        response = await self.ainvoke(prompt)
+        yield response.content
+
+    def identity(self) -> Tuple[Hashable, ...]:
+        """
+        Identifies the provider, model and generation parameters of the LLM, so that responses cached for
+        one configuration are never served for another. Wrappers should include every parameter that changes the response.
+        """
+        return (type(self).__module__, type(self).__qualname__)
+
+
+def _count_call(llm: BaseLLM, prompt: Any, *args: Any, **kwargs: Any) -> None:
+    from ..tokenizers import get_default_token_counter
+
+    text = prompt if isinstance(prompt, str) else str(prompt)
+    name = type(llm).__name__
+    instrumentation.count("llm.calls", llm=name)
+    instrumentation.count("llm.prompt_chars", len(text), llm=name)
+    instrumentation.count("llm.prompt_tokens", get_default_token_counter().count(text), llm=name)
+
+
+def _count_completion(llm: BaseLLM, response: Any) -> None:
+    content = getattr(response, "content", None)
+    if isinstance(content, str):
+        instrumentation.count("llm.completion_chars", len(content), llm=type(llm).__name__)
+
+
+# The methods timed as `llm.<method>` spans, with their hooks.
+_INSTRUMENTED_METHODS = {
+    "invoke": {"before": _count_call, "after": _count_completion},
+    "ainvoke": {"before": _count_call, "after": _count_completion},
+    "stream": {"before": _count_call},
+    "astream": {"before": _count_call},
+}
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Hashable, Optional, Tuple, TYPE_CHECKING
+from .base import BaseLLM
+from ..instrumentation import instrumentation
+
+if TYPE_CHECKING:
+    from agent_memory.storage import BaseStorage
+
+class CachingLLM(BaseLLM):
+    """
+    A BaseLLM wrapper that caches responses by prompt.
+
+    Memory strategies send byte-identical prompts again and again: when a summary is rebuilt on a replay or
+    a retry, or when `get_context` is called twice without new messages. The cache key hashes the wrapped
+    LLM's `identity()` (provider, model and parameters) together with the prompt, so that a response is only
+    served for the configuration that produced it.
+
+    Responses are kept in an in-memory LRU tier bounded by `max_entries`, and optionally in a storage
+    that outlives the process. Entries expire after `ttl` seconds. Concurrent identical requests, from
+    threads or coroutines, are coalesced into a single upstream call whose response they all receive.
+    Failed calls are not cached.
+
+    Only wrap LLMs whose responses may be reused, e.g. the one given to a memory strategy for summaries,
+    not necessarily the one generating the agent's replies.
+
+    Lookups are counted by the `llm.cache.hits`, `llm.cache.misses` and `llm.cache.coalesced` instrumentation counters.
+    """
+
+    # The wrapped LLM reports the upstream calls.
+    instrumented = False
+
+    def __init__(self, llm: BaseLLM, max_entries: int = 1024, ttl: Optional[float] = None, storage: Optional["BaseStorage"] = None):
+        """
+        Initializes the CachingLLM.
+
+        Args:
+            llm: The LLM to cache the responses of.
+            max_entries: The maximum number of responses kept in memory, evicting the least recently used.
+            ttl: An optional time to live of the responses, in seconds.
+            storage: An optional storage, e.g. a `MemoryMappedLog`, keeping the responses across restarts.
+                Responses are saved as snapshots keyed by their hash, so they must be picklable.
+        """
+        self.llm = llm
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.storage = storage
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0}
+
+    def identity(self) -> Tuple[Hashable, ...]:
+        return self.llm.identity()
+
+    def invoke(self, prompt: str) -> Any:
+        key = self.cache_key(prompt)
+        found, response, future, leader = self._lookup(key)
+        if found:
+            return response
+        if not leader:
+            return future.result()
+        try:
+            response = self.llm.invoke(prompt)
+        except BaseException as error:
+            self._fail(key, future, error)
+            raise
+        self._store(key, future, response)
+        return response
+
+    async def ainvoke(self, prompt: str) -> Any:
+        key = self.cache_key(prompt)
+        found, response, future, leader = self._lookup(key)
+        if found:
+            return response
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            response = await self.llm.ainvoke(prompt)
+        except BaseException as error:
+            self._fail(key, future, error)
+            raise
+        self._store(key, future, response)
+        return response
+
+    def cache_key(self, prompt: str) -> str:
+        """Returns the key of a prompt: a hash of the wrapped LLM's identity and the prompt."""
+        digest = hashlib.sha256(repr(self.llm.identity()).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8") if isinstance(prompt, str) else repr(prompt).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _lookup(self, key: str) -> Tuple[bool, Any, Optional[Future], bool]:
+        """
+        Looks a key up in both tiers. Returns (found, response, future, leader): on a miss, the future of
+        the upstream call and whether the caller is the one that has to make it.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                response, expires = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    instrumentation.count("llm.cache.hits", tier="memory")
+                    return True, response, None, False
+                del self._entries[key]
+            future = self._inflight.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                instrumentation.count("llm.cache.coalesced")
+                return False, None, future, False
+            future = self._inflight[key] = Future()
+        # Read the disk tier outside the lock, as the leader of the key, so that other keys are not blocked.
+        if self.storage is not None:
+            try:
+                entry = self.storage.load_state(key)
+            except BaseException as error:
+                # Fail the coalesced callers too, instead of leaving them waiting on a call that is never made.
+                self._fail(key, future, error)
+                raise
+            if entry is not None and (entry["expires"] is None or entry["expires"] > time.time()):
+                with self._lock:
+                    self._stats["disk_hits"] += 1
+                    self._remember(key, entry["response"], entry["expires"])
+                    del self._inflight[key]
+                future.set_result(entry["response"])
+                instrumentation.count("llm.cache.hits", tier="disk")
+                return True, entry["response"], None, False
+        with self._lock:
+            self._stats["misses"] += 1
+        instrumentation.count("llm.cache.misses")
+        return False, None, future, True
+
+    def _store(self, key: str, future: Future, response: Any) -> None:
+        expires_at = None if self.ttl is None else time.time() + self.ttl
+        with self._lock:
+            self._remember(key, response, expires_at)
+            del self._inflight[key]
+        future.set_result(response)
+        if self.storage is not None:
+            self.storage.save_state(key, {"expires": expires_at, "response": response})
+
+    def _fail(self, key: str, future: Future, error: BaseException) -> None:
+        with self._lock:
+            del self._inflight[key]
+        future.set_exception(error)
+
+    def _remember(self, key: str, response: Any, expires_at: Optional[float]) -> None:
+        """Puts a response into the memory tier. Expiry times are wall-clock, and converted to the monotonic clock here."""
+        expires = None if expires_at is None else time.monotonic() + (expires_at - time.time())
+        self._entries[key] = (response, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the number of memory hits, disk hits, misses (upstream calls) and coalesced requests, and the hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        requests = stats["hits"] + stats["disk_hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = (requests - stats["misses"]) / requests if requests else 0.0
+        return stats
+
+    def clear(self) -> None:
+        """Drops every cached response, including the ones in the storage."""
+        with self._lock:
+            self._entries.clear()
+        if self.storage is not None:
+            self.storage.clear()
@@ -0,0 +1,77 @@
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Hashable, Iterator, Optional, Tuple
+from langchain_core.messages import AIMessage
+from .base import BaseLLM
+from ..tokenizers import BaseTokenCounter, get_default_token_counter
+
+class FakeLLM(BaseLLM):
+    """
+    A deterministic local LLM for tests and benchmarks.
+
+    The response to a prompt is derived from its hash, so the same prompt always gets the same response, and
+    every call waits for a configurable latency to stand in for the network and generation time. The wrapper
+    counts its calls and the prompt and completion tokens, so that strategies can be compared on LLM cost.
+    """
+
+    def __init__(self, latency: float = 0.0, response_words: int = 12, token_counter: Optional[BaseTokenCounter] = None):
+        """
+        Initializes the FakeLLM.
+
+        Args:
+            latency: The time every call takes, in seconds.
+            response_words: The number of words in every response.
+            token_counter: The token counter of the prompt and completion tokens. Defaults to the default counter.
+        """
+        self.latency = latency
+        self.response_words = response_words
+        self.token_counter = token_counter or get_default_token_counter()
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def identity(self) -> Tuple[Hashable, ...]:
+        return ("fake", self.response_words)
+
+    def invoke(self, prompt: str) -> Any:
+        if self.latency:
+            time.sleep(self.latency)
+        return AIMessage(content=self._respond(prompt))
+
+    async def ainvoke(self, prompt: str) -> Any:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return AIMessage(content=self._respond(prompt))
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        if self.latency:
+            time.sleep(self.latency)
+        for i, word in enumerate(self._respond(prompt).split(" ")):
+            yield word if i == 0 else " " + word
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for i, word in enumerate(self._respond(prompt).split(" ")):
+            yield word if i == 0 else " " + word
+
+    def _respond(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        content = " ".join(f"w{digest[(2 * i) % len(digest):(2 * i) % len(digest) + 2]}" for i in range(self.response_words))
+        prompt_tokens = self.token_counter.count(prompt)
+        completion_tokens = self.token_counter.count(content)
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["prompt_tokens"] += prompt_tokens
+            self._stats["completion_tokens"] += completion_tokens
+        return content
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of calls and the prompt and completion tokens so far."""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
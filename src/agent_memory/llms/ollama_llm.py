@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, AsyncIterator, Hashable, Iterator, Tuple
 from langchain_community.chat_models import ChatOllama
 from .base import BaseLLM
 
@@ -9,5 +9,21 @@ class OllamaLLM(BaseLLM):
     def __init__(self, model: str = "llama2", base_url: str = "http://localhost:11434"):
         self.llm = ChatOllama(model=model, base_url=base_url)
 
+    def identity(self) -> Tuple[Hashable, ...]:
+        return ("ollama", self.llm.base_url, self.llm.model, self.llm.temperature)
+
     def invoke(self, prompt: str) -> Any:
         return self.llm.invoke(prompt)
+
+    async def ainvoke(self, prompt: str) -> Any:
+        return await self.llm.ainvoke(prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.llm.stream(prompt):
+            if chunk.content:
+                yield chunk.content
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        async for chunk in self.llm.astream(prompt):
+            if chunk.content:
+                yield chunk.content
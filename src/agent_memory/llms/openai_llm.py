@@ -1,16 +1,67 @@
-from typing import Any
+import asyncio
+import threading
+import weakref
+from typing import Any, AsyncIterator, Hashable, Iterator, Optional, Tuple
 from langchain_openai import ChatOpenAI
 from ..config import OPENAI_API_KEY
 from .base import BaseLLM
+from .pool import http_clients
 
 class OpenAILLM(BaseLLM):
     """
     Wrapper for OpenAI's Chat models, conforming to the BaseLLM interface.
+    Requests go through the HTTP clients of the process-wide pool, so wrappers with the same configuration
+    share kept-alive connections.
     """
-    def __init__(self):
-        if not OPENAI_API_KEY:
+    def __init__(self, model: Optional[str] = None, api_key: Optional[str] = None, base_url: Optional[str] = None, **pool_options: Any):
+        """
+        Initializes the OpenAILLM.
+
+        Args:
+            model: The chat model to use. Defaults to LangChain's default model.
+            api_key: The API key. Defaults to `OPENAI_API_KEY`.
+            base_url: An optional base URL of an OpenAI-compatible API.
+            **pool_options: Connection pool settings passed to `HTTPClientPool.client`, e.g. `max_connections`.
+        """
+        api_key = api_key or OPENAI_API_KEY
+        if not api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables.")
-        self.llm = ChatOpenAI(api_key=OPENAI_API_KEY)
+        self._options = {"api_key": api_key}
+        if model is not None:
+            self._options["model"] = model
+        if base_url is not None:
+            self._options["base_url"] = base_url
+        self._pool_key = ("openai", base_url)
+        self._pool_options = pool_options
+        self.llm = ChatOpenAI(http_client=http_clients.client(self._pool_key, **pool_options), **self._options)
+        # Async connections belong to an event loop, so each loop gets a model on its own pooled async client.
+        self._async_llms: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ChatOpenAI]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def identity(self) -> Tuple[Hashable, ...]:
+        return ("openai", self._options.get("base_url"), self.llm.model_name, self.llm.temperature, self.llm.max_tokens)
 
     def invoke(self, prompt: str) -> Any:
         return self.llm.invoke(prompt)
+
+    async def ainvoke(self, prompt: str) -> Any:
+        return await self._async_llm().ainvoke(prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.llm.stream(prompt):
+            if chunk.content:
+                yield chunk.content
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        async for chunk in self._async_llm().astream(prompt):
+            if chunk.content:
+                yield chunk.content
+
+    def _async_llm(self) -> ChatOpenAI:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            llm = self._async_llms.get(loop)
+            if llm is None:
+                client = http_clients.async_client(self._pool_key, **self._pool_options)
+                llm = self._async_llms[loop] = ChatOpenAI(http_client=self.llm.http_client, http_async_client=client, **self._options)
+            return llm
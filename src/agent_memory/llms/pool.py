@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, Hashable, Optional, Tuple, TYPE_CHECKING
+from ..config import LLM_KEEPALIVE_EXPIRY, LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE_CONNECTIONS, LLM_TIMEOUT
+from ..lazy import ModelRegistry
+
+if TYPE_CHECKING:
+    import httpx
+
+class HTTPClientPool:
+    """
+    A process-wide registry of pooled HTTP clients.
+
+    LLM wrappers get their HTTP clients from the pool instead of creating their own, so that every wrapper
+    talking to the same endpoint with the same settings reuses the same kept-alive connections rather than
+    paying for a new TCP and TLS handshake. A synchronous `httpx.Client` is shared by all threads. Async
+    connections belong to the event loop that opened them, so there is one `httpx.AsyncClient` per key and
+    event loop, which is dropped with its loop.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Hashable, "httpx.Client"] = {}
+        self._async_clients: Dict[Hashable, "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]"] = {}
+        self._lock = threading.Lock()
+
+    def client(self, key: Hashable, max_connections: Optional[int] = None, max_keepalive_connections: Optional[int] = None, keepalive_expiry: Optional[float] = None, timeout: Optional[float] = None) -> "httpx.Client":
+        """
+        Returns the synchronous client registered under `key`, creating it on first use.
+
+        Args:
+            key: Identifies the endpoint and configuration the client is for. Settings are part of the key,
+                so clients with different limits are never shared.
+            max_connections: The maximum number of concurrent connections. Defaults to `LLM_MAX_CONNECTIONS`.
+            max_keepalive_connections: The maximum number of idle connections kept open. Defaults to `LLM_MAX_KEEPALIVE_CONNECTIONS`.
+            keepalive_expiry: How long, in seconds, an idle connection is kept open. Defaults to `LLM_KEEPALIVE_EXPIRY`.
+            timeout: The request timeout, in seconds. Defaults to `LLM_TIMEOUT`.
+        """
+        settings = self._settings(max_connections, max_keepalive_connections, keepalive_expiry, timeout)
+        with self._lock:
+            client = self._clients.get((key, settings))
+            if client is None or client.is_closed:
+                import httpx
+                client = self._clients[(key, settings)] = httpx.Client(**self._options(settings))
+            return client
+
+    def async_client(self, key: Hashable, max_connections: Optional[int] = None, max_keepalive_connections: Optional[int] = None, keepalive_expiry: Optional[float] = None, timeout: Optional[float] = None) -> "httpx.AsyncClient":
+        """Returns the async client registered under `key` for the running event loop, creating it on first use. Takes the same arguments as `client`."""
+        loop = asyncio.get_running_loop()
+        settings = self._settings(max_connections, max_keepalive_connections, keepalive_expiry, timeout)
+        with self._lock:
+            clients = self._async_clients.setdefault((key, settings), weakref.WeakKeyDictionary())
+            client = clients.get(loop)
+            if client is None or client.is_closed:
+                import httpx
+                client = clients[loop] = httpx.AsyncClient(**self._options(settings))
+            return client
+
+    @staticmethod
+    def _settings(max_connections: Optional[int], max_keepalive_connections: Optional[int], keepalive_expiry: Optional[float], timeout: Optional[float]) -> Tuple[int, int, float, float]:
+        return (
+            LLM_MAX_CONNECTIONS if max_connections is None else max_connections,
+            LLM_MAX_KEEPALIVE_CONNECTIONS if max_keepalive_connections is None else max_keepalive_connections,
+            LLM_KEEPALIVE_EXPIRY if keepalive_expiry is None else keepalive_expiry,
+            LLM_TIMEOUT if timeout is None else timeout,
+        )
+
+    @staticmethod
+    def _options(settings: Tuple[int, int, float, float]) -> Dict[str, Any]:
+        import httpx
+
+        max_connections, max_keepalive_connections, keepalive_expiry, timeout = settings
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections, keepalive_expiry=keepalive_expiry)
+        return {"limits": limits, "timeout": timeout}
+
+    def close(self) -> None:
+        """
+        Closes and forgets every client. An async client is closed on its own event loop: right away if the
+        loop is idle, or scheduled on it if the loop is running. The clients of closed loops went with them.
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            async_clients = [(loop, client) for loop_clients in self._async_clients.values() for loop, client in loop_clients.items()]
+            self._clients.clear()
+            self._async_clients.clear()
+        for client in clients:
+            client.close()
+        for loop, client in async_clients:
+            if client.is_closed or loop.is_closed():
+                continue
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            else:
+                loop.run_until_complete(client.aclose())
+
+    async def aclose(self) -> None:
+        """Closes every client, awaiting the async clients of the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            async_clients = [clients[loop] for clients in self._async_clients.values() if loop in clients]
+        for client in async_clients:
+            await client.aclose()
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients) + sum(len(clients) for clients in self._async_clients.values())
+
+
+http_clients = HTTPClientPool()
+
+# The LLM wrappers returned by `get_llm`, one per provider and configuration.
+shared_llms = ModelRegistry()
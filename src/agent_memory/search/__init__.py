@@ -0,0 +1,10 @@
+from .base import VectorIndex
+from .bm25 import BM25Index, reciprocal_rank_fusion
+from .exact import ExactIndex
+from .ivf import IVFIndex
+from .minhash import MinHasher
+
+VECTOR_INDEXES = {
+    "exact": ExactIndex,
+    "ivf": IVFIndex,
+}
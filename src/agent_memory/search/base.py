@@ -0,0 +1,76 @@
+from abc import ABC, abstractmethod
+from typing import Tuple
+
+import numpy as np
+
+
+class VectorIndex(ABC):
+    """
+    Abstract Base Class for in-process vector indexes.
+
+    Vectors are stored as the rows of float32 matrices and are identified by their insertion order. With
+    `normalize=True`, vectors and queries are L2-normalized, so that scores are cosine similarities.
+    """
+
+    def __init__(self, normalize: bool = True):
+        self.normalize = normalize
+
+    @abstractmethod
+    def add(self, vectors) -> np.ndarray:
+        """
+        Adds vectors to the index.
+
+        Args:
+            vectors: A vector or a matrix with one vector per row.
+
+        Returns:
+            The ids of the added vectors.
+        """
+        pass
+
+    @abstractmethod
+    def search(self, queries, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the vectors scoring highest against every query by dot product.
+
+        Args:
+            queries: A query vector, or a matrix with one query per row to search them in one batch.
+            k: The number of results per query. Fewer are returned if the index holds fewer vectors.
+
+        Returns:
+            The scores and the ids of the results, best first: 1-d arrays for a single query vector, and
+            arrays with one row per query for a matrix.
+        """
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    def _prepare(self, vectors) -> np.ndarray:
+        """Returns the vectors as a C-contiguous float32 matrix, normalized if the index normalizes."""
+        matrix = np.array(vectors, dtype=np.float32, ndmin=2, order="C")
+        if self.normalize:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the k highest scores of every row and their column indices, best first."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.float32), empty.astype(np.int64)
+    if k < scores.shape[1]:
+        # Partition first, so that only k columns per row are sorted.
+        columns = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        columns = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    selected = np.take_along_axis(scores, columns, axis=1)
+    order = np.argsort(-selected, axis=1, kind="stable")
+    return np.take_along_axis(selected, order, axis=1), np.take_along_axis(columns, order, axis=1).astype(np.int64)
@@ -0,0 +1,107 @@
+import math
+from array import array
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..text import extract_keywords
+from .base import top_k
+
+
+class BM25Index:
+    """
+    An incrementally updated inverted index ranking texts by Okapi BM25.
+
+    Every term has a posting list of the ids of the texts containing it and of its frequency in them.
+    Adding a text only appends to the posting lists of its terms, as document frequencies and the average
+    text length are read at query time, so the index never has to be rebuilt. A query only touches the
+    posting lists of its own terms, which makes lexical matches on rare terms, such as names, identifiers
+    and order numbers, cheap to find in long conversations.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, tokenizer: Optional[Callable[[str], List[str]]] = None):
+        """
+        Initializes the BM25Index.
+
+        Args:
+            k1: How quickly the score of a term saturates with its frequency in a text.
+            b: How strongly scores are normalized by text length, from 0 (not at all) to 1.
+            tokenizer: The function splitting texts into terms. Defaults to the keywords of the text.
+        """
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = tokenizer or extract_keywords
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._lengths = array("q")
+        self._total_length = 0
+
+    def add(self, texts: List[str]) -> List[int]:
+        """Indexes the texts and returns their ids, which count every added text in order."""
+        ids = []
+        for text in texts:
+            doc_id = len(self._lengths)
+            terms = self.tokenizer(text)
+            for term, count in Counter(terms).items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("q"), array("q"))
+                postings[0].append(doc_id)
+                postings[1].append(count)
+            self._lengths.append(len(terms))
+            self._total_length += len(terms)
+            ids.append(doc_id)
+        return ids
+
+    def scores(self, query: str) -> np.ndarray:
+        """Returns the BM25 score of every indexed text for the query."""
+        n = len(self._lengths)
+        scores = np.zeros(n, dtype=np.float32)
+        if n == 0:
+            return scores
+        lengths = np.frombuffer(self._lengths, dtype=np.int64)
+        norms = self.k1 * (1 - self.b + self.b * lengths / max(self._total_length / n, 1e-9))
+        for term in set(self.tokenizer(query)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            ids = np.frombuffer(postings[0], dtype=np.int64)
+            frequencies = np.frombuffer(postings[1], dtype=np.int64).astype(np.float32)
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            # Every text holds a term once in its posting list, so the scores can be added without np.add.at.
+            scores[ids] += idf * frequencies * (self.k1 + 1) / (frequencies + norms[ids])
+        return scores
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the scores and ids of the k best matching texts, best first. Texts without any query term are left out."""
+        scores, ids = top_k(self.scores(query)[np.newaxis], k)
+        found = scores[0] > 0
+        return scores[0][found], ids[0][found]
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def clear(self) -> None:
+        self._postings = {}
+        self._lengths = array("q")
+        self._total_length = 0
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[int]:
+    """
+    Merges rankings of ids into one by reciprocal rank fusion: every id scores the sum of 1 / (k + rank)
+    over the rankings it appears in. Only ranks are used, so rankers whose scores are on different scales,
+    such as BM25 and cosine similarity, can be fused without calibration.
+
+    Args:
+        rankings: Lists of ids, best first.
+        k: Dampens the advantage of the top ranks. 60 is the value of the original paper.
+
+    Returns:
+        The ids, best first. Ties keep the order in which the ids were first seen.
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
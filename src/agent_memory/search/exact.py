@@ -0,0 +1,66 @@
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .base import VectorIndex, top_k
+
+
+class ExactIndex(VectorIndex):
+    """
+    A brute-force index: every query is scored against every vector with one matrix product.
+
+    The vectors live in a single float32 matrix that grows by doubling, so adding vectors is amortized
+    O(1) per vector and searches run on a contiguous block of memory.
+    """
+
+    def __init__(self, normalize: bool = True):
+        super().__init__(normalize=normalize)
+        self._matrix: Optional[np.ndarray] = None
+        self._size = 0
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """The stored vectors, as a read-only view."""
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        view = self._matrix[:self._size]
+        view.flags.writeable = False
+        return view
+
+    def add(self, vectors) -> np.ndarray:
+        matrix = self._prepare(vectors)
+        if self._matrix is None:
+            self._matrix = np.empty((max(len(matrix), 64), matrix.shape[1]), dtype=np.float32)
+        elif matrix.shape[1] != self._matrix.shape[1]:
+            raise ValueError(f"Expected vectors of {self._matrix.shape[1]} dimensions, got {matrix.shape[1]}.")
+        end = self._size + len(matrix)
+        if end > len(self._matrix):
+            grown = np.empty((max(end, 2 * len(self._matrix)), self._matrix.shape[1]), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+        self._matrix[self._size:end] = matrix
+        ids = np.arange(self._size, end, dtype=np.int64)
+        self._size = end
+        return ids
+
+    def search(self, queries, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        single = np.ndim(queries) == 1
+        matrix = self._prepare(queries)
+        if self._size == 0:
+            scores, ids = top_k(np.empty((len(matrix), 0), dtype=np.float32), k)
+        else:
+            scores, ids = top_k(matrix @ self._matrix[:self._size].T, k)
+        return (scores[0], ids[0]) if single else (scores, ids)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        self._matrix = None
+        self._size = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Only pickle the used rows, not the spare capacity.
+        state = self.__dict__.copy()
+        state["_matrix"] = None if self._matrix is None else self._matrix[:self._size].copy()
+        return state
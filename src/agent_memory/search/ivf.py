@@ -0,0 +1,127 @@
+import math
+from array import array
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .base import top_k
+from .exact import ExactIndex
+
+
+class IVFIndex(ExactIndex):
+    """
+    An approximate inverted-file index.
+
+    The vectors are clustered around `n_lists` centroids by spherical k-means, and every vector is filed in
+    the list of its nearest centroid. A query is only scored against the vectors in the lists of its
+    `n_probe` nearest centroids, which trades a little recall for searching a fraction of the index.
+    Batched searches pad the results of queries with fewer than k candidates with the id -1 and a score of -inf.
+
+    Until `train_size` vectors have been added the index searches exhaustively. It is then trained, and
+    retrained whenever it has doubled in size since, so that the centroids follow the data and the cost of
+    training stays amortized O(1) per added vector.
+    """
+
+    def __init__(self, n_lists: Optional[int] = None, n_probe: int = 8, train_size: int = 1024, iterations: int = 10, seed: int = 0, normalize: bool = True):
+        """
+        Initializes the IVFIndex.
+
+        Args:
+            n_lists: The number of clusters. Defaults to the square root of the number of vectors at training.
+            n_probe: The number of clusters searched per query. Higher is slower and more accurate.
+            train_size: The number of vectors from which the index is clustered.
+            iterations: The number of k-means iterations per training.
+            seed: The seed of the random centroid initialization.
+            normalize: Whether vectors and queries are L2-normalized.
+        """
+        super().__init__(normalize=normalize)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_size = train_size
+        self.iterations = iterations
+        self.seed = seed
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[array] = []
+        self._trained_size = 0
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def add(self, vectors) -> np.ndarray:
+        ids = super().add(vectors)
+        if self._size >= max(self.train_size, 2 * self._trained_size):
+            self.train()
+        elif self._centroids is not None:
+            self._file(ids)
+        return ids
+
+    def train(self) -> None:
+        """Clusters the stored vectors and refiles all of them."""
+        if self._size == 0:
+            return
+        vectors = self._matrix[:self._size]
+        n_lists = self.n_lists or max(1, int(math.sqrt(self._size)))
+        n_lists = min(n_lists, self._size)
+        rng = np.random.default_rng(self.seed)
+        centroids = vectors[rng.choice(self._size, n_lists, replace=False)].copy()
+        for _ in range(self.iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            centroids = self._centroids_of(vectors, assignments, n_lists, centroids, rng)
+        self._centroids = centroids
+        self._lists = [array("q") for _ in range(n_lists)]
+        self._file(np.arange(self._size, dtype=np.int64))
+        self._trained_size = self._size
+
+    def _centroids_of(self, vectors: np.ndarray, assignments: np.ndarray, n_lists: int, previous: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Returns the normalized mean of every cluster. Empty clusters are restarted from a random vector."""
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=n_lists)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        centroids = previous.copy()
+        filled = counts > 0
+        # Sum every cluster's vectors in one pass over the vectors sorted by cluster.
+        centroids[filled] = np.add.reduceat(vectors[order], starts[filled], axis=0)
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = vectors[rng.choice(len(vectors), len(empty))]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        np.divide(centroids, norms, out=centroids, where=norms > 0)
+        return centroids
+
+    def _file(self, ids: np.ndarray) -> None:
+        """Appends vectors to the lists of their nearest centroids."""
+        assignments = np.argmax(self._matrix[ids] @ self._centroids.T, axis=1)
+        order = np.argsort(assignments, kind="stable")
+        sorted_ids, sorted_assignments = ids[order], assignments[order]
+        boundaries = np.flatnonzero(np.diff(sorted_assignments)) + 1
+        for group_ids, group_assignments in zip(np.split(sorted_ids, boundaries), np.split(sorted_assignments, boundaries)):
+            if len(group_ids):
+                self._lists[group_assignments[0]].frombytes(group_ids.astype(np.int64).tobytes())
+
+    def search(self, queries, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self._centroids is None:
+            return super().search(queries, k)
+        single = np.ndim(queries) == 1
+        matrix = self._prepare(queries)
+        _, probes = top_k(matrix @ self._centroids.T, self.n_probe)
+        k = min(k, self._size)
+        all_scores = np.full((len(matrix), k), -np.inf, dtype=np.float32)
+        all_ids = np.full((len(matrix), k), -1, dtype=np.int64)
+        for row, query in enumerate(matrix):
+            candidates = np.concatenate([np.frombuffer(self._lists[probe], dtype=np.int64) for probe in probes[row]])
+            if not len(candidates):
+                continue
+            scores, positions = top_k((self._matrix[candidates] @ query)[np.newaxis], k)
+            all_scores[row, :scores.shape[1]] = scores[0]
+            all_ids[row, :scores.shape[1]] = candidates[positions[0]]
+        if single:
+            found = all_ids[0] >= 0
+            return all_scores[0][found], all_ids[0][found]
+        return all_scores, all_ids
+
+    def clear(self) -> None:
+        super().clear()
+        self._centroids = None
+        self._lists = []
+        self._trained_size = 0
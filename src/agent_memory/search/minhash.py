@@ -0,0 +1,49 @@
+import zlib
+from typing import Optional
+
+import numpy as np
+
+from ..text import extract_keywords
+
+# Hashes are drawn from the universal family (a * x + b) mod p over the Mersenne prime 2^61 - 1. The
+# 32-bit shingle hashes and coefficients keep a * x + b below 2^64, so that it is exact in uint64.
+_PRIME = np.uint64((1 << 61) - 1)
+
+
+class MinHasher:
+    """
+    Estimates the Jaccard similarity of texts from MinHash signatures.
+
+    The shingles of a text are its keywords and pairs of consecutive keywords. Its signature keeps, for
+    each of `num_perm` hash functions, the minimum hash of its shingles. Two signatures agree in a given
+    position with a probability equal to the Jaccard similarity of the shingle sets, so the fraction of
+    agreeing positions estimates it, in time independent of the length of the texts.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 0):
+        """
+        Initializes the MinHasher.
+
+        Args:
+            num_perm: The number of hash functions. The estimates' standard error is about 1 / sqrt(num_perm).
+            seed: The seed of the hash functions. Only signatures made with the same seed are comparable.
+        """
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Returns the signature of the text, or None if it has no shingles."""
+        keywords = extract_keywords(text)
+        shingles = set(keywords)
+        shingles.update(f"{first} {second}" for first, second in zip(keywords, keywords[1:]))
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1)
+
+    @staticmethod
+    def similarity(signature: np.ndarray, signatures: np.ndarray) -> np.ndarray:
+        """Returns the estimated Jaccard similarity of a signature with each row of a matrix of signatures."""
+        return (np.asarray(signatures) == signature).mean(axis=-1)
@@ -0,0 +1,295 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Type
+from .agent import Agent
+from .llms import get_llm
+from .llms.base import BaseLLM
+from .storage import BaseStorage, InMemoryStorage
+from .strategies.background import event_loop_lock
+from .strategies.base import BaseMemory
+
+class _Session:
+    """The bookkeeping of a loaded session."""
+
+    __slots__ = ("agent", "lock", "async_locks", "pins", "deleted", "last_used")
+
+    def __init__(self, agent: Agent):
+        self.agent = agent
+        # Serialize the turns of the session, from threads and from coroutines respectively.
+        self.lock = threading.Lock()
+        self.async_locks: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        # The number of turns using the session. A pinned session is not unloaded. Guarded by the manager's lock.
+        self.pins = 0
+        # Whether `SessionManager.delete` was called during a turn, and the session is deleted when it is unpinned.
+        self.deleted = False
+        self.last_used = time.monotonic()
+
+
+class SessionManager:
+    """
+    Serves many conversations, identified by session ids, from one process.
+
+    All sessions share one LLM client and one memory strategy configuration. Loaded sessions are kept in
+    least recently used order, and when the loaded sessions exceed `max_sessions`, `max_bytes` or
+    `max_tokens`, the least recently used ones are snapshotted to their storage and unloaded. A session
+    that is used again is rehydrated from its storage with `BaseMemory.restore`, without replaying LLM calls.
+
+    A session's usage counts the messages it has been given, in UTF-8 bytes and in tokens. This is an upper
+    bound on what its memory holds, as strategies such as SlidingWindowMemory only keep part of them.
+
+    The caps only bound the memory of the process with a `storage_factory` creating durable storages, such as
+    MemoryMappedLog. The default in-memory storages stay in the process after their session is unloaded, so
+    that it can be rehydrated, and only the live strategy objects are freed.
+
+    Turns of a session are serialized. Use either `chat` or `achat` for a given session, as a turn of one
+    does not wait for a turn of the other.
+    """
+
+    def __init__(self, memory_strategy: Type[BaseMemory], llm: Optional[BaseLLM] = None, max_context_tokens: Optional[int] = None, max_sessions: Optional[int] = None, max_bytes: Optional[int] = None, max_tokens: Optional[int] = None, idle_timeout: Optional[float] = None, storage_factory: Optional[Callable[[str], BaseStorage]] = None, **kwargs: Any):
+        """
+        Initializes the SessionManager.
+
+        Args:
+            memory_strategy: The class of the memory strategy of every session.
+            llm: The LLM client shared by all sessions. Defaults to a client from `get_llm()`.
+            max_context_tokens: An optional token budget for the context sent to the LLM on each turn.
+            max_sessions: The maximum number of loaded sessions.
+            max_bytes: The maximum total usage of the loaded sessions, in bytes.
+            max_tokens: The maximum total usage of the loaded sessions, in tokens.
+            idle_timeout: If given, sessions unused for this many seconds are unloaded whenever the caps are enforced.
+            storage_factory: Creates the storage of a session from its id, e.g.
+                `lambda session_id: MemoryMappedLog(f"sessions/{session_id}")`. Storages are closed when their
+                session is unloaded and created again to rehydrate it. By default, every session gets an
+                `InMemoryStorage` that is kept for the lifetime of the manager, or until the session is deleted.
+            **kwargs: Additional keyword arguments to pass to the memory strategy's constructor.
+        """
+        self.memory_strategy = memory_strategy
+        self.llm = llm if llm is not None else get_llm()
+        self.max_context_tokens = max_context_tokens
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.idle_timeout = idle_timeout
+        self.storage_factory = storage_factory
+        self.memory_kwargs = kwargs
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        # Storages of the sessions without a storage factory, kept while their session is unloaded.
+        self._storages: Dict[str, BaseStorage] = {}
+        # Usage of every known session, loaded or not: {"messages": ..., "bytes": ..., "tokens": ...}.
+        self._usage: Dict[str, Dict[str, int]] = {}
+        self._totals = {"bytes": 0, "tokens": 0}
+        self._counters = {"evictions": 0, "rehydrations": 0}
+        self._lock = threading.RLock()
+
+    def get(self, session_id: str) -> Agent:
+        """Returns the agent of a session, creating or rehydrating the session if it is not loaded."""
+        return self._acquire(session_id).agent
+
+    def chat(self, session_id: str, user_input: str) -> str:
+        """
+        Has a conversation turn in a session.
+
+        Args:
+            session_id: The id of the session.
+            user_input: The user's message.
+
+        Returns:
+            The agent's response.
+        """
+        session = self._acquire(session_id, pin=True)
+        try:
+            with session.lock:
+                response = session.agent.chat(user_input)
+            self._account(session_id, session.agent.memory, [("user", user_input), ("assistant", response)])
+        finally:
+            self._unpin(session_id, session)
+        return response
+
+    async def achat(self, session_id: str, user_input: str) -> str:
+        """Asynchronously has a conversation turn in a session, without blocking the event loop on the LLM."""
+        session = self._acquire(session_id, pin=True)
+        try:
+            async with event_loop_lock(session.async_locks):
+                response = await session.agent.achat(user_input)
+            self._account(session_id, session.agent.memory, [("user", user_input), ("assistant", response)])
+        finally:
+            self._unpin(session_id, session)
+        return response
+
+    def _acquire(self, session_id: str, pin: bool = False) -> _Session:
+        """
+        Returns a loaded session, loading it if needed. With `pin`, the session is pinned under the same lock
+        so that it cannot be unloaded, and its storage closed, before the caller is done with it.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._load(session_id)
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            if pin:
+                session.pins += 1
+            return session
+
+    def _unpin(self, session_id: str, session: _Session) -> None:
+        with self._lock:
+            session.pins -= 1
+            if session.deleted and not session.pins:
+                self.delete(session_id)
+
+    def _load(self, session_id: str) -> _Session:
+        """Creates a session, restoring its memory from its storage if it was unloaded before."""
+        storage = self._storage(session_id)
+        agent = Agent(self.memory_strategy, max_context_tokens=self.max_context_tokens, llm=self.llm, storage=storage, **self.memory_kwargs)
+        if session_id in self._usage:
+            agent.memory.restore()
+            self._counters["rehydrations"] += 1
+        else:
+            # A persistent storage may hold a session from a previous process, whose usage is not known.
+            if len(storage) or storage.load_state("memory") is not None:
+                agent.memory.restore()
+            self._usage[session_id] = {"messages": 0, "bytes": 0, "tokens": 0}
+        session = _Session(agent)
+        self._sessions[session_id] = session
+        usage = self._usage[session_id]
+        self._totals["bytes"] += usage["bytes"]
+        self._totals["tokens"] += usage["tokens"]
+        self._enforce_limits(keep=session_id)
+        return session
+
+    def _storage(self, session_id: str) -> BaseStorage:
+        if self.storage_factory is not None:
+            return self.storage_factory(session_id)
+        storage = self._storages.get(session_id)
+        if storage is None:
+            storage = self._storages[session_id] = InMemoryStorage()
+        return storage
+
+    def _account(self, session_id: str, memory: BaseMemory, messages: List[tuple]) -> None:
+        """Adds the given messages to the usage of a loaded session and enforces the caps."""
+        added_bytes = sum(len(role.encode("utf-8")) + len(content.encode("utf-8")) for role, content in messages)
+        added_tokens = sum(memory.count_tokens(f"{role}: {content}") for role, content in messages)
+        with self._lock:
+            usage = self._usage.get(session_id)
+            if usage is None:
+                return # The session was deleted during the turn.
+            usage["messages"] += len(messages)
+            usage["bytes"] += added_bytes
+            usage["tokens"] += added_tokens
+            if session_id in self._sessions:
+                self._totals["bytes"] += added_bytes
+                self._totals["tokens"] += added_tokens
+            self._enforce_limits(keep=session_id)
+
+    def _over_limits(self) -> bool:
+        return (
+            (self.max_sessions is not None and len(self._sessions) > self.max_sessions)
+            or (self.max_bytes is not None and self._totals["bytes"] > self.max_bytes)
+            or (self.max_tokens is not None and self._totals["tokens"] > self.max_tokens)
+        )
+
+    def _enforce_limits(self, keep: Optional[str] = None) -> None:
+        """Unloads idle sessions, then the least recently used ones while the caps are exceeded. `keep` is never unloaded."""
+        if self.idle_timeout is not None:
+            self.evict_idle(self.idle_timeout, keep=keep)
+        for session_id in list(self._sessions):
+            if not self._over_limits():
+                break
+            if session_id != keep:
+                self.evict(session_id)
+
+    def evict(self, session_id: str) -> bool:
+        """
+        Snapshots a loaded session to its storage and unloads it. Returns False if the session is not loaded
+        or is in the middle of a turn.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.pins:
+                return False
+            memory = session.agent.memory
+            flush = getattr(memory, "flush", None)
+            if flush is not None:
+                flush() # Let background summaries land, so that they are part of the snapshot.
+            memory.snapshot()
+            close = getattr(memory, "close", None)
+            if close is not None:
+                close() # Stop the worker threads of the unloaded strategy.
+            if self.storage_factory is not None:
+                memory.storage.close()
+            del self._sessions[session_id]
+            usage = self._usage[session_id]
+            self._totals["bytes"] -= usage["bytes"]
+            self._totals["tokens"] -= usage["tokens"]
+            self._counters["evictions"] += 1
+            return True
+
+    def evict_idle(self, max_idle: float, keep: Optional[str] = None) -> int:
+        """Unloads the sessions unused for at least `max_idle` seconds. Returns the number of unloaded sessions."""
+        now = time.monotonic()
+        with self._lock:
+            idle = [session_id for session_id, session in self._sessions.items() if session_id != keep and now - session.last_used >= max_idle]
+            return sum(1 for session_id in idle if self.evict(session_id))
+
+    def delete(self, session_id: str) -> None:
+        """
+        Forgets a session and clears its storage. A session in the middle of a turn is deleted when its last
+        turn ends, so that the turn never writes to a cleared memory or a closed storage.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and session.pins:
+                session.deleted = True
+                return
+            self._sessions.pop(session_id, None)
+            usage = self._usage.pop(session_id, None)
+            if session is not None:
+                self._totals["bytes"] -= usage["bytes"]
+                self._totals["tokens"] -= usage["tokens"]
+                session.agent.clear_memory()
+                close = getattr(session.agent.memory, "close", None)
+                if close is not None:
+                    close()
+                storage = session.agent.memory.storage
+            else:
+                storage = self._storage(session_id) if usage is not None else None
+                if storage is not None:
+                    storage.clear()
+            self._storages.pop(session_id, None)
+            if storage is not None and self.storage_factory is not None:
+                storage.close()
+
+    def usage(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Returns the usage of a session ({"messages", "bytes", "tokens", "loaded"}), or without a session id,
+        the aggregate usage: the number of known and loaded sessions, the bytes and tokens of the loaded
+        sessions, and the eviction and rehydration counts.
+        """
+        with self._lock:
+            if session_id is not None:
+                usage = self._usage.get(session_id)
+                if usage is None:
+                    raise KeyError(session_id)
+                return {**usage, "loaded": session_id in self._sessions}
+            return {
+                "sessions": len(self._usage),
+                "loaded_sessions": len(self._sessions),
+                **self._totals,
+                **self._counters,
+            }
+
+    def loaded_sessions(self) -> List[str]:
+        """Returns the ids of the loaded sessions, least recently used first."""
+        with self._lock:
+            return list(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._usage
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._usage)
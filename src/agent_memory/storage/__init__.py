@@ -0,0 +1,4 @@
+from .base import BaseStorage
+from .in_memory import InMemoryStorage
+from .mmap_log import MemoryMappedLog
+from .stored_messages import StoredMessages
@@ -0,0 +1,70 @@
+from abc import ABC, abstractmethod
+from typing import Any, Iterator, Optional
+from ..strategies.message import Message
+
+class BaseStorage(ABC):
+    """
+    Abstract Base Class for the storage backends of memory strategies.
+
+    A storage holds an append-only log of message records, addressed by their position in the log, and
+    named snapshots of state derived from those messages (summaries, indexes, graphs), so that a memory
+    can be restored without replaying every message or LLM call.
+    """
+
+    # Whether the contents outlive the storage object, e.g. on disk, so that another object can read them back.
+    durable = False
+
+    @abstractmethod
+    def append(self, message: Message) -> int:
+        """Appends a message record and returns its position in the log."""
+        pass
+
+    @abstractmethod
+    def get(self, index: int) -> Message:
+        """Returns the message record at the given position."""
+        pass
+
+    @abstractmethod
+    def read(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Message]:
+        """Yields the message records from position `start` up to, but excluding, `stop`."""
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Returns the number of message records."""
+        pass
+
+    @abstractmethod
+    def save_state(self, key: str, state: Any) -> None:
+        """
+        Stores a snapshot of derived state under a key, replacing any previous snapshot.
+
+        Args:
+            key: The name of the snapshot.
+            state: A picklable object.
+        """
+        pass
+
+    @abstractmethod
+    def load_state(self, key: str) -> Optional[Any]:
+        """Returns the snapshot stored under the key, or None if there is none."""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Removes all message records and snapshots."""
+        pass
+
+    def flush(self) -> None:
+        """Makes sure that everything written so far is persisted."""
+        pass
+
+    def close(self) -> None:
+        """Releases the resources held by the storage."""
+        pass
+
+    def __enter__(self) -> "BaseStorage":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,54 @@
+import pickle
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+from .base import BaseStorage
+from ..strategies.message import Message
+
+class InMemoryStorage(BaseStorage):
+    """
+    A storage that keeps everything in process memory. Nothing survives a restart, which makes it
+    useful for tests and for snapshotting a memory to restore it later in the same process.
+    """
+
+    def __init__(self):
+        self._messages: List[Message] = []
+        self._states: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def append(self, message: Message) -> int:
+        with self._lock:
+            self._messages.append(Message(message.role, message.content, timestamp=message.timestamp))
+            return len(self._messages) - 1
+
+    def get(self, index: int) -> Message:
+        with self._lock:
+            return self._copy(index)
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Message]:
+        with self._lock:
+            stop = len(self._messages) if stop is None else min(stop, len(self._messages))
+            messages = [self._copy(index) for index in range(start, stop)]
+        return iter(messages)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def save_state(self, key: str, state: Any) -> None:
+        # Pickled, so that later changes to the live state do not leak into the snapshot.
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._states[key] = data
+
+    def load_state(self, key: str) -> Optional[Any]:
+        with self._lock:
+            data = self._states.get(key)
+        return pickle.loads(data) if data is not None else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._messages = []
+            self._states = {}
+
+    def _copy(self, index: int) -> Message:
+        message = self._messages[index]
+        return Message(message.role, message.content, timestamp=message.timestamp, id=index)
@@ -0,0 +1,190 @@
+import json
+import mmap
+import os
+import pickle
+import struct
+import threading
+import zlib
+from array import array
+from typing import Any, Iterator, Optional
+from .base import BaseStorage
+from ..strategies.message import Message
+
+# Every record is a header of (payload length, CRC-32 of the payload) followed by the JSON payload.
+_HEADER = struct.Struct("<II")
+
+class MemoryMappedLog(BaseStorage):
+    """
+    A persistent storage made of an append-only log of message records, read through a memory map.
+
+    The directory holds:
+        - `messages.log`: the records, each a length and checksum header followed by the message as JSON.
+        - `messages.idx`: the byte offset of every record, as little-endian 64-bit integers, so that any
+          message can be read without scanning the log.
+        - `states/`: one pickle per snapshot, replaced atomically.
+
+    Records are only ever appended, so a crash can at worst leave a partially written last record. It is
+    detected by its checksum and cut off, and the index is repaired, the next time the log is opened.
+    Snapshots are pickles: only open logs from trusted locations.
+    """
+
+    durable = True
+
+    def __init__(self, path: str, sync: bool = False):
+        """
+        Initializes the MemoryMappedLog, creating the directory or recovering an existing log.
+
+        Args:
+            path: The directory of the log.
+            sync: If True, every write is fsynced, so that it survives an operating system crash and not only a process crash.
+        """
+        self.path = path
+        self.sync = sync
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(path, "states"), exist_ok=True)
+        self._log_path = os.path.join(path, "messages.log")
+        self._index_path = os.path.join(path, "messages.idx")
+        self._open()
+
+    def _open(self) -> None:
+        self._log = open(self._log_path, "ab+")
+        self._offsets = array("q")
+        if os.path.exists(self._index_path):
+            with open(self._index_path, "rb") as index_file:
+                data = index_file.read()
+            self._offsets.frombytes(data[:len(data) - len(data) % self._offsets.itemsize])
+        self._map: Optional[mmap.mmap] = None
+        self._recover()
+        self._index = open(self._index_path, "ab")
+
+    def _recover(self) -> None:
+        """Drops index entries and records that were not completely written, and indexes complete records missing from the index."""
+        size = os.path.getsize(self._log_path)
+        offsets = self._offsets
+        # Re-validate from the last indexed record, which may itself have been cut short.
+        while offsets and offsets[-1] >= size:
+            offsets.pop()
+        position = offsets.pop() if offsets else 0
+        self._log.seek(position)
+        data = self._log.read()
+        cursor = 0
+        while cursor + _HEADER.size <= len(data):
+            length, checksum = _HEADER.unpack_from(data, cursor)
+            payload = data[cursor + _HEADER.size:cursor + _HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            offsets.append(position + cursor)
+            cursor += _HEADER.size + length
+        if position + cursor < size:
+            self._log.truncate(position + cursor)
+        self._log.seek(0, os.SEEK_END)
+        self._end = position + cursor
+        # Rewrite the index, which is cheap compared to the log and guarantees that it matches it.
+        temporary_path = self._index_path + ".tmp"
+        with open(temporary_path, "wb") as index_file:
+            offsets.tofile(index_file)
+        os.replace(temporary_path, self._index_path)
+
+    def append(self, message: Message) -> int:
+        data = {"role": message.role, "content": message.content}
+        if message.timestamp is not None:
+            data["timestamp"] = message.timestamp
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            offset = self._end
+            self._log.write(_HEADER.pack(len(payload), zlib.crc32(payload)))
+            self._log.write(payload)
+            self._log.flush()
+            self._index.write(struct.pack("<q", offset))
+            self._index.flush()
+            if self.sync:
+                os.fsync(self._log.fileno())
+                os.fsync(self._index.fileno())
+            self._end = offset + _HEADER.size + len(payload)
+            self._offsets.append(offset)
+            return len(self._offsets) - 1
+
+    def get(self, index: int) -> Message:
+        with self._lock:
+            if not 0 <= index < len(self._offsets):
+                raise IndexError("message index out of range")
+            return self._decode(index)
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Message]:
+        with self._lock:
+            stop = len(self._offsets) if stop is None else min(stop, len(self._offsets))
+        for index in range(max(start, 0), stop):
+            with self._lock:
+                yield self._decode(index)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def _decode(self, index: int) -> Message:
+        offset = self._offsets[index]
+        view = self._mapped(offset + _HEADER.size)
+        length, _ = _HEADER.unpack_from(view, offset)
+        start = offset + _HEADER.size
+        data = json.loads(self._mapped(start + length)[start:start + length])
+        return Message(data["role"], data["content"], timestamp=data.get("timestamp"), id=index)
+
+    def _mapped(self, end: int) -> mmap.mmap:
+        """Returns a memory map of the log covering at least its first `end` bytes, remapping it if the log has grown."""
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._log.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def save_state(self, key: str, state: Any) -> None:
+        path = self._state_path(key)
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as state_file:
+            pickle.dump(state, state_file, protocol=pickle.HIGHEST_PROTOCOL)
+            if self.sync:
+                state_file.flush()
+                os.fsync(state_file.fileno())
+        os.replace(temporary_path, path)
+
+    def load_state(self, key: str) -> Optional[Any]:
+        try:
+            with open(self._state_path(key), "rb") as state_file:
+                return pickle.load(state_file)
+        except FileNotFoundError:
+            return None
+
+    def _state_path(self, key: str) -> str:
+        if not key or os.sep in key or (os.altsep and os.altsep in key) or key.startswith("."):
+            raise ValueError(f"Invalid snapshot key: {key!r}")
+        return os.path.join(self.path, "states", f"{key}.pkl")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._close_files()
+            for path in (self._log_path, self._index_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            states = os.path.join(self.path, "states")
+            for name in os.listdir(states):
+                os.remove(os.path.join(states, name))
+            self._open()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._log.flush()
+            self._index.flush()
+            os.fsync(self._log.fileno())
+            os.fsync(self._index.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_files()
+
+    def _close_files(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if not self._log.closed:
+            self._log.close()
+        if not self._index.closed:
+            self._index.close()
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Iterator, List, Union
+from .base import BaseStorage
+from ..strategies.message import Message
+
+class StoredMessages(Sequence):
+    """
+    A read-only, list-like view of the message log of a storage.
+
+    Messages are read from the storage when they are accessed, and the most recently accessed ones are
+    kept in a small cache, so that a strategy can page in the part of a long history it needs (typically
+    the most recent messages) without holding the whole history in memory. Cached messages also keep
+    their token counts between calls.
+    """
+
+    def __init__(self, storage: BaseStorage, cache_size: int = 1024):
+        """
+        Initializes the StoredMessages.
+
+        Args:
+            storage: The storage whose message log to expose.
+            cache_size: The number of decoded messages to keep in memory.
+        """
+        self.storage = storage
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[int, Message]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.storage)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Message, List[Message]]:
+        length = len(self.storage)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(length)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return list(self.storage.read(start, stop)) if start < stop else []
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("message index out of range")
+        message = self._cache.get(index)
+        if message is None:
+            message = self.storage.get(index)
+            self._cache[index] = message
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(index)
+        return message
+
+    def __iter__(self) -> Iterator[Message]:
+        return self.storage.read()
+
+    def __reversed__(self) -> Iterator[Message]:
+        for index in range(len(self.storage) - 1, -1, -1):
+            yield self[index]
+
+    def clear_cache(self) -> None:
+        """Drops the cached messages, e.g. after the storage was cleared."""
+        self._cache.clear()
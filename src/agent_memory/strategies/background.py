@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+def event_loop_lock(locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]") -> asyncio.Lock:
+    """
+    Returns the lock of the running event loop from `locks`, creating it on first use. An asyncio.Lock
+    belongs to one event loop, so an object used from several loops, e.g. by successive `asyncio.run`
+    calls, needs one lock per loop.
+    """
+    loop = asyncio.get_running_loop()
+    lock = locks.get(loop)
+    if lock is None:
+        lock = locks[loop] = asyncio.Lock()
+    return lock
+
+class BackgroundWorker:
+    """
+    Runs jobs off the caller's critical path on a single worker thread, in submission order.
+
+    At most `max_pending` jobs can be queued or running at once. Submitting more blocks the caller
+    until a slot frees up, which bounds both the backlog and the memory held by pending jobs.
+    """
+
+    def __init__(self, max_pending: int = 4):
+        """
+        Initializes the BackgroundWorker.
+
+        Args:
+            max_pending: The maximum number of jobs that can be queued or running at once.
+        """
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1.")
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._futures: Set[Future] = set()
+        self._errors: List[BaseException] = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Queues a job, blocking while `max_pending` jobs are already queued."""
+        self._slots.acquire()
+        return self._submit(fn, *args)
+
+    async def asubmit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Queues a job, waiting without blocking the event loop while the queue is full."""
+        await asyncio.to_thread(self._slots.acquire)
+        return self._submit(fn, *args)
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-memory-background")
+            future = self._executor.submit(self._run, fn, args)
+            self._futures.add(future)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _run(self, fn: Callable[..., Any], args: Tuple[Any, ...]) -> Any:
+        try:
+            return fn(*args)
+        except Exception as e:
+            # Recorded before the future completes, so that a flush waiting on it always sees the error.
+            with self._lock:
+                self._errors.append(e)
+            raise
+
+    def _on_done(self, future: Future) -> None:
+        with self._lock:
+            self._futures.discard(future)
+        self._slots.release()
+
+    @property
+    def pending(self) -> int:
+        """The number of jobs that are queued or running."""
+        with self._lock:
+            return sum(1 for future in self._futures if not future.done())
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        Waits until every job submitted so far has finished.
+        Re-raises the first exception raised by a job since the last flush.
+        """
+        with self._lock:
+            futures = list(self._futures)
+        _, not_done = wait(futures, timeout=timeout)
+        if not_done:
+            raise TimeoutError(f"{len(not_done)} background job(s) still pending after {timeout} seconds.")
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+
+    async def aflush(self, timeout: Optional[float] = None) -> None:
+        """Asynchronously waits until every job submitted so far has finished."""
+        await asyncio.to_thread(self.flush, timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops the worker thread, optionally waiting for pending jobs. A job submitted later starts a new thread."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -1,9 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, TYPE_CHECKING, Any
+from itertools import islice
+from typing import List, Dict, Iterable, Iterator, Optional, Sequence, TYPE_CHECKING, Any
+from .message import Message
+from ..instrumentation import instrument_class, instrumentation
+from ..tokenizers import BaseTokenCounter, get_default_token_counter
 
 # Forward declaration to avoid circular import
 if TYPE_CHECKING:
     from agent_memory.llms.base import BaseLLM
+    from agent_memory.storage import BaseStorage
 
 class BaseMemory(ABC):
     """
@@ -11,10 +16,26 @@ class BaseMemory(ABC):
 
     This class defines the standard interface that all memory strategies must implement.
     This ensures that all memory strategies are interchangeable and can be used by the Agent class.
+
+    A strategy given a storage records every message in the storage's log. `snapshot` saves the
+    strategy's derived state next to it, and `restore` loads that snapshot and replays only the messages
+    recorded after it, so that a session resumes without re-running the LLM calls that built the state.
+
+    Strategies that select their context by relevance to a query set `supports_query`, and their
+    `get_context` accepts a `query` argument. The Agent passes them the user's message.
     """
 
-    def __init__(self, llm: Optional["BaseLLM"] = None):
+    supports_query = False
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        instrument_class(cls, "memory", _INSTRUMENTED_METHODS, "strategy")
+
+    def __init__(self, llm: Optional["BaseLLM"] = None, token_counter: Optional[BaseTokenCounter] = None, storage: Optional["BaseStorage"] = None):
         self.llm = llm
+        self._token_counter = token_counter
+        self.storage = storage
+        self._restoring = False
 
     @abstractmethod
     def add_message(self, role: str, content: str) -> None:
@@ -22,11 +43,166 @@ class BaseMemory(ABC):
         pass
 
     @abstractmethod
-    def get_context(self) -> str:
-        """Retrieves the context from the memory."""
+    def get_context(self, max_tokens: Optional[int] = None) -> str:
+        """
+        Retrieves the context from the memory.
+
+        Args:
+            max_tokens: An optional token budget. Strategies trim or select content so that
+                the returned context fits within it.
+        """
         pass
 
     @abstractmethod
     def clear(self) -> None:
         """Clears the memory."""
-        pass
\ No newline at end of file
+        pass
+
+    async def aadd_message(self, role: str, content: str) -> None:
+        """
+        Asynchronously adds a message to the memory.
+        Strategies that call the LLM while adding messages override this to await the LLM instead of blocking.
+        """
+        self.add_message(role, content)
+
+    async def aget_context(self, **kwargs: Any) -> str:
+        """
+        Asynchronously retrieves the context from the memory.
+        Strategies that call the LLM while building the context override this to await the LLM instead of blocking.
+        """
+        return self.get_context(**kwargs)
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Returns the state of the strategy to snapshot, as a picklable dict.
+        Strategies without one return an empty dict, and are rebuilt by replaying their messages.
+        """
+        return {}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """Restores a state returned by `get_state`."""
+        pass
+
+    def snapshot(self) -> None:
+        """
+        Saves the state of the strategy to its storage, together with the number of messages it covers.
+        Strategies summarizing in the background snapshot the messages still waiting for their summary as raw messages.
+        """
+        storage = self._require_storage()
+        storage.save_state("memory", {"strategy": type(self).__name__, "position": len(storage), "state": self.get_state()})
+        storage.flush()
+
+    def restore(self) -> int:
+        """
+        Restores the memory from its storage: loads the latest snapshot, if any, and replays the messages
+        recorded after it. Returns the number of replayed messages.
+        """
+        storage = self._require_storage()
+        snapshot = storage.load_state("memory")
+        if snapshot is not None and snapshot["strategy"] != type(self).__name__:
+            raise ValueError(f"The storage holds a snapshot of {snapshot['strategy']}, not of {type(self).__name__}.")
+        self._restoring = True
+        try:
+            self.clear()
+            position = 0
+            if snapshot is not None:
+                self.set_state(snapshot["state"])
+                position = snapshot["position"]
+            return self._replay(storage.read(position))
+        finally:
+            self._restoring = False
+
+    def _replay(self, messages: Iterator[Message]) -> int:
+        """Adds the messages recorded after the snapshot back to the memory. Returns their number."""
+        count = 0
+        for message in messages:
+            self.add_message(message.role, message.content)
+            count += 1
+        return count
+
+    def _record(self, message: Message) -> Message:
+        """Appends a new message to the storage's log, if the strategy has a storage, and returns it."""
+        if self.storage is not None and not self._restoring:
+            message.id = self.storage.append(message)
+        return message
+
+    def _clear_storage(self) -> None:
+        """Clears the storage when the memory is cleared, unless the memory is being restored from it."""
+        if self.storage is not None and not self._restoring:
+            self.storage.clear()
+
+    def _require_storage(self) -> "BaseStorage":
+        if self.storage is None:
+            raise ValueError(f"{type(self).__name__} has no storage.")
+        return self.storage
+
+    @property
+    def token_counter(self) -> BaseTokenCounter:
+        """The token counter used to fit the context into a token budget."""
+        return getattr(self, "_token_counter", None) or get_default_token_counter()
+
+    @token_counter.setter
+    def token_counter(self, token_counter: Optional[BaseTokenCounter]) -> None:
+        self._token_counter = token_counter
+
+    def count_tokens(self, text: str) -> int:
+        """Returns the number of tokens in the text."""
+        return self.token_counter.count(text)
+
+    def _message_tokens(self, message: Message) -> int:
+        """Returns the number of tokens in a formatted message, caching the count on the message."""
+        tokens = message.token_count
+        if tokens is None:
+            tokens = self.token_counter.count(message.format())
+            message.token_count = tokens
+        return tokens
+
+    def _fit_messages(self, messages: Sequence[Message], max_tokens: Optional[int]) -> List[Message]:
+        """Returns the most recent messages whose newline-joined formatted lines fit within `max_tokens`."""
+        if max_tokens is None:
+            return list(messages)
+        count = self._fitting_count(reversed(messages), max_tokens)
+        return list(islice(messages, len(messages) - count, None))
+
+    def _fitting_count(self, newest_first: Iterable[Message], max_tokens: int) -> int:
+        """Returns how many of the most recent messages fit within `max_tokens`, given the messages newest first."""
+        total = 0
+        count = 0
+        for message in newest_first:
+            # Each line after the first also costs a newline separator.
+            tokens = self._message_tokens(message) + (1 if count else 0)
+            if total + tokens > max_tokens:
+                break
+            total += tokens
+            count += 1
+        return count
+
+    def _messages_tokens(self, messages: Sequence[Message]) -> int:
+        """Returns the number of tokens of the newline-joined formatted messages."""
+        if not messages:
+            return 0
+        return sum(self._message_tokens(message) for message in messages) + len(messages) - 1
+
+    def _truncate(self, text: str, max_tokens: Optional[int], from_end: bool = False) -> str:
+        """Truncates the text to the token budget, if there is one."""
+        if max_tokens is None:
+            return text
+        return self.token_counter.truncate(text, max_tokens, from_end=from_end)
+
+
+def _record_context_size(memory: BaseMemory, context: str) -> None:
+    instrumentation.gauge("memory.context_chars", len(context), strategy=type(memory).__name__)
+    instrumentation.gauge("memory.context_tokens", memory.count_tokens(context), strategy=type(memory).__name__)
+
+
+# The methods timed as `memory.<method>` spans, with their hooks.
+_INSTRUMENTED_METHODS = {
+    "add_message": {},
+    "aadd_message": {},
+    "get_context": {"after": _record_context_size},
+    "aget_context": {"after": _record_context_size},
+    "clear": {},
+    "snapshot": {},
+    "restore": {},
+}
+instrument_class(BaseMemory, "memory", _INSTRUMENTED_METHODS, "strategy")
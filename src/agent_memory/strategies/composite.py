@@ -0,0 +1,275 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Union, TYPE_CHECKING
+from .base import BaseMemory
+from .message import Message
+from ..instrumentation import instrumentation
+from ..tokenizers import BaseTokenCounter
+
+if TYPE_CHECKING:
+    from agent_memory.llms.base import BaseLLM
+    from agent_memory.storage import BaseStorage
+
+# A child strategy, or a factory called with the composite's `llm` to create one, e.g. a strategy class.
+ChildSpec = Union[BaseMemory, Callable[..., BaseMemory]]
+
+class CompositeMemory(BaseMemory):
+    """
+    A memory strategy combining several child strategies, e.g. a sliding window for recency, retrieval for
+    relevant facts and a hierarchical summary for the gist of the conversation.
+
+    Messages are forwarded to every child, and contexts are gathered from every child, concurrently. Each
+    child has its own worker thread, so that its operations run in the order they were issued while the
+    children's LLM and embedding calls overlap. A child that misses its timeout is skipped for the turn
+    instead of stalling it, and its work carries on in the background.
+
+    The contexts are merged in the order of the children: lines already contributed by an earlier child
+    are dropped, and every child only gets its share of the token budget. Children supporting a query
+    are passed the query.
+
+    The async methods run the children's own async methods on the event loop instead of the worker
+    threads. Use either the sync or the async methods of a given instance.
+    """
+
+    supports_query = True
+
+    def __init__(self, strategies: Union[Mapping[str, ChildSpec], Sequence[ChildSpec]], llm: Optional["BaseLLM"] = None, timeout: Union[float, Dict[str, float], None] = None, budgets: Optional[Dict[str, float]] = None, token_counter: Optional[BaseTokenCounter] = None, storage: Optional["BaseStorage"] = None):
+        """
+        Initializes the CompositeMemory.
+
+        Args:
+            strategies: The child strategies by name, or a list of them named by their class. Each one is either
+                a strategy or a factory called with `llm=llm`, e.g. `functools.partial(SlidingWindowMemory, window_size=4)`.
+            llm: An optional instance of a class conforming to BaseLLM, passed to the child factories.
+            timeout: An optional timeout in seconds for every child operation, or a timeout per child name.
+                Children without one are always waited for.
+            budgets: Optional relative shares of the token budget by child name. Defaults to equal shares.
+            token_counter: An optional token counter used to fit the context into a token budget.
+            storage: An optional storage recording every message. The children should not have storages of their own.
+        """
+        super().__init__(llm=llm, token_counter=token_counter, storage=storage)
+        if not isinstance(strategies, Mapping):
+            strategies = _name_strategies(strategies)
+        if not strategies:
+            raise ValueError("CompositeMemory needs at least one strategy.")
+        self.children: Dict[str, BaseMemory] = {
+            name: spec if isinstance(spec, BaseMemory) else spec(llm=llm) for name, spec in strategies.items()
+        }
+        if token_counter is not None:
+            for child in self.children.values():
+                if getattr(child, "_token_counter", None) is None:
+                    child.token_counter = token_counter
+        self.timeout = timeout
+        self.budgets = budgets
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._futures: Dict[str, Future] = {}
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self._errors: List[BaseException] = []
+        self._lock = threading.Lock()
+
+    def _timeout(self, name: str) -> Optional[float]:
+        if isinstance(self.timeout, dict):
+            return self.timeout.get(name)
+        return self.timeout
+
+    def _budgets(self, max_tokens: Optional[int]) -> Dict[str, Optional[int]]:
+        """Splits the token budget between the children by their shares."""
+        if max_tokens is None:
+            return {name: None for name in self.children}
+        shares = {name: (self.budgets or {}).get(name, 1.0 if self.budgets is None else 0.0) for name in self.children}
+        total = sum(shares.values()) or 1.0
+        # Every section after the first also costs a newline separator.
+        available = max(0, max_tokens - (len(self.children) - 1))
+        return {name: int(available * share / total) for name, share in shares.items()}
+
+    # Sync fan-out on one worker thread per child.
+
+    def _submit(self, name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        with self._lock:
+            executor = self._executors.get(name)
+            if executor is None:
+                executor = self._executors[name] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"agent-memory-{name}")
+            future = executor.submit(fn, *args, **kwargs)
+            self._futures[name] = future
+        return future
+
+    def _gather(self, futures: Dict[str, Future], operation: str) -> Dict[str, Any]:
+        """
+        Waits for every child until its timeout, and returns the results of the children that finished.
+        Re-raises the first exception of a finished child. Children that time out are counted and skipped.
+        """
+        start = time.monotonic()
+        results = {}
+        for name, future in futures.items():
+            timeout = self._timeout(name)
+            remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - start))
+            done, _ = wait([future], timeout=remaining)
+            if done:
+                results[name] = future.result()
+            else:
+                instrumentation.count("memory.composite.timeouts", child=name, operation=operation)
+                future.add_done_callback(self._record_late_error)
+        return results
+
+    def _record_late_error(self, future: Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            with self._lock:
+                self._errors.append(future.exception())
+
+    def add_message(self, role: str, content: str) -> None:
+        """Adds a message to the memory and to every child, concurrently."""
+        message = self._record(Message(role, content))
+        self._gather({name: self._submit(name, child.add_message, message.role, message.content) for name, child in self.children.items()}, "add_message")
+
+    def get_context(self, query: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
+        """
+        Gathers the contexts of the children concurrently and merges them.
+
+        Args:
+            query: An optional query, passed to the children supporting one.
+            max_tokens: An optional token budget, split between the children by their shares.
+        """
+        budgets = self._budgets(max_tokens)
+        futures = {name: self._submit(name, child.get_context, **self._child_kwargs(child, query, budgets[name])) for name, child in self.children.items()}
+        return self._merge(self._gather(futures, "get_context"), max_tokens)
+
+    # Async fan-out on the event loop.
+
+    def _chain(self, name: str, make: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """Schedules a child operation after the child's previous one, so that a child's operations keep their order."""
+        previous = self._tasks.get(name)
+
+        async def run() -> Any:
+            if previous is not None and not previous.done():
+                await asyncio.wait([previous])
+            return await make()
+
+        task = self._tasks[name] = asyncio.ensure_future(run())
+        return task
+
+    async def _agather(self, tasks: Dict[str, asyncio.Future], operation: str) -> Dict[str, Any]:
+        """Asynchronous counterpart of `_gather`. Timed out operations are not cancelled."""
+        start = time.monotonic()
+        results = {}
+        for name, task in tasks.items():
+            timeout = self._timeout(name)
+            remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - start))
+            done, _ = await asyncio.wait([task], timeout=remaining)
+            if done:
+                results[name] = task.result()
+            else:
+                instrumentation.count("memory.composite.timeouts", child=name, operation=operation)
+                task.add_done_callback(self._record_late_error)
+        return results
+
+    async def aadd_message(self, role: str, content: str) -> None:
+        """Asynchronously adds a message to the memory and to every child, concurrently."""
+        message = self._record(Message(role, content))
+        tasks = {name: self._chain(name, lambda child=child: child.aadd_message(message.role, message.content)) for name, child in self.children.items()}
+        await self._agather(tasks, "add_message")
+
+    async def aget_context(self, query: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
+        """Asynchronously gathers the contexts of the children concurrently and merges them."""
+        budgets = self._budgets(max_tokens)
+        tasks = {
+            name: self._chain(name, lambda child=child, budget=budgets[name]: child.aget_context(**self._child_kwargs(child, query, budget)))
+            for name, child in self.children.items()
+        }
+        return self._merge(await self._agather(tasks, "get_context"), max_tokens)
+
+    @staticmethod
+    def _child_kwargs(child: BaseMemory, query: Optional[str], max_tokens: Optional[int]) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"max_tokens": max_tokens}
+        if query and child.supports_query:
+            kwargs["query"] = query
+        return kwargs
+
+    def _merge(self, contexts: Dict[str, str], max_tokens: Optional[int]) -> str:
+        """
+        Joins the contexts in the order of the children, dropping lines that an earlier child already contributed.
+        Lines repeated within a child's own context are kept, as they may be distinct messages.
+        """
+        seen = set()
+        lines = []
+        for name in self.children:
+            child_lines = [(line, " ".join(line.split()).lower()) for line in contexts.get(name, "").split("\n")]
+            lines.extend(line for line, key in child_lines if key and key not in seen)
+            seen.update(key for _, key in child_lines)
+        return self._truncate("\n".join(lines), max_tokens)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        Waits until the children have finished every operation issued so far, including timed out ones,
+        and their own background work. Re-raises the first exception of a timed out operation.
+        """
+        self._wait_pending(timeout)
+        for child in self.children.values():
+            flush = getattr(child, "flush", None)
+            if flush is not None:
+                flush(timeout)
+        self._raise_late_errors()
+
+    def _wait_pending(self, timeout: Optional[float] = None) -> None:
+        """Waits until the children have finished every sync operation issued so far."""
+        with self._lock:
+            futures = list(self._futures.values())
+        _, not_done = wait(futures, timeout=timeout)
+        if not_done:
+            raise TimeoutError(f"{len(not_done)} child operation(s) still pending after {timeout} seconds.")
+
+    async def aflush(self, timeout: Optional[float] = None) -> None:
+        """Asynchronously waits until the children have finished every operation issued so far."""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        if tasks:
+            _, not_done = await asyncio.wait(tasks, timeout=timeout)
+            if not_done:
+                raise TimeoutError(f"{len(not_done)} child operation(s) still pending after {timeout} seconds.")
+        for child in self.children.values():
+            aflush = getattr(child, "aflush", None)
+            if aflush is not None:
+                await aflush(timeout)
+        self._raise_late_errors()
+
+    def _raise_late_errors(self) -> None:
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        """Waits for pending child operations and stops the worker threads, including the children's own."""
+        with self._lock:
+            executors, self._executors = list(self._executors.values()), {}
+        for executor in executors:
+            executor.shutdown(wait=True)
+        for child in self.children.values():
+            close = getattr(child, "close", None)
+            if close is not None:
+                close()
+
+    def get_state(self) -> Dict[str, Any]:
+        self._wait_pending()
+        return {"children": {name: child.get_state() for name, child in self.children.items()}}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        for name, child_state in state["children"].items():
+            if name in self.children:
+                self.children[name].set_state(child_state)
+
+    def clear(self) -> None:
+        """Clears the memory and every child, once their pending operations have finished."""
+        self._wait_pending()
+        self._clear_storage()
+        for child in self.children.values():
+            child.clear()
+
+
+def _name_strategies(specs: Sequence[ChildSpec]) -> Dict[str, ChildSpec]:
+    """Names the child strategies by their class, suffixing the names shared by several children with their position."""
+    names = []
+    for spec in specs:
+        factory = spec if not isinstance(spec, BaseMemory) else type(spec)
+        names.append(getattr(factory, "__name__", None) or getattr(getattr(factory, "func", None), "__name__", "strategy"))
+    return {name if names.count(name) == 1 else f"{name}_{i}": spec for i, (name, spec) in enumerate(zip(names, specs))}
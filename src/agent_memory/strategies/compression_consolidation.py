@@ -1,46 +1,278 @@
-from typing import List, Dict, TYPE_CHECKING
+import threading
+import weakref
+from typing import Any, List, Dict, Optional, TYPE_CHECKING
+from .background import BackgroundWorker, event_loop_lock
 from .base import BaseMemory
+from .message import Message
+from ..instrumentation import instrumentation
+from ..tokenizers import BaseTokenCounter
 
 if TYPE_CHECKING:
     from agent_memory.llms.base import BaseLLM
+    from agent_memory.storage import BaseStorage
 
 class CompressionConsolidationMemory(BaseMemory):
     """
     A memory strategy that compresses older information or consolidates redundant entries.
     This implementation uses summarization for compression.
+
+    With a `consolidation_threshold`, every new compressed entry is compared with the existing ones by
+    MinHash, and the entries it nearly duplicates or overlaps are merged with it into a single entry, with
+    one LLM call per cluster. With `max_compressed_tokens`, the oldest entries are merged together whenever
+    the compressed memory exceeds the cap, so that it stays bounded however long the session runs.
     """
 
-    def __init__(self, llm: "BaseLLM", compression_threshold: int = 5, compression_prompt: str = "Summarize the following conversation, focusing on key information and removing redundancy:"):
-        super().__init__(llm=llm)
-        self.history: List[Dict[str, str]] = []
+    def __init__(self, llm: "BaseLLM", compression_threshold: int = 5, compression_prompt: str = "Summarize the following conversation, focusing on key information and removing redundancy:", background: bool = False, max_pending_jobs: int = 4, token_counter: Optional[BaseTokenCounter] = None, storage: Optional["BaseStorage"] = None, consolidation_threshold: Optional[float] = None, max_compressed_tokens: Optional[int] = None, consolidation_prompt: str = "Merge the following notes into a single note, keeping every distinct fact and removing repetition:"):
+        """
+        Initializes the CompressionConsolidationMemory.
+
+        Args:
+            llm: An instance of a class conforming to BaseLLM.
+            compression_threshold: The number of messages that triggers a compression.
+            compression_prompt: The prompt used to compress the history.
+            background: If True, compression runs on a background worker instead of blocking `add_message`.
+                Messages waiting to be compressed are served raw by `get_context` until their summary lands.
+            max_pending_jobs: The maximum number of queued background compressions. `add_message` blocks
+                while the queue is full.
+            token_counter: An optional token counter used to fit the context into a token budget.
+            storage: An optional storage recording every message. Snapshots keep the summaries, so that they are not recomputed on restore.
+            consolidation_threshold: If given, the estimated Jaccard similarity of their keywords from which a
+                new compressed entry is merged with an existing one, e.g. 0.3.
+            max_compressed_tokens: If given, a cap on the tokens of the compressed memory, kept by merging the oldest entries.
+            consolidation_prompt: The prompt used to merge compressed entries.
+        """
+        super().__init__(llm=llm, token_counter=token_counter, storage=storage)
+        self.history: List[Message] = []
         self.compressed_memory: List[str] = []
+        self.consolidation_threshold = consolidation_threshold
+        self.max_compressed_tokens = max_compressed_tokens
+        self.consolidation_prompt = consolidation_prompt
+        self._minhasher = None
+        if consolidation_threshold is not None:
+            from ..search import MinHasher
+            self._minhasher = MinHasher()
+        # The MinHash signature and token count of every compressed entry, computed when the entry is stored.
+        self._signatures: List[Any] = []
+        self._entry_tokens: List[int] = []
         self.compression_threshold = compression_threshold
         self.compression_prompt = compression_prompt
         self.llm = llm
+        self.background = background
+        self._worker: Optional[BackgroundWorker] = BackgroundWorker(max_pending_jobs) if background else None
+        # Segments of messages handed to the background worker, oldest first.
+        self._pending: List[List[Message]] = []
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Serializes async compressions, so that their entries land in order.
+        self._async_locks: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
 
     def add_message(self, role: str, content: str) -> None:
         """Adds a message to the history and triggers compression if the threshold is met."""
-        self.history.append({"role": role, "content": content})
+        self.history.append(self._record(Message(role, content)))
+        if len(self.history) >= self.compression_threshold:
+            if self._worker is not None:
+                self._worker.submit(self._compress_in_background, self._detach_segment(), self._generation)
+            else:
+                self._compress_and_consolidate()
+
+    async def aadd_message(self, role: str, content: str) -> None:
+        """Asynchronously adds a message, awaiting the LLM if compression is triggered."""
+        self.history.append(self._record(Message(role, content)))
         if len(self.history) >= self.compression_threshold:
-            self._compress_and_consolidate()
+            if self._worker is not None:
+                await self._worker.asubmit(self._compress_in_background, self._detach_segment(), self._generation)
+            else:
+                await self._acompress_and_consolidate()
 
     def _compress_and_consolidate(self) -> None:
         """
         Compresses the current history into a summary and adds it to compressed memory.
         Then clears the current history.
         """
-        conversation_to_compress = "\n".join([f"{msg['role']}: {msg['content']}" for msg in self.history])
-        prompt = f"{self.compression_prompt}\n\n{conversation_to_compress}"
-        compressed_summary = self.llm.invoke(prompt).content
-        self.compressed_memory.append(compressed_summary)
-        self.history = [] # Clear history after compression
+        messages_to_compress = self.history[:]
+        compressed_summary = self.llm.invoke(self._build_prompt(messages_to_compress)).content
+        self._store_entry(compressed_summary)
+        # Clear the compressed messages, keeping any that were added while awaiting the LLM.
+        del self.history[:len(messages_to_compress)]
+        self._consolidate()
+
+    async def _acompress_and_consolidate(self) -> None:
+        """
+        Asynchronous counterpart of `_compress_and_consolidate`. The segment leaves the history before the LLM
+        is awaited, so that concurrent calls never compress the same messages, and is served raw until then.
+        """
+        segment = self._detach_segment()
+        generation = self._generation
+        async with event_loop_lock(self._async_locks):
+            compressed_summary = (await self.llm.ainvoke(self._build_prompt(segment))).content
+            with self._lock:
+                if generation != self._generation:
+                    return # The memory was cleared while this segment was being compressed.
+                self._store_entry(compressed_summary)
+                self._pending = [pending for pending in self._pending if pending is not segment]
+            await self._aconsolidate(generation)
+
+    def _detach_segment(self) -> List[Message]:
+        """Moves the current history into the pending segments and returns it."""
+        segment = self.history
+        self.history = []
+        with self._lock:
+            self._pending.append(segment)
+        return segment
+
+    def _compress_in_background(self, segment: List[Message], generation: int) -> None:
+        """Compresses a pending segment on the background worker and swaps the summary in for it."""
+        compressed_summary = self.llm.invoke(self._build_prompt(segment)).content
+        with self._lock:
+            if generation != self._generation:
+                return # The memory was cleared while this segment was being compressed.
+            self._store_entry(compressed_summary)
+            self._pending = [pending for pending in self._pending if pending is not segment]
+        self._consolidate(generation)
+
+    def _store_entry(self, entry: str) -> None:
+        """Appends an entry to the compressed memory."""
+        self.compressed_memory.append(entry)
+        self._signatures.append(self._minhasher.signature(entry) if self._minhasher is not None else None)
+        self._entry_tokens.append(self.count_tokens(entry))
+
+    def _next_merge(self) -> Optional[List[int]]:
+        """
+        Returns the indices of the next compressed entries to merge, if any: the entries that the newest
+        entry nearly duplicates together with it, or else the two oldest entries while the cap is exceeded.
+        The newest entry is never merged for the cap, so that a roll-up of older entries cannot crowd it out.
+        """
+        if self._minhasher is not None and len(self.compressed_memory) > 1 and self._signatures[-1] is not None:
+            import numpy as np
+
+            candidates = [i for i, signature in enumerate(self._signatures[:-1]) if signature is not None]
+            if candidates:
+                similarity = self._minhasher.similarity(self._signatures[-1], np.stack([self._signatures[i] for i in candidates]))
+                cluster = [i for i, score in zip(candidates, similarity) if score >= self.consolidation_threshold]
+                if cluster:
+                    return cluster + [len(self.compressed_memory) - 1]
+        if len(self.compressed_memory) > 2 and self._over_cap():
+            return [0, 1]
+        return None
+
+    def _over_cap(self) -> bool:
+        if self.max_compressed_tokens is None or not self._entry_tokens:
+            return False
+        return sum(self._entry_tokens) + len(self._entry_tokens) - 1 > self.max_compressed_tokens
+
+    def _replace_entries(self, indices: List[int], merged: str) -> None:
+        """Replaces the entries at the indices with their merged entry, in place of the newest of them."""
+        position = indices[-1] - (len(indices) - 1)
+        for i in reversed(indices):
+            del self.compressed_memory[i], self._signatures[i], self._entry_tokens[i]
+        self._insert_entry(position, merged)
+        instrumentation.count("memory.consolidations", strategy=type(self).__name__)
+
+    def _insert_entry(self, position: int, entry: str) -> None:
+        self.compressed_memory.insert(position, entry)
+        self._signatures.insert(position, self._minhasher.signature(entry) if self._minhasher is not None else None)
+        self._entry_tokens.insert(position, self.count_tokens(entry))
+
+    def _fit_cap(self) -> None:
+        """
+        Truncates the oldest entries, dropping those left without room, while the compressed memory exceeds
+        the cap after merging. This happens when merged entries do not shrink enough.
+        """
+        while self._over_cap():
+            others = self._entry_tokens[1:]
+            # The room left for the oldest entry, with a newline separator before each of the others.
+            room = self.max_compressed_tokens - sum(others) - len(others)
+            entry = self.compressed_memory.pop(0)
+            del self._signatures[0], self._entry_tokens[0]
+            if room > 0:
+                # A roll-up of older entries keeps its most recent part, and a single entry its start.
+                truncated = self.token_counter.truncate(entry, room, from_end=bool(others))
+                # Decoding a token slice cut inside a character can re-encode to more tokens. Such an entry is
+                # dropped instead of truncated again to the same room forever.
+                if self.count_tokens(truncated) <= room:
+                    self._insert_entry(0, truncated)
 
-    def get_context(self) -> str:
+    def _consolidate(self, generation: Optional[int] = None) -> None:
+        """
+        Merges compressed entries until none is a near duplicate of the newest one and the cap is met.
+        Every merge makes one LLM call and leaves one entry fewer, so this terminates. On the background
+        worker, the LLM is called without holding the lock, and merges are dropped if the memory was cleared.
+        """
+        while True:
+            with self._lock:
+                if generation is not None and generation != self._generation:
+                    return
+                indices = self._next_merge()
+                if indices is None:
+                    self._fit_cap()
+                    return
+                entries = [self.compressed_memory[i] for i in indices]
+            merged = self.llm.invoke(self._build_merge_prompt(entries)).content
+            with self._lock:
+                if generation is not None and generation != self._generation:
+                    return
+                self._replace_entries(indices, merged)
+
+    async def _aconsolidate(self, generation: int) -> None:
+        """Asynchronous counterpart of `_consolidate`, called while holding the async lock."""
+        while True:
+            with self._lock:
+                if generation != self._generation:
+                    return
+                indices = self._next_merge()
+                if indices is None:
+                    self._fit_cap()
+                    return
+                entries = [self.compressed_memory[i] for i in indices]
+            merged = (await self.llm.ainvoke(self._build_merge_prompt(entries))).content
+            with self._lock:
+                if generation != self._generation:
+                    return
+                self._replace_entries(indices, merged)
+
+    def _build_merge_prompt(self, entries: List[str]) -> str:
+        """Builds the prompt merging the given compressed entries into one."""
+        notes = "\n\n".join(f"Note {i + 1}:\n{entry}" for i, entry in enumerate(entries))
+        return f"{self.consolidation_prompt}\n\n{notes}"
+
+    def _build_prompt(self, messages: List[Message]) -> str:
+        """Builds the compression prompt for the given messages."""
+        conversation_to_compress = "\n".join([msg.format() for msg in messages])
+        return f"{self.compression_prompt}\n\n{conversation_to_compress}"
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Waits until all pending background compressions have landed in compressed memory."""
+        if self._worker is not None:
+            self._worker.flush(timeout)
+
+    async def aflush(self, timeout: Optional[float] = None) -> None:
+        """Asynchronously waits until all pending background compressions have landed."""
+        if self._worker is not None:
+            await self._worker.aflush(timeout)
+
+    def close(self) -> None:
+        """Waits for pending background compressions and stops the worker thread."""
+        if self._worker is not None:
+            self._worker.shutdown(wait=True)
+
+    def get_context(self, max_tokens: Optional[int] = None) -> str:
         """
         Retrieves the combined context from compressed and current history.
+        If `max_tokens` is given, current messages take priority, followed by the most recent compressed entries that fit.
         """
-        compressed_context = "\n".join(self.compressed_memory)
-        current_history_context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in self.history])
+        with self._lock:
+            compressed_memory = list(self.compressed_memory)
+            entry_tokens = list(self._entry_tokens)
+            messages = [msg for segment in self._pending for msg in segment]
+        messages.extend(self.history)
+        if max_tokens is not None:
+            budget = max_tokens - self.count_tokens("Compressed Past:\n\n\nCurrent Conversation:\n")
+            if budget < 0:
+                return ""
+            messages = self._fit_messages(messages, budget)
+            compressed_memory = self._fit_entries(compressed_memory, entry_tokens, budget - self._messages_tokens(messages))
+        compressed_context = "\n".join(compressed_memory)
+        current_history_context = "\n".join([msg.format() for msg in messages])
         
         if compressed_context and current_history_context:
             return f"Compressed Past:\n{compressed_context}\n\nCurrent Conversation:\n{current_history_context}"
@@ -51,9 +283,46 @@ class CompressionConsolidationMemory(BaseMemory):
         else:
             return ""
 
+    @staticmethod
+    def _fit_entries(entries: List[str], entry_tokens: List[int], max_tokens: int) -> List[str]:
+        """
+        Returns the most recent compressed entries whose newline-joined text fits within `max_tokens`, given the
+        cached token counts of the entries.
+        """
+        total = 0
+        start = len(entries)
+        while start > 0:
+            tokens = entry_tokens[start - 1] + (1 if start < len(entries) else 0)
+            if total + tokens > max_tokens:
+                break
+            total += tokens
+            start -= 1
+        return entries[start:]
+
+    def get_state(self) -> Dict[str, Any]:
+        with self._lock:
+            # Messages still waiting for their background compression are kept as current messages.
+            messages = [msg for segment in self._pending for msg in segment]
+            return {"history": messages + self.history, "compressed_memory": list(self.compressed_memory)}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        with self._lock:
+            self.history = state["history"]
+            self.compressed_memory = []
+            self._signatures = []
+            self._entry_tokens = []
+            for entry in state["compressed_memory"]:
+                self._store_entry(entry)
+
     def clear(self) -> None:
         """
         Clears both the current history and compressed memory.
         """
-        self.history = []
-        self.compressed_memory = []
\ No newline at end of file
+        self._clear_storage()
+        with self._lock:
+            self._generation += 1
+            self._pending = []
+            self.history = []
+            self.compressed_memory = []
+            self._signatures = []
+            self._entry_tokens = []
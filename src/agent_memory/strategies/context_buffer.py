@@ -0,0 +1,73 @@
+from collections import deque
+from itertools import islice
+from typing import Deque, Optional
+
+class ContextBuffer:
+    """
+    The newline-joined text of a sequence of formatted lines, maintained incrementally.
+
+    Appended lines are joined onto the existing text the next time it is read, lines dropped from the
+    front are skipped with a cached offset, and reading a buffer that has not changed returns the cached
+    string. Strategies use it so that `get_context` does not re-format and re-join the whole history on every turn.
+    """
+
+    def __init__(self):
+        self._text = ""  # Joined lines, possibly preceded by dropped lines.
+        self._start = 0  # Offset of the first live line in `_text`.
+        self._committed = 0  # Number of live lines that are part of `_text`.
+        self._pending: Deque[str] = deque()  # Lines appended since `_text` was last extended.
+        self._lengths: Deque[int] = deque()  # Length of every live line, oldest first.
+        self._cached: Optional[str] = ""
+
+    def append(self, line: str) -> None:
+        """Appends a formatted line."""
+        self._pending.append(line)
+        self._lengths.append(len(line))
+        self._cached = None
+
+    def popleft(self, count: int = 1) -> None:
+        """Drops the `count` oldest lines."""
+        for _ in range(min(count, len(self._lengths))):
+            length = self._lengths.popleft()
+            if self._committed == 0:
+                self._pending.popleft()
+            elif self._committed == 1:
+                self._text, self._start, self._committed = "", 0, 0
+            else:
+                self._start += length + 1
+                self._committed -= 1
+            self._cached = None
+        if self._start > len(self._text) // 2:
+            # Compact once the dropped prefix dominates, so that memory stays proportional to the live lines.
+            self._text, self._start = self._text[self._start:], 0
+
+    def text(self) -> str:
+        """Returns the newline-joined live lines."""
+        if self._cached is None:
+            if self._pending:
+                joined = "\n".join(self._pending)
+                self._text = f"{self._text}\n{joined}" if self._committed else joined
+                self._committed += len(self._pending)
+                self._pending.clear()
+            self._cached = self._text[self._start:] if self._start else self._text
+        return self._cached
+
+    def tail(self, count: int) -> str:
+        """Returns the newline-joined `count` most recent lines."""
+        if count <= 0:
+            return ""
+        text = self.text()
+        if count >= len(self._lengths):
+            return text
+        size = sum(islice(reversed(self._lengths), count)) + count - 1
+        return text[len(text) - size:]
+
+    def clear(self) -> None:
+        """Drops all lines."""
+        self._text, self._start, self._committed = "", 0, 0
+        self._pending.clear()
+        self._lengths.clear()
+        self._cached = ""
+
+    def __len__(self) -> int:
+        return len(self._lengths)
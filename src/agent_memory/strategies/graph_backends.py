@@ -0,0 +1,279 @@
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from typing import Dict, FrozenSet, Iterator, List, Optional
+import numpy as np
+from .message import Message
+
+class GraphBackend(ABC):
+    """
+    Abstract Base Class for the graph stores used by GraphBasedMemory.
+
+    Nodes are identified by consecutive integers starting at 0 and have a type, e.g. "message" or "entity".
+    Message nodes hold a message, other nodes may have a unique label by which they can be found.
+    Edges are directed and typed by a relation, but are traversed in both directions.
+    """
+
+    @abstractmethod
+    def add_node(self, node_type: str, label: Optional[str] = None, message: Optional[Message] = None) -> int:
+        """
+        Adds a node and returns its id.
+
+        Args:
+            node_type: The type of the node.
+            label: An optional unique label by which the node can be found with `find_node`.
+            message: The message held by the node, for message nodes.
+        """
+        pass
+
+    @abstractmethod
+    def add_edge(self, source: int, target: int, relation: str) -> None:
+        """Adds an edge of the given relation from `source` to `target`, which must not be linked in that direction yet."""
+        pass
+
+    @abstractmethod
+    def find_node(self, label: str) -> Optional[int]:
+        """Returns the id of the node with the given label, or None."""
+        pass
+
+    @abstractmethod
+    def node_type(self, node: int) -> str:
+        """Returns the type of the node."""
+        pass
+
+    @abstractmethod
+    def message(self, node: int) -> Optional[Message]:
+        """Returns the message held by the node, or None if it is not a message node."""
+        pass
+
+    @abstractmethod
+    def token_count(self, node: int) -> Optional[int]:
+        """Returns the cached token count of the node's message, or None if it has not been counted."""
+        pass
+
+    @abstractmethod
+    def set_token_count(self, node: int, count: int) -> None:
+        """Caches the token count of the node's message."""
+        pass
+
+    @abstractmethod
+    def neighbors(self, node: int, relations: Optional[FrozenSet[str]] = None) -> Iterator[int]:
+        """
+        Yields the nodes linked to the node in either direction.
+
+        Args:
+            node: The node whose neighbours to yield.
+            relations: If given, only edges with one of these relations are followed.
+        """
+        pass
+
+    @abstractmethod
+    def number_of_nodes(self) -> int:
+        pass
+
+    @abstractmethod
+    def number_of_edges(self) -> int:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Removes all nodes and edges."""
+        pass
+
+
+class NetworkXGraphBackend(GraphBackend):
+    """
+    A graph store backed by a `networkx.DiGraph`, with an attribute dict per node and per edge.
+    Flexible and easy to inspect through the `graph` attribute, but heavy for large graphs.
+    """
+
+    def __init__(self):
+        import networkx as nx
+
+        self.graph = nx.DiGraph()
+        self._labels: Dict[str, int] = {}
+
+    def add_node(self, node_type: str, label: Optional[str] = None, message: Optional[Message] = None) -> int:
+        node = self.graph.number_of_nodes()
+        if message is not None:
+            self.graph.add_node(node, type=node_type, message=message)
+        else:
+            self.graph.add_node(node, type=node_type)
+        if label is not None:
+            self.graph.nodes[node]["label"] = label
+            self._labels[label] = node
+        return node
+
+    def add_edge(self, source: int, target: int, relation: str) -> None:
+        self.graph.add_edge(source, target, relation=relation)
+
+    def find_node(self, label: str) -> Optional[int]:
+        return self._labels.get(label)
+
+    def node_type(self, node: int) -> str:
+        return self.graph.nodes[node]["type"]
+
+    def message(self, node: int) -> Optional[Message]:
+        return self.graph.nodes[node].get("message")
+
+    def token_count(self, node: int) -> Optional[int]:
+        return self.graph.nodes[node]["message"].token_count
+
+    def set_token_count(self, node: int, count: int) -> None:
+        self.graph.nodes[node]["message"].token_count = count
+
+    def neighbors(self, node: int, relations: Optional[FrozenSet[str]] = None) -> Iterator[int]:
+        for source, target, relation in self.graph.out_edges(node, data="relation"):
+            if relations is None or relation in relations:
+                yield target
+        for source, target, relation in self.graph.in_edges(node, data="relation"):
+            if relations is None or relation in relations:
+                yield source
+
+    def number_of_nodes(self) -> int:
+        return self.graph.number_of_nodes()
+
+    def number_of_edges(self) -> int:
+        return self.graph.number_of_edges()
+
+    def clear(self) -> None:
+        self.graph.clear()
+        self._labels.clear()
+
+
+class CompactGraphBackend(GraphBackend):
+    """
+    A graph store kept in flat arrays.
+
+    Node types and messages are stored column-wise (a type code per node, and role, content and token
+    count columns for message nodes), and edges as three parallel arrays. For traversal, the edges are
+    compiled into a CSR adjacency (an offset per node into one array of neighbours) covering both
+    directions. Edges added after the last compilation are kept in a small per-node overflow and the
+    adjacency is recompiled once the overflow grows past a fraction of the compiled edges, so that
+    interleaving additions and traversals stays cheap.
+    """
+
+    def __init__(self, rebuild_fraction: float = 0.25, min_rebuild_edges: int = 1024):
+        """
+        Initializes the CompactGraphBackend.
+
+        Args:
+            rebuild_fraction: Recompile the adjacency when the edges added since the last compilation exceed
+                this fraction of the compiled edges.
+            min_rebuild_edges: The number of added edges below which the adjacency is never recompiled.
+        """
+        self.rebuild_fraction = rebuild_fraction
+        self.min_rebuild_edges = min_rebuild_edges
+        self.clear()
+
+    def clear(self) -> None:
+        self._types = bytearray()  # Type code per node.
+        self._type_names: List[str] = []
+        self._type_codes: Dict[str, int] = {}
+        self._rows = array("q")  # Row of the node in the message columns, or -1.
+        self._roles: List[str] = []
+        self._contents: List[str] = []
+        self._token_counts = array("q")  # Cached token count per message row, or -1.
+        self._labels: Dict[str, int] = {}
+        self._sources = array("q")
+        self._targets = array("q")
+        self._relations = bytearray()  # Relation code per edge.
+        self._relation_names: List[str] = []
+        self._relation_codes: Dict[str, int] = {}
+        # The compiled adjacency over the first `_compiled_edges` edges.
+        self._compiled_edges = 0
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int64)
+        self._edge_relations = np.zeros(0, dtype=np.uint8)
+        self._overflow: Dict[int, List[int]] = {}  # Node -> edges added since the last compilation.
+
+    def add_node(self, node_type: str, label: Optional[str] = None, message: Optional[Message] = None) -> int:
+        node = len(self._types)
+        self._types.append(self._code(self._type_codes, self._type_names, node_type))
+        if message is not None:
+            self._rows.append(len(self._contents))
+            self._roles.append(sys.intern(message.role))
+            self._contents.append(message.content)
+            self._token_counts.append(-1 if message.token_count is None else message.token_count)
+        else:
+            self._rows.append(-1)
+        if label is not None:
+            self._labels[label] = node
+        return node
+
+    def add_edge(self, source: int, target: int, relation: str) -> None:
+        edge = len(self._sources)
+        self._sources.append(source)
+        self._targets.append(target)
+        self._relations.append(self._code(self._relation_codes, self._relation_names, relation))
+        self._overflow.setdefault(source, []).append(edge)
+        self._overflow.setdefault(target, []).append(edge)
+
+    def find_node(self, label: str) -> Optional[int]:
+        return self._labels.get(label)
+
+    def node_type(self, node: int) -> str:
+        return self._type_names[self._types[node]]
+
+    def message(self, node: int) -> Optional[Message]:
+        row = self._rows[node]
+        if row < 0:
+            return None
+        count = self._token_counts[row]
+        return Message(self._roles[row], self._contents[row], token_count=None if count < 0 else count)
+
+    def token_count(self, node: int) -> Optional[int]:
+        count = self._token_counts[self._rows[node]]
+        return None if count < 0 else count
+
+    def set_token_count(self, node: int, count: int) -> None:
+        self._token_counts[self._rows[node]] = count
+
+    def neighbors(self, node: int, relations: Optional[FrozenSet[str]] = None) -> Iterator[int]:
+        pending = len(self._sources) - self._compiled_edges
+        if pending > max(self.min_rebuild_edges, self.rebuild_fraction * self._compiled_edges):
+            self._compile()
+        codes = None
+        if relations is not None:
+            codes = {self._relation_codes[relation] for relation in relations if relation in self._relation_codes}
+        if node + 1 < len(self._indptr):
+            start, end = int(self._indptr[node]), int(self._indptr[node + 1])
+            if codes is None:
+                yield from self._indices[start:end].tolist()
+            else:
+                for neighbor, code in zip(self._indices[start:end].tolist(), self._edge_relations[start:end].tolist()):
+                    if code in codes:
+                        yield neighbor
+        for edge in self._overflow.get(node, ()):
+            if codes is None or self._relations[edge] in codes:
+                source = self._sources[edge]
+                yield self._targets[edge] if source == node else source
+
+    def number_of_nodes(self) -> int:
+        return len(self._types)
+
+    def number_of_edges(self) -> int:
+        return len(self._sources)
+
+    def _compile(self) -> None:
+        """Compiles every edge into the CSR adjacency, listing each edge under both of its endpoints."""
+        # Copy the arrays, as they cannot grow while numpy holds a view of their buffers.
+        sources = np.frombuffer(self._sources.tobytes(), dtype=np.int64)
+        targets = np.frombuffer(self._targets.tobytes(), dtype=np.int64)
+        relations = np.frombuffer(bytes(self._relations), dtype=np.uint8)
+        nodes = np.concatenate([sources, targets])
+        order = np.argsort(nodes, kind="stable")
+        self._indices = np.concatenate([targets, sources])[order]
+        self._edge_relations = np.concatenate([relations, relations])[order]
+        self._indptr = np.zeros(len(self._types) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(nodes, minlength=len(self._types)), out=self._indptr[1:])
+        self._compiled_edges = len(self._sources)
+        self._overflow = {}
+
+    @staticmethod
+    def _code(codes: Dict[str, int], names: List[str], name: str) -> int:
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
@@ -1,47 +1,184 @@
-from typing import List, Dict, Optional, TYPE_CHECKING
-import networkx as nx
+import math
+from array import array
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, TYPE_CHECKING
 from .base import BaseMemory
+from .graph_backends import GraphBackend, NetworkXGraphBackend
+from .message import Message
+from ..text import extract_entities, extract_keywords
+from ..tokenizers import BaseTokenCounter
 
 if TYPE_CHECKING:
     from agent_memory.llms.base import BaseLLM
+    from agent_memory.storage import BaseStorage
 
 class GraphBasedMemory(BaseMemory):
     """
     A memory strategy that represents memories as nodes in a graph, with relationships between them.
     This allows for more complex retrieval and reasoning.
+
+    Every message is a node, linked to the previous message by a "follows" edge and to the entities
+    (capitalized names) it mentions by "mentions" edges. An inverted index maps the keywords of every
+    message to its position in the conversation, so a query is answered by looking up the matching
+    messages and expanding their neighbourhood in the graph, without scanning every node.
+
+    The graph itself is kept by a pluggable `GraphBackend`: a `networkx` graph by default, or a
+    `CompactGraphBackend` of flat arrays for large conversations.
     """
 
-    def __init__(self, llm: Optional["BaseLLM"] = None):
-        super().__init__(llm=llm)
-        self.graph = nx.DiGraph()
+    supports_query = True
+
+    def __init__(self, llm: Optional["BaseLLM"] = None, hops: int = 2, max_nodes: Optional[int] = None, relations: Optional[Iterable[str]] = None, backend: Optional[GraphBackend] = None, token_counter: Optional[BaseTokenCounter] = None, storage: Optional["BaseStorage"] = None):
+        """
+        Initializes the GraphBasedMemory.
+
+        Args:
+            llm: An optional LLM, unused by this strategy.
+            hops: How many edges away from the messages matching a query to expand the context. With 2,
+                this reaches the neighbouring messages and the other messages mentioning the same entities.
+            max_nodes: The default maximum number of messages returned for a query.
+            relations: The edge relations to expand along, e.g. {"mentions"}. By default all relations are followed.
+            backend: The graph store, which must not be shared with another memory. Defaults to a `NetworkXGraphBackend`.
+            token_counter: The token counter used to fit the context into a token budget.
+            storage: An optional storage recording every message. Snapshots keep the graph and its indexes.
+        """
+        super().__init__(llm=llm, token_counter=token_counter, storage=storage)
+        self.graph = backend if backend is not None else NetworkXGraphBackend()
         self.message_count = 0
+        self.hops = hops
+        self.max_nodes = max_nodes
+        self.relations: Optional[FrozenSet[str]] = frozenset(relations) if relations is not None else None
+        self._order = array("q") # Message node ids in conversation order.
+        self._positions = array("q") # Node id -> index of the message in `_order`, or -1 for other nodes.
+        self._keyword_index: Dict[str, array] = {} # Keyword -> ascending positions of the messages containing it.
 
     def add_message(self, role: str, content: str) -> None:
-        """Adds a message as a node in the graph."""
-        node_id = f"message_{self.message_count}"
-        self.graph.add_node(node_id, role=role, content=content, type="message")
-        
+        """Adds a message as a node in the graph and indexes its keywords and entities."""
+        node_id = self.graph.add_node("message", message=self._record(Message(role, content)))
+        position = len(self._order)
+        self._positions.append(position)
+
         # Optionally, add edges to previous messages to maintain sequence
-        if self.message_count > 0:
-            self.graph.add_edge(f"message_{self.message_count-1}", node_id, relation="follows")
-            
+        if self._order:
+            self.graph.add_edge(self._order[-1], node_id, relation="follows")
+        self._order.append(node_id)
+
+        for term in set(extract_keywords(content)):
+            postings = self._keyword_index.get(term)
+            if postings is None:
+                postings = self._keyword_index[term] = array("q")
+            postings.append(position)
+        for entity in extract_entities(content):
+            label = f"entity_{entity.lower()}"
+            entity_id = self.graph.find_node(label)
+            if entity_id is None:
+                entity_id = self.graph.add_node("entity", label=label)
+                self._positions.append(-1)
+            self.graph.add_edge(node_id, entity_id, relation="mentions")
+
         self.message_count += 1
 
-    def get_context(self, query: str = None) -> str:
+    def get_context(self, query: str = None, max_tokens: Optional[int] = None, max_nodes: Optional[int] = None, hops: Optional[int] = None) -> str:
         """
-        Retrieves context from the graph. For simplicity, this currently returns all message nodes.
-        In a real implementation, this would involve graph traversal and reasoning based on the query.
+        Retrieves context from the graph.
+
+        Without a query, this returns the most recent messages that fit in `max_tokens` and `max_nodes`.
+        With a query, the messages sharing keywords with it are ranked by how many (and how rare) the
+        shared keywords are, and their neighbourhood is expanded up to `hops` edges away. Messages are
+        taken in that order until `max_nodes` or `max_tokens` is reached, and returned in conversation order.
+        If nothing matches the query, the most recent messages are returned instead.
+
+        Args:
+            query: The query to retrieve context for.
+            max_tokens: An optional token budget.
+            max_nodes: The maximum number of messages to return. Defaults to the value given at initialization.
+            hops: How far to expand from the matching messages. Defaults to the value given at initialization.
         """
-        context_messages = []
-        for node_id in sorted(self.graph.nodes()):
-            if self.graph.nodes[node_id].get("type") == "message":
-                context_messages.append(f"{self.graph.nodes[node_id]['role']}: {self.graph.nodes[node_id]['content']}")
-        return "\n".join(context_messages)
+        max_nodes = self.max_nodes if max_nodes is None else max_nodes
+        positions = None
+        if query:
+            positions = self._select(self._candidates(query, self.hops if hops is None else hops), max_tokens, max_nodes)
+        if not positions:
+            # Walk the ordering index newest first, so that a budget only touches the messages it keeps.
+            positions = self._select(reversed(range(len(self._order))), max_tokens, max_nodes)
+        return "\n".join([self.graph.message(self._order[position]).format() for position in sorted(positions)])
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            "graph": self.graph,
+            "message_count": self.message_count,
+            "order": self._order,
+            "positions": self._positions,
+            "keyword_index": self._keyword_index,
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self.graph = state["graph"]
+        self.message_count = state["message_count"]
+        self._order = state["order"]
+        self._positions = state["positions"]
+        self._keyword_index = state["keyword_index"]
 
     def clear(self) -> None:
         """
         Clears the graph-based memory.
         """
+        self._clear_storage()
         self.graph.clear()
         self.message_count = 0
+        self._order = array("q")
+        self._positions = array("q")
+        self._keyword_index.clear()
+
+    def _select(self, candidates: Iterable[int], max_tokens: Optional[int], max_nodes: Optional[int]) -> List[int]:
+        """Takes message positions from `candidates` in order until `max_nodes` or `max_tokens` is reached."""
+        selected: List[int] = []
+        total = 0
+        for position in candidates:
+            if max_nodes is not None and len(selected) >= max_nodes:
+                break
+            if max_tokens is not None:
+                # Each line after the first also costs a newline separator.
+                tokens = self._node_tokens(self._order[position]) + (1 if selected else 0)
+                if total + tokens > max_tokens:
+                    break
+                total += tokens
+            selected.append(position)
+        return selected
+
+    def _candidates(self, query: str, hops: int) -> Iterator[int]:
+        """Yields the positions of the messages matching the query, best first, then of their neighbourhood, nearest first."""
+        scores: Dict[int, float] = {}
+        for term in set(extract_keywords(query)):
+            postings = self._keyword_index.get(term)
+            if not postings:
+                continue
+            weight = math.log(1 + len(self._order) / len(postings))
+            for position in postings:
+                scores[position] = scores.get(position, 0.0) + weight
+        # Higher scores first, more recent messages first among equal scores.
+        seeds = sorted(scores, key=lambda position: (-scores[position], -position))
+        yield from seeds
+
+        frontier = [self._order[position] for position in seeds]
+        visited = set(frontier)
+        for _ in range(hops):
+            next_frontier = []
+            for node_id in frontier:
+                for neighbor in self.graph.neighbors(node_id, self.relations):
+                    if neighbor in visited:
+                        continue
+                    visited.add(neighbor)
+                    next_frontier.append(neighbor)
+                    position = self._positions[neighbor]
+                    if position >= 0:
+                        yield position
+            frontier = next_frontier
+
+    def _node_tokens(self, node_id: int) -> int:
+        """Returns the number of tokens of a message node, caching the count in the backend."""
+        tokens = self.graph.token_count(node_id)
+        if tokens is None:
+            tokens = self.count_tokens(self.graph.message(node_id).format())
+            self.graph.set_token_count(node_id, tokens)
+        return tokens
 
@@ -1,49 +1,289 @@
-from typing import List, Dict, TYPE_CHECKING
+import threading
+import weakref
+from typing import Any, List, Dict, Optional, TYPE_CHECKING
+from .background import BackgroundWorker, event_loop_lock
 from .base import BaseMemory
+from .message import Message
+from ..tokenizers import BaseTokenCounter
 
 if TYPE_CHECKING:
     from agent_memory.llms.base import BaseLLM
+    from agent_memory.storage import BaseStorage
 
 class HierarchicalMemory(BaseMemory):
     """
     A memory strategy that maintains two levels of memory: a short-term (recent messages)
     and a long-term (summaries of older conversations).
+
+    By default every summary is appended to the long-term memory, which grows with the session. With a
+    `fan_out`, the summaries form a tree instead. Summaries of messages are the level-0 leaves, and
+    whenever a level holds `fan_out` summaries they are rolled up into one summary on the level above,
+    like the carry of a counter. A rollup only re-summarizes the nodes of the level that filled up, and
+    each level keeps fewer than `fan_out` summaries, so the long-term memory holds O(fan_out * log n)
+    summaries after n summarized segments. It is rendered from the highest level down, i.e. from the
+    broadest summary of the oldest part of the conversation to the most recent leaves.
     """
 
-    def __init__(self, llm: "BaseLLM", short_term_threshold: int = 4, summary_prompt: str = "Summarize the following conversation:"):
-        super().__init__(llm=llm)
-        self.short_term_memory: List[Dict[str, str]] = []
+    def __init__(self, llm: "BaseLLM", short_term_threshold: int = 4, summary_prompt: str = "Summarize the following conversation:", background: bool = False, max_pending_jobs: int = 4, token_counter: Optional[BaseTokenCounter] = None, storage: Optional["BaseStorage"] = None, fan_out: Optional[int] = None, rollup_prompt: str = "Combine the following summaries of consecutive parts of a conversation into a single summary:"):
+        """
+        Initializes the HierarchicalMemory.
+
+        Args:
+            llm: An instance of a class conforming to BaseLLM.
+            short_term_threshold: The number of short-term messages above which older messages are summarized.
+            summary_prompt: The prompt used to summarize the short-term memory.
+            background: If True, summarization runs on a background worker instead of blocking `add_message`.
+                Messages waiting to be summarized are served raw by `get_context` until their summary lands.
+            max_pending_jobs: The maximum number of queued background summarizations. `add_message` blocks
+                while the queue is full.
+            token_counter: An optional token counter used to fit the context into a token budget.
+            storage: An optional storage recording every message. Snapshots keep the summaries, so that they are not recomputed on restore.
+            fan_out: If given, the number of summaries of a level that are rolled up into one summary of the level above.
+            rollup_prompt: The prompt used to roll summaries up into the level above.
+        """
+        if fan_out is not None and fan_out < 2:
+            raise ValueError("fan_out must be at least 2.")
+        super().__init__(llm=llm, token_counter=token_counter, storage=storage)
+        self.short_term_memory: List[Message] = []
         self.long_term_memory: str = ""
+        self.fan_out = fan_out
+        self.rollup_prompt = rollup_prompt
+        # The summaries of the tree that are not rolled up yet, by level and oldest first, when `fan_out` is given.
+        self.levels: List[List[str]] = []
         self.short_term_threshold = short_term_threshold
         self.summary_prompt = summary_prompt
         self.llm = llm
+        self.background = background
+        self._worker: Optional[BackgroundWorker] = BackgroundWorker(max_pending_jobs) if background else None
+        # Segments of messages handed to the background worker, oldest first.
+        self._pending: List[List[Message]] = []
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Serializes async summarizations, so that their summaries land in order.
+        self._async_locks: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
 
     def add_message(self, role: str, content: str) -> None:
         """Adds a message to the short-term memory and triggers summarization if the threshold is exceeded."""
-        self.short_term_memory.append({"role": role, "content": content})
+        self.short_term_memory.append(self._record(Message(role, content)))
+        if len(self.short_term_memory) > self.short_term_threshold:
+            if self._worker is not None:
+                self._worker.submit(self._summarize_in_background, self._detach_segment(), self._generation)
+            else:
+                self._summarize()
+
+    async def aadd_message(self, role: str, content: str) -> None:
+        """Asynchronously adds a message, awaiting the LLM if summarization is triggered."""
+        self.short_term_memory.append(self._record(Message(role, content)))
         if len(self.short_term_memory) > self.short_term_threshold:
-            self._summarize()
+            if self._worker is not None:
+                await self._worker.asubmit(self._summarize_in_background, self._detach_segment(), self._generation)
+            else:
+                await self._asummarize()
 
     def _summarize(self) -> None:
         """Summarizes the short-term memory and moves it to long-term memory."""
         messages_to_summarize = self.short_term_memory[:-1] # Summarize all but the last message
-        conversation_to_summarize = "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages_to_summarize])
-        prompt = f"{self.summary_prompt}\n\n{conversation_to_summarize}"
-        summary = self.llm.invoke(prompt).content
-        
-        if self.long_term_memory:
+        summary = self.llm.invoke(self._build_prompt(messages_to_summarize)).content
+        self._store_summary(summary)
+        # Only drop the summarized messages, so that messages added while awaiting the LLM are kept.
+        del self.short_term_memory[:len(messages_to_summarize)]
+        self._roll_up()
+
+    async def _asummarize(self) -> None:
+        """
+        Asynchronous counterpart of `_summarize`. The segment leaves the short-term memory before the LLM is
+        awaited, so that concurrent calls never summarize the same messages, and is served raw until then.
+        """
+        segment = self._detach_segment()
+        generation = self._generation
+        async with event_loop_lock(self._async_locks):
+            summary = (await self.llm.ainvoke(self._build_prompt(segment))).content
+            with self._lock:
+                if generation != self._generation:
+                    return # The memory was cleared while this segment was being summarized.
+                self._store_summary(summary)
+                self._pending = [pending for pending in self._pending if pending is not segment]
+            await self._aroll_up(generation)
+
+    def _detach_segment(self) -> List[Message]:
+        """Moves all but the last short-term message into the pending segments and returns them."""
+        segment = self.short_term_memory[:-1]
+        del self.short_term_memory[:-1]
+        with self._lock:
+            self._pending.append(segment)
+        return segment
+
+    def _summarize_in_background(self, segment: List[Message], generation: int) -> None:
+        """Summarizes a pending segment on the background worker and swaps the summary in for it."""
+        summary = self.llm.invoke(self._build_prompt(segment)).content
+        with self._lock:
+            if generation != self._generation:
+                return # The memory was cleared while this segment was being summarized.
+            self._store_summary(summary)
+            self._pending = [pending for pending in self._pending if pending is not segment]
+        self._roll_up(generation)
+
+    def _build_prompt(self, messages: List[Message]) -> str:
+        """Builds the summarization prompt for the given messages."""
+        conversation_to_summarize = "\n".join([msg.format() for msg in messages])
+        return f"{self.summary_prompt}\n\n{conversation_to_summarize}"
+
+    def _store_summary(self, summary: str) -> None:
+        """Appends a summary to long-term memory, as a new leaf of the tree if there is one."""
+        if self.fan_out is not None:
+            if not self.levels:
+                self.levels.append([])
+            self.levels[0].append(summary)
+            self._render_levels()
+        elif self.long_term_memory:
             self.long_term_memory += "\n" + summary
         else:
             self.long_term_memory = summary
-            
-        self.short_term_memory = [self.short_term_memory[-1]] # Keep only the last message
 
-    def get_context(self) -> str:
-        """Retrieves the combined context from long-term and short-term memory."""
-        short_term_context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in self.short_term_memory])
-        return f"Summary of past conversation:\n{self.long_term_memory}\n\nCurrent conversation:\n{short_term_context}"
+    def _full_level(self) -> Optional[int]:
+        """Returns the lowest level holding `fan_out` summaries, if any."""
+        if self.fan_out is not None:
+            for level, summaries in enumerate(self.levels):
+                if len(summaries) >= self.fan_out:
+                    return level
+        return None
+
+    def _store_rollup(self, level: int, count: int, summary: str) -> None:
+        """Replaces the `count` oldest summaries of a level with their rollup on the level above."""
+        del self.levels[level][:count]
+        if level + 1 == len(self.levels):
+            self.levels.append([])
+        self.levels[level + 1].append(summary)
+        self._render_levels()
+
+    def _render_levels(self) -> None:
+        self.long_term_memory = "\n".join(summary for summaries in reversed(self.levels) for summary in summaries)
+
+    def _roll_up(self, generation: Optional[int] = None) -> None:
+        """
+        Rolls full levels up until every level holds fewer than `fan_out` summaries. A new leaf fills at
+        most one level per level above it, so this makes O(log n) LLM calls at worst and one on average.
+        On the background worker, the LLM is called without holding the lock, and rollups are dropped if
+        the memory was cleared.
+        """
+        while True:
+            with self._lock:
+                if generation is not None and generation != self._generation:
+                    return
+                level = self._full_level()
+                if level is None:
+                    return
+                summaries = self.levels[level][:self.fan_out]
+            rollup = self.llm.invoke(self._build_rollup_prompt(summaries)).content
+            with self._lock:
+                if generation is not None and generation != self._generation:
+                    return
+                self._store_rollup(level, len(summaries), rollup)
+
+    async def _aroll_up(self, generation: int) -> None:
+        """Asynchronous counterpart of `_roll_up`, called while holding the async lock."""
+        while True:
+            with self._lock:
+                if generation != self._generation:
+                    return
+                level = self._full_level()
+                if level is None:
+                    return
+                summaries = self.levels[level][:self.fan_out]
+            rollup = (await self.llm.ainvoke(self._build_rollup_prompt(summaries))).content
+            with self._lock:
+                if generation != self._generation:
+                    return
+                self._store_rollup(level, len(summaries), rollup)
+
+    def _build_rollup_prompt(self, summaries: List[str]) -> str:
+        """Builds the prompt rolling the given summaries up into one."""
+        parts = "\n\n".join(f"Part {i + 1}:\n{summary}" for i, summary in enumerate(summaries))
+        return f"{self.rollup_prompt}\n\n{parts}"
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Waits until all pending background summarizations have landed in long-term memory."""
+        if self._worker is not None:
+            self._worker.flush(timeout)
+
+    async def aflush(self, timeout: Optional[float] = None) -> None:
+        """Asynchronously waits until all pending background summarizations have landed."""
+        if self._worker is not None:
+            await self._worker.aflush(timeout)
+
+    def close(self) -> None:
+        """Waits for pending background summarizations and stops the worker thread."""
+        if self._worker is not None:
+            self._worker.shutdown(wait=True)
+
+    def get_context(self, max_tokens: Optional[int] = None) -> str:
+        """
+        Retrieves the combined context from long-term and short-term memory.
+        If `max_tokens` is given, recent messages take priority and the summary is trimmed to the remaining budget.
+        With a tree, the broadest summaries are kept and the oldest summaries of the lowest levels are dropped
+        first. Otherwise the most recent part of the summary is kept.
+        """
+        with self._lock:
+            long_term_memory = self.long_term_memory
+            levels = [list(summaries) for summaries in self.levels]
+            messages = [msg for segment in self._pending for msg in segment]
+        messages.extend(self.short_term_memory)
+        if max_tokens is not None:
+            budget = max_tokens - self.count_tokens("Summary of past conversation:\n\n\nCurrent conversation:\n")
+            if budget < 0:
+                return ""
+            messages = self._fit_messages(messages, budget)
+            long_term_memory = self._fit_summaries(long_term_memory, levels, budget - self._messages_tokens(messages))
+        short_term_context = "\n".join([msg.format() for msg in messages])
+        return f"Summary of past conversation:\n{long_term_memory}\n\nCurrent conversation:\n{short_term_context}"
+
+    def _fit_summaries(self, long_term_memory: str, levels: List[List[str]], max_tokens: int) -> str:
+        """
+        Fits the long-term memory into `max_tokens`. The summaries of the tree are kept from the highest level
+        down, newest first within a level, until the next one does not fit. The highest level holds up to
+        `fan_out - 1` summaries, so the first one kept is the newest of them, the one covering the most recent
+        part of the broadest view. If not even that one fits, it is truncated to its start.
+        """
+        if not levels:
+            return self._truncate(long_term_memory, max_tokens, from_end=True)
+        priority = [(level, index) for level in reversed(range(len(levels))) for index in reversed(range(len(levels[level])))]
+        if not priority:
+            return ""
+        kept = set()
+        total = 0
+        for level, index in priority:
+            # Each summary after the first also costs a newline separator.
+            tokens = self.count_tokens(levels[level][index]) + (1 if kept else 0)
+            if total + tokens > max_tokens:
+                break
+            kept.add((level, index))
+            total += tokens
+        if not kept:
+            level, index = priority[0]
+            return self._truncate(levels[level][index], max_tokens)
+        return "\n".join(summary for level in reversed(range(len(levels))) for index, summary in enumerate(levels[level]) if (level, index) in kept)
+
+    def get_state(self) -> Dict[str, Any]:
+        with self._lock:
+            # Messages still waiting for their background summary are kept as short-term messages.
+            messages = [msg for segment in self._pending for msg in segment]
+            return {"short_term_memory": messages + self.short_term_memory, "long_term_memory": self.long_term_memory, "levels": [list(summaries) for summaries in self.levels]}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        with self._lock:
+            self.short_term_memory = state["short_term_memory"]
+            self.long_term_memory = state["long_term_memory"]
+            self.levels = state.get("levels", [])
+            if self.fan_out is not None and not self.levels and self.long_term_memory:
+                # A snapshot taken without a tree: its summaries become a single leaf.
+                self.levels = [[self.long_term_memory]]
 
     def clear(self) -> None:
         """Clears both long-term and short-term memory."""
-        self.short_term_memory = []
-        self.long_term_memory = ""
+        self._clear_storage()
+        with self._lock:
+            self._generation += 1
+            self._pending = []
+            self.short_term_memory = []
+            self.long_term_memory = ""
+            self.levels = []
@@ -1,42 +1,148 @@
-from typing import List, Dict
-import torch
-from transformers import BertTokenizer, BertModel
+from typing import Any, Iterable, List, Dict, Optional, Tuple, TYPE_CHECKING
 from .base import BaseMemory
+from .message import Message
+from ..lazy import lazy_attribute, shared_models
+from ..tokenizers import BaseTokenCounter
+
+if TYPE_CHECKING:
+    import torch
+    from agent_memory.embeddings import EmbeddingCache
+    from agent_memory.llms.base import BaseLLM
+    from agent_memory.storage import BaseStorage
+
+# Heavy dependencies, imported on first use so that importing this module stays cheap.
+_LAZY_IMPORTS = {
+    "BertTokenizer": ("transformers", "BertTokenizer"),
+    "BertModel": ("transformers", "BertModel"),
+}
+
+def _lazy(name: str) -> Any:
+    return lazy_attribute(globals(), name, _LAZY_IMPORTS)
+
+def __getattr__(name: str) -> Any:
+    return _lazy(name)
 
 class MemoryAugmentedTransformerMemory(BaseMemory):
     """
     A memory strategy that uses a pre-trained transformer model to create a compressed representation of the conversation history.
     """
 
-    def __init__(self, model_name: str = 'bert-base-uncased'):
+    def __init__(self, model_name: str = 'bert-base-uncased', embedding_cache: Optional["EmbeddingCache"] = None, token_counter: Optional[BaseTokenCounter] = None, incremental: bool = False, storage: Optional["BaseStorage"] = None, llm: Optional["BaseLLM"] = None):
         """
         Initializes the MemoryAugmentedTransformerMemory.
 
         Args:
             model_name: The name of the pre-trained transformer model to use.
+            embedding_cache: An optional cache so that a text that was already encoded is not encoded again.
+            token_counter: An optional token counter used to fit the context into a token budget.
+            incremental: If True, each message is encoded on its own and the memory embedding is the running
+                mean of the message embeddings, instead of re-encoding the whole (truncated) conversation.
+            storage: An optional storage recording every message. Snapshots keep the memory embedding, so that
+                nothing is re-encoded on restore.
+            llm: Unused. Accepted so that an `Agent` can be created with this strategy.
         """
-        self.history: List[Dict[str, str]] = []
-        self.tokenizer = BertTokenizer.from_pretrained(model_name)
-        self.model = BertModel.from_pretrained(model_name)
+        super().__init__(llm=llm, token_counter=token_counter, storage=storage)
+        self.history: List[Message] = []
+        self.model_name = model_name
+        self._tokenizer = None
+        self._model = None
+        self.embedding_cache = embedding_cache
+        self.incremental = incremental
         self.memory_embedding = None
+        # Running sum of the message embeddings in incremental mode.
+        self._embedding_sum = None
+
+    @property
+    def tokenizer(self) -> Any:
+        """The tokenizer, loaded on first use and shared by every instance using the same model."""
+        if self._tokenizer is None:
+            tokenizer_class = _lazy("BertTokenizer")
+            self._tokenizer = shared_models.get((tokenizer_class, self.model_name), lambda: tokenizer_class.from_pretrained(self.model_name))
+        return self._tokenizer
+
+    @property
+    def model(self) -> Any:
+        """The transformer model, loaded on first use and shared by every instance using the same model."""
+        if self._model is None:
+            model_class = _lazy("BertModel")
+            self._model = shared_models.get((model_class, self.model_name), lambda: model_class.from_pretrained(self.model_name))
+        return self._model
 
     def add_message(self, role: str, content: str) -> None:
         """Adds a message to the memory and updates the memory embedding."""
-        self.history.append({"role": role, "content": content})
-        conversation = "\n".join([f"{msg['role']}: {msg['content']}" for msg in self.history])
-        inputs = self.tokenizer(conversation, return_tensors='pt', truncation=True, max_length=512)
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-        self.memory_embedding = torch.mean(outputs.last_hidden_state, dim=1)
-
-    def get_context(self) -> str:
-        """For this strategy, the raw context is the conversation history.
+        self.add_messages([(role, content)])
+
+    def add_messages(self, messages: Iterable[Tuple[str, str]]) -> None:
+        """
+        Adds several (role, content) messages to the memory and updates the memory embedding once.
+        In incremental mode, all new messages are encoded together in a single batched forward pass.
+        """
+        new_messages = [self._record(Message(role, content)) for role, content in messages]
+        if not new_messages:
+            return
+        self.history.extend(new_messages)
+
+        if self.incremental:
+            batch_sum = self._encode([msg.format() for msg in new_messages]).sum(dim=0, keepdim=True)
+            self._embedding_sum = batch_sum if self._embedding_sum is None else self._embedding_sum + batch_sum
+            self.memory_embedding = self._embedding_sum / len(self.history)
+        else:
+            conversation = "\n".join([msg.format() for msg in self.history])
+            self.memory_embedding = self._encode([conversation])
+
+    def _encode(self, texts: List[str]) -> "torch.Tensor":
+        """
+        Returns the mean-pooled embeddings of the texts as a (len(texts), hidden_size) tensor.
+        Texts missing from the embedding cache are encoded together in one padded forward pass.
+        """
+        import torch
+
+        embeddings: List[Optional[torch.Tensor]] = [None] * len(texts)
+        if self.embedding_cache is not None:
+            for i, text in enumerate(texts):
+                cached = self.embedding_cache.get(self.model_name, text)
+                if cached is not None:
+                    embeddings[i] = torch.from_numpy(cached)
+
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            inputs = self.tokenizer([texts[i] for i in missing], return_tensors='pt', padding=True, truncation=True, max_length=512)
+            with torch.no_grad():
+                outputs = self.model(**inputs)
+            # Average over the real tokens of each text, ignoring padding.
+            mask = inputs["attention_mask"].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+            pooled = (outputs.last_hidden_state * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            for row, i in enumerate(missing):
+                embeddings[i] = pooled[row]
+                if self.embedding_cache is not None:
+                    self.embedding_cache.put(self.model_name, texts[i], pooled[row].numpy())
+        return torch.stack(embeddings)
+
+    def get_context(self, max_tokens: Optional[int] = None) -> str:
+        """For this strategy, the raw context is the conversation history, trimmed to `max_tokens` if given.
            The real value is in the embedding, which isn't directly serializable to a string prompt.
            In a real application, this embedding would be used to influence the next generation step.
         """
-        return "\n".join([f"{msg['role']}: {msg['content']}" for msg in self.history])
+        messages = self._fit_messages(self.history, max_tokens)
+        return "\n".join([msg.format() for msg in messages])
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"history": self.history, "memory_embedding": self.memory_embedding, "embedding_sum": self._embedding_sum}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self.history = state["history"]
+        self.memory_embedding = state["memory_embedding"]
+        self._embedding_sum = state["embedding_sum"]
+
+    def _replay(self, messages: Iterable[Message]) -> int:
+        # Replay all messages in one batch, so that they are encoded together.
+        batch = [(message.role, message.content) for message in messages]
+        self.add_messages(batch)
+        return len(batch)
 
     def clear(self) -> None:
         """Clears the memory."""
+        self._clear_storage()
         self.history = []
         self.memory_embedding = None
+        self._embedding_sum = None
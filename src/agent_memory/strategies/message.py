@@ -0,0 +1,64 @@
+import sys
+from typing import Any, Dict, Optional
+
+class Message:
+    """
+    A single conversation message, as stored by every memory strategy.
+
+    Messages are slotted and their roles are interned, so a message costs a fixed handful of pointers
+    instead of a per-message dict. For compatibility with code written against the previous dict
+    representation, fields can also be read by key, e.g. `message["role"]`.
+    """
+
+    __slots__ = ("role", "content", "timestamp", "token_count", "id")
+
+    def __init__(self, role: str, content: str, timestamp: Optional[float] = None, token_count: Optional[int] = None, id: Optional[int] = None):
+        """
+        Initializes the Message.
+
+        Args:
+            role: The role of the author, e.g. "user" or "assistant".
+            content: The text of the message.
+            timestamp: An optional creation time, as seconds since the epoch.
+            token_count: The cached number of tokens of the formatted message, if it has been counted.
+            id: An optional identifier, e.g. the message's position in a persisted log.
+        """
+        self.role = sys.intern(role)
+        self.content = content
+        self.timestamp = timestamp
+        self.token_count = token_count
+        self.id = id
+
+    def format(self) -> str:
+        """Returns the message formatted as a "role: content" line."""
+        return f"{self.role}: {self.content}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the message as a dict, omitting unset optional fields."""
+        data = {"role": self.role, "content": self.content}
+        for field in ("timestamp", "token_count", "id"):
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Message":
+        """Creates a message from a dict such as the ones returned by `to_dict`."""
+        return cls(data["role"], data["content"], timestamp=data.get("timestamp"), token_count=data.get("token_count"), id=data.get("id"))
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Message):
+            return NotImplemented
+        # The token count is a cache and does not take part in equality.
+        return (self.role, self.content, self.timestamp, self.id) == (other.role, other.content, other.timestamp, other.id)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Message(role={self.role!r}, content={self.content!r})"
@@ -1,20 +1,35 @@
-from typing import List, Dict, Any, Optional, TYPE_CHECKING
+import bisect
+import math
+from collections import deque
+from itertools import chain
+from typing import Deque, List, Dict, Any, Optional, Set, Union, TYPE_CHECKING
 from .base import BaseMemory
+from .message import Message
+from .context_buffer import ContextBuffer
+from .paging import EVICTION_POLICIES, EvictionPolicy, Page
+from ..text import extract_keywords
+from ..tokenizers import BaseTokenCounter
 
 if TYPE_CHECKING:
+    from langchain_core.embeddings import Embeddings
     from agent_memory.llms.base import BaseLLM
+    from agent_memory.storage import BaseStorage
 
 class OSLikeMemory(BaseMemory):
     """
     A conceptual memory strategy that mimics operating system memory management principles,
     such as paging or virtual memory, to handle large memory contexts.
-    
-    This implementation uses a simple paging mechanism where messages are stored in 'pages'.
-    When the number of pages exceeds a limit, older pages are 'swapped out' (discarded).
+
+    Messages are stored in fixed-size 'pages'. At most `max_pages` completed pages are resident and part
+    of the context. When the limit is exceeded, the eviction policy picks a page to swap out to the swap
+    store. A page table keeps a keyword summary of every page, resident or not, and `get_context(query=...)`
+    faults the swapped-out pages matching the query back in.
     """
 
-    def __init__(self, llm: Optional["BaseLLM"] = None, page_size: int = 2, max_pages: int = 3):
-        super().__init__(llm=llm)
+    supports_query = True
+
+    def __init__(self, llm: Optional["BaseLLM"] = None, page_size: int = 2, max_pages: int = 3, token_counter: Optional[BaseTokenCounter] = None, storage: Optional["BaseStorage"] = None, eviction: Union[str, EvictionPolicy] = "lru", swap: Optional["BaseStorage"] = None, max_faults: Optional[int] = None, embeddings: Optional["Embeddings"] = None, similarity_threshold: float = 0.5):
+        super().__init__(llm=llm, token_counter=token_counter, storage=storage)
         """
         Initializes the OSLikeMemory.
 
@@ -22,38 +37,220 @@ class OSLikeMemory(BaseMemory):
             llm: An optional instance of a class conforming to BaseLLM.
             page_size: The number of messages per 'page'.
             max_pages: The maximum number of active 'pages' to keep in memory.
+            token_counter: An optional token counter used to fit the context into a token budget.
+            storage: An optional storage recording every message, from which the active pages can be restored.
+            eviction: The page replacement policy: "lru", "lfu", "clock" or an `EvictionPolicy` instance.
+            swap: The storage swapped-out pages are written to. Defaults to an `InMemoryStorage`; pass a
+                `MemoryMappedLog` to move them out of process memory. It must not be the same object as `storage`.
+            max_faults: The maximum number of pages faulted in per query. Defaults to `max_pages`.
+            embeddings: Optional LangChain embeddings. If given, pages are matched against queries by the cosine
+                similarity of their embeddings instead of by shared keywords.
+            similarity_threshold: The minimum cosine similarity for a page to match a query when `embeddings` is given.
         """
-        self.pages: List[List[Dict[str, str]]] = []
-        self.current_page: List[Dict[str, str]] = []
+        if swap is None:
+            from ..storage import InMemoryStorage
+            swap = InMemoryStorage()
+        self.pages: Deque[Page] = deque() # The resident pages, in page order.
+        self.current_page: List[Message] = []
         self.page_size = page_size
         self.max_pages = max_pages
+        self.eviction = EVICTION_POLICIES[eviction]() if isinstance(eviction, str) else eviction
+        self.swap = swap
+        self.max_faults = max_faults
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        # The page table: every completed page by number, and the numbers of the pages containing each keyword.
+        self.page_table: Dict[int, Page] = {}
+        self._keyword_index: Dict[str, List[int]] = {}
+        self._next_page = 0
+        self._stats = {"page_faults": 0, "hits": 0, "evictions": 0, "swap_outs": 0}
+        # The formatted lines of all active pages followed by the current page.
+        self._buffer = ContextBuffer()
 
     def add_message(self, role: str, content: str) -> None:
         """Adds a message to the current page. If the page is full, a new page is created.
-           If max_pages is exceeded, the oldest page is discarded.
+           If max_pages is exceeded, a page chosen by the eviction policy is swapped out.
         """
-        self.current_page.append({"role": role, "content": content})
+        self.current_page.append(self._record(Message(role, content)))
+        self._buffer.append(f"{role}: {content}")
         if len(self.current_page) >= self.page_size:
-            self.pages.append(self.current_page[:])
-            self.current_page = []
-            
-            if len(self.pages) > self.max_pages:
-                self.pages.pop(0) # Discard the oldest page
+            self._complete_page()
 
-    def get_context(self) -> str:
+    def _complete_page(self) -> None:
+        """Enters the current page into the page table as a resident page and starts a new one."""
+        messages = self.current_page
+        self.current_page = []
+        text = "\n".join([msg.format() for msg in messages])
+        keywords = frozenset(extract_keywords(text))
+        vector = self._embed_page(text) if self.embeddings is not None else None
+        page = Page(self._next_page, messages, keywords, vector)
+        self._next_page += 1
+        self.page_table[page.number] = page
+        for keyword in keywords:
+            self._keyword_index.setdefault(keyword, []).append(page.number)
+        # Completed pages are newer than every resident page, so the lines in the buffer stay in page order.
+        self.pages.append(page)
+        self.eviction.insert(page.number)
+        self._evict_excess()
+
+    def get_context(self, query: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
         """
         Retrieves the context from all active pages, simulating a contiguous memory space.
+        If a query is given, the swapped-out pages matching it are faulted in first, and the resident
+        pages matching it count as referenced for the eviction policy.
+        If `max_tokens` is given, only the most recent messages that fit are returned.
         """
-        all_messages = []
-        for page in self.pages:
-            all_messages.extend(page)
-        all_messages.extend(self.current_page) # Add messages from the current, uncommitted page
-        
-        return "\n".join([f"{msg['role']}: {msg['content']}" for msg in all_messages])
+        if query:
+            self._fault_in(query)
+        if max_tokens is None:
+            return self._buffer.text()
+        # Walk the current, uncommitted page and then the active pages from newest to oldest, without copying them.
+        newest_first = chain(reversed(self.current_page), *(reversed(page.messages) for page in reversed(self.pages)))
+        return self._buffer.tail(self._fitting_count(newest_first, max_tokens))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the paging counters: page faults, hits (resident pages referenced by a query), the hit rate,
+        evictions, swap-outs (evictions that had to write the page), and the resident and swapped-out page counts.
+        """
+        references = self._stats["hits"] + self._stats["page_faults"]
+        return {
+            **self._stats,
+            "hit_rate": self._stats["hits"] / references if references else 0.0,
+            "resident_pages": len(self.pages),
+            "swapped_pages": len(self.page_table) - len(self.pages),
+        }
+
+    def _fault_in(self, query: str) -> None:
+        """Makes the pages matching the query resident, swapping out others as needed."""
+        matches = self._match_pages(query)
+        max_faults = self.max_pages if self.max_faults is None else self.max_faults
+        referenced: Set[int] = set()
+        faulted: List[Page] = []
+        for number in matches:
+            page = self.page_table[number]
+            if page.resident:
+                self._stats["hits"] += 1
+                self.eviction.access(number)
+                referenced.add(number)
+            elif len(faulted) < max_faults:
+                faulted.append(page)
+                referenced.add(number)
+        for page in faulted:
+            self._stats["page_faults"] += 1
+            messages = self.swap.load_state(self._swap_key(page.number))
+            if messages is None:
+                raise LookupError(f"Page {page.number} is missing from the swap store. Was the memory restored with a different swap?")
+            page.messages = messages
+            self.pages.insert(bisect.bisect([resident.number for resident in self.pages], page.number), page)
+            self.eviction.insert(page.number)
+        if faulted:
+            self._evict_excess(protected=referenced, rebuild=True)
+
+    def _match_pages(self, query: str) -> List[int]:
+        """Returns the numbers of the pages matching the query, best match first."""
+        if self.embeddings is not None:
+            return self._match_pages_by_embedding(query)
+        scores: Dict[int, float] = {}
+        for keyword in set(extract_keywords(query)):
+            numbers = self._keyword_index.get(keyword)
+            if not numbers:
+                continue
+            # Rarer keywords say more about which page is meant.
+            weight = math.log(1 + len(self.page_table) / len(numbers))
+            for number in numbers:
+                scores[number] = scores.get(number, 0.0) + weight
+        return sorted(scores, key=lambda number: (-scores[number], -number))
+
+    def _match_pages_by_embedding(self, query: str) -> List[int]:
+        import numpy as np
+
+        pages = [page for page in self.page_table.values() if page.vector is not None]
+        if not pages:
+            return []
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+        similarities = np.stack([page.vector for page in pages]) @ query_vector
+        order = np.argsort(-similarities, kind="stable")
+        return [pages[i].number for i in order if similarities[i] >= self.similarity_threshold]
+
+    def _embed_page(self, text: str) -> Any:
+        import numpy as np
+
+        vector = np.asarray(self.embeddings.embed_documents([text])[0], dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _evict_excess(self, protected: Set[int] = frozenset(), rebuild: bool = False) -> None:
+        """Swaps out pages chosen by the eviction policy until at most `max_pages` are resident."""
+        while len(self.pages) > self.max_pages:
+            number = self.eviction.victim(protected)
+            self.eviction.remove(number)
+            page = self.page_table[number]
+            if not page.swapped:
+                # Pages are immutable, so a page that was swapped out before is still in the swap store.
+                self.swap.save_state(self._swap_key(number), page.messages)
+                page.swapped = True
+                self._stats["swap_outs"] += 1
+            self._stats["evictions"] += 1
+            if self.pages[0] is page and not rebuild:
+                self.pages.popleft()
+                self._buffer.popleft(len(page.messages))
+            else:
+                self.pages.remove(page)
+                rebuild = True
+            page.messages = None
+        if rebuild:
+            self._rebuild_buffer()
+
+    def _rebuild_buffer(self) -> None:
+        """Refills the context buffer after the resident pages changed other than at the oldest end."""
+        self._buffer.clear()
+        for message in chain(*(page.messages for page in self.pages), self.current_page):
+            self._buffer.append(message.format())
+
+    @staticmethod
+    def _swap_key(number: int) -> str:
+        return f"page-{number}"
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            "pages": [page.number for page in self.pages],
+            "current_page": self.current_page,
+            "page_table": self.page_table,
+            "keyword_index": self._keyword_index,
+            "next_page": self._next_page,
+            "eviction": self.eviction,
+            "stats": dict(self._stats),
+            # A swap that does not outlive this object is saved with the snapshot, so that swapped-out pages survive a restore.
+            "swapped_pages": None if self.swap.durable else {
+                number: self.swap.load_state(self._swap_key(number)) for number, page in self.page_table.items() if page.swapped
+            },
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self.page_table = state["page_table"]
+        self.pages = deque(self.page_table[number] for number in state["pages"])
+        self.current_page = state["current_page"]
+        self._keyword_index = state["keyword_index"]
+        self._next_page = state["next_page"]
+        self.eviction = state["eviction"]
+        self._stats = state["stats"]
+        for number, messages in (state.get("swapped_pages") or {}).items():
+            self.swap.save_state(self._swap_key(number), messages)
+        self._rebuild_buffer()
 
     def clear(self) -> None:
         """
-        Clears all pages and the current page.
+        Clears all pages, the current page and the swap store.
         """
-        self.pages = []
+        self._clear_storage()
+        if not self._restoring:
+            self.swap.clear()
+        self.pages = deque()
         self.current_page = []
+        self.page_table = {}
+        self._keyword_index = {}
+        self._next_page = 0
+        self.eviction.clear()
+        self._stats = {"page_faults": 0, "hits": 0, "evictions": 0, "swap_outs": 0}
+        self._buffer.clear()
@@ -0,0 +1,187 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Container, Dict, FrozenSet, List, Optional
+from .message import Message
+
+class Page:
+    """
+    An entry of OSLikeMemory's page table.
+
+    Every completed page keeps its keyword summary (and optionally an embedding of its text) for its whole
+    life, so that it can be matched against queries while it is swapped out. Its messages are only held
+    while it is resident.
+    """
+
+    __slots__ = ("number", "messages", "keywords", "vector", "swapped")
+
+    def __init__(self, number: int, messages: List[Message], keywords: FrozenSet[str], vector: Optional[Any] = None):
+        """
+        Initializes the Page.
+
+        Args:
+            number: The page number, which orders pages chronologically.
+            messages: The messages of the page.
+            keywords: The keywords of the page's messages.
+            vector: An optional embedding of the page's text.
+        """
+        self.number = number
+        self.messages: Optional[List[Message]] = messages
+        self.keywords = keywords
+        self.vector = vector
+        self.swapped = False  # Whether a copy of the messages is in the swap store.
+
+    @property
+    def resident(self) -> bool:
+        return self.messages is not None
+
+
+class EvictionPolicy(ABC):
+    """
+    Abstract Base Class for the page replacement policies of OSLikeMemory.
+    The policy tracks the resident pages by number and chooses which one to swap out.
+    """
+
+    @abstractmethod
+    def insert(self, page: int) -> None:
+        """Starts tracking a page that became resident."""
+        pass
+
+    @abstractmethod
+    def access(self, page: int) -> None:
+        """Records that a resident page was referenced."""
+        pass
+
+    @abstractmethod
+    def remove(self, page: int) -> None:
+        """Stops tracking a page that was swapped out."""
+        pass
+
+    @abstractmethod
+    def victim(self, protected: Container[int] = ()) -> int:
+        """
+        Returns the page to swap out.
+
+        Args:
+            protected: Pages that should not be chosen, e.g. the ones a query just referenced. They are only
+                chosen if every tracked page is protected.
+        """
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class LRUEviction(EvictionPolicy):
+    """Swaps out the least recently used page."""
+
+    def __init__(self):
+        self._pages: "OrderedDict[int, None]" = OrderedDict()
+
+    def insert(self, page: int) -> None:
+        self._pages[page] = None
+        self._pages.move_to_end(page)
+
+    def access(self, page: int) -> None:
+        self._pages.move_to_end(page)
+
+    def remove(self, page: int) -> None:
+        del self._pages[page]
+
+    def victim(self, protected: Container[int] = ()) -> int:
+        for page in self._pages:
+            if page not in protected:
+                return page
+        return next(iter(self._pages))
+
+    def clear(self) -> None:
+        self._pages.clear()
+
+
+class LFUEviction(EvictionPolicy):
+    """Swaps out the least frequently used page, and the least recently used one among equally used pages."""
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+        self._last_access: Dict[int, int] = {}
+        self._clock = 0
+
+    def insert(self, page: int) -> None:
+        self._counts[page] = 1
+        self._touch(page)
+
+    def access(self, page: int) -> None:
+        self._counts[page] += 1
+        self._touch(page)
+
+    def _touch(self, page: int) -> None:
+        self._clock += 1
+        self._last_access[page] = self._clock
+
+    def remove(self, page: int) -> None:
+        del self._counts[page]
+        del self._last_access[page]
+
+    def victim(self, protected: Container[int] = ()) -> int:
+        candidates = [page for page in self._counts if page not in protected] or list(self._counts)
+        return min(candidates, key=lambda page: (self._counts[page], self._last_access[page]))
+
+    def clear(self) -> None:
+        self._counts.clear()
+        self._last_access.clear()
+        self._clock = 0
+
+
+class ClockEviction(EvictionPolicy):
+    """
+    The second-chance algorithm: pages sit on a circular list with a reference bit, and the clock hand
+    swaps out the first page whose bit is clear, clearing the bits it passes over.
+    """
+
+    def __init__(self):
+        self._ring: List[int] = []
+        self._referenced: Dict[int, bool] = {}
+        self._hand = 0
+
+    def insert(self, page: int) -> None:
+        # Insert behind the hand, so that a new page is the last one the hand reaches.
+        self._ring.insert(self._hand, page)
+        self._hand = (self._hand + 1) % len(self._ring)
+        self._referenced[page] = True
+
+    def access(self, page: int) -> None:
+        self._referenced[page] = True
+
+    def remove(self, page: int) -> None:
+        index = self._ring.index(page)
+        del self._ring[index]
+        del self._referenced[page]
+        if index < self._hand:
+            self._hand -= 1
+        if self._hand >= len(self._ring):
+            self._hand = 0
+
+    def victim(self, protected: Container[int] = ()) -> int:
+        if all(page in protected for page in self._ring):
+            return self._ring[self._hand]
+        # Two sweeps are enough: the first one clears every reference bit it passes over.
+        for _ in range(2 * len(self._ring)):
+            page = self._ring[self._hand]
+            if page not in protected:
+                if not self._referenced[page]:
+                    return page
+                self._referenced[page] = False
+            self._hand = (self._hand + 1) % len(self._ring)
+        return self._ring[self._hand]
+
+    def clear(self) -> None:
+        self._ring.clear()
+        self._referenced.clear()
+        self._hand = 0
+
+
+EVICTION_POLICIES = {
+    "lru": LRUEviction,
+    "lfu": LFUEviction,
+    "clock": ClockEviction,
+}
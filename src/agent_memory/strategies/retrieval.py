@@ -1,44 +1,236 @@
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple, Union, TYPE_CHECKING
 from .base import BaseMemory
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
+from .message import Message
 from ..config import OPENAI_API_KEY
+from ..lazy import lazy_attribute
+from ..tokenizers import BaseTokenCounter
+
+if TYPE_CHECKING:
+    from langchain_core.embeddings import Embeddings
+    from agent_memory.embeddings import EmbeddingCache
+    from agent_memory.llms.base import BaseLLM
+    from agent_memory.search import BM25Index, VectorIndex
+    from agent_memory.storage import BaseStorage
+
+# Heavy dependencies, imported on first use so that importing this module stays cheap.
+_LAZY_IMPORTS = {
+    "CharacterTextSplitter": ("langchain.text_splitter", "CharacterTextSplitter"),
+    "FAISS": ("langchain_community.vectorstores", "FAISS"),
+    "OpenAIEmbeddings": ("langchain_openai", "OpenAIEmbeddings"),
+}
+
+# The rank constant of reciprocal rank fusion.
+RRF_K = 60
+
+def _lazy(name: str) -> Any:
+    return lazy_attribute(globals(), name, _LAZY_IMPORTS)
+
+def __getattr__(name: str) -> Any:
+    return _lazy(name)
 
 class RetrievalMemory(BaseMemory):
     """
     A memory strategy that uses a retrieval-based model (RAG) to find relevant information.
+
+    By default chunks are embedded with OpenAI embeddings and searched with a LangChain FAISS store. Given a
+    `vector_index`, chunks are searched with an in-process NumPy index from `agent_memory.search` instead, and
+    with `embeddings=HashingEmbeddings()` retrieval runs fully offline.
     """
 
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 0):
+    supports_query = True
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 0, incremental: bool = False, embedding_cache: Optional["EmbeddingCache"] = None, token_counter: Optional[BaseTokenCounter] = None, storage: Optional["BaseStorage"] = None, embeddings: Optional["Embeddings"] = None, vector_index: Union[str, "VectorIndex", None] = None, hybrid: bool = False, llm: Optional["BaseLLM"] = None):
         """
         Initializes the RetrievalMemory.
 
         Args:
             chunk_size: The size of the text chunks to create.
             chunk_overlap: The overlap between text chunks.
+            incremental: If True, only the newly added message is chunked, embedded and appended
+                to the existing index instead of rebuilding it from the full history.
+            embedding_cache: An optional cache shared between strategies so that identical chunks
+                are only embedded once.
+            token_counter: An optional token counter used to fit the context into a token budget.
+            storage: An optional storage recording every message. Snapshots keep the vector index, so that
+                nothing is re-embedded on restore.
+            embeddings: Optional LangChain embeddings, e.g. a local `HashingEmbeddings`. Defaults to OpenAI embeddings.
+            vector_index: If given, the index chunks are searched with instead of FAISS: "exact", "ivf" or a
+                `VectorIndex` instance.
+            hybrid: If True, chunks are also ranked lexically with BM25, and both rankings are merged by
+                reciprocal rank fusion. This finds the exact names, identifiers and numbers that embeddings miss.
+            llm: Unused. Accepted so that an `Agent` can be created with this strategy.
         """
-        self.history: List[Dict[str, str]] = []
-        self.text_splitter = CharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        super().__init__(llm=llm, token_counter=token_counter, storage=storage)
+        self.history: List[Message] = []
+        self.text_splitter = _lazy("CharacterTextSplitter")(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
         self.vector_store = None
-        self.embeddings = OpenAIEmbeddings(api_key=OPENAI_API_KEY)
+        self.embeddings = embeddings if embeddings is not None else _lazy("OpenAIEmbeddings")(api_key=OPENAI_API_KEY)
+        if embedding_cache is not None:
+            from ..embeddings import CachedEmbeddings
+            self.embeddings = CachedEmbeddings(self.embeddings, embedding_cache)
+        if isinstance(vector_index, str):
+            from ..search import VECTOR_INDEXES
+            vector_index = VECTOR_INDEXES[vector_index]()
+        self.index: Optional["VectorIndex"] = vector_index
+        self.bm25: Optional["BM25Index"] = None
+        if hybrid:
+            from ..search import BM25Index
+            self.bm25 = BM25Index()
+        # The text of every chunk by its id, kept when chunks are searched by the local index or BM25.
+        self.chunks: List[str] = []
+        self.incremental = incremental
+        # Maps each indexed chunk id to the (start, end) range of history messages it covers.
+        self.chunk_ranges: Dict[str, Tuple[int, int]] = {}
+        self._indexed_upto = 0
 
     def add_message(self, role: str, content: str) -> None:
         """Adds a message to the memory."""
-        self.history.append({"role": role, "content": content})
-        texts = self.text_splitter.split_text("\n".join([f"{msg['role']}: {msg['content']}" for msg in self.history]))
-        if texts:
-            self.vector_store = FAISS.from_texts(texts, self.embeddings)
+        self.history.append(self._record(Message(role, content)))
+        if self.incremental:
+            self._index_tail()
+            return
+        texts = self.text_splitter.split_text("\n".join([msg.format() for msg in self.history]))
+        if self.index is not None:
+            self.index.clear()
+        if self.bm25 is not None:
+            self.bm25.clear()
+        self.chunks = []
+        self._add_chunks(texts)
+        if self.index is None and texts:
+            metadatas = [{"chunk_id": f"chunk_{i}"} for i in range(len(texts))] if self.bm25 is not None else None
+            self.vector_store = _lazy("FAISS").from_texts(texts, self.embeddings, metadatas=metadatas)
+
+    def _index_tail(self) -> None:
+        """Chunks and embeds only the messages that are not indexed yet and appends them to the index."""
+        start = self._indexed_upto
+        end = len(self.history)
+        tail = "\n".join([msg.format() for msg in self.history[start:end]])
+        texts = self.text_splitter.split_text(tail)
+        if not texts:
+            self._indexed_upto = end
+            return
+
+        ids = [f"chunk_{len(self.chunk_ranges) + i}" for i in range(len(texts))]
+        metadatas = [{"chunk_id": chunk_id, "start": start, "end": end} for chunk_id in ids]
+        # Chunk ids match the ids in the local index and in BM25, as all of them count every chunk in order.
+        self._add_chunks(texts)
+        if self.index is None:
+            if self.vector_store is None:
+                self.vector_store = _lazy("FAISS").from_texts(texts, self.embeddings, metadatas=metadatas, ids=ids)
+            else:
+                self.vector_store.add_texts(texts, metadatas=metadatas, ids=ids)
+        for chunk_id in ids:
+            self.chunk_ranges[chunk_id] = (start, end)
+        self._indexed_upto = end
+
+    def _add_chunks(self, texts: List[str]) -> None:
+        """Appends the texts to the local index and to BM25, embedding them in one batch."""
+        if not texts or (self.index is None and self.bm25 is None):
+            return
+        if self.index is not None:
+            import numpy as np
 
-    def get_context(self, query: Optional[str] = None, k: int = 2) -> str:
-        """Retrieves the most relevant context for a given query."""
+            embed_matrix = getattr(self.embeddings, "embed_matrix", None)
+            vectors = embed_matrix(texts) if embed_matrix is not None else np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+            self.index.add(vectors)
+        if self.bm25 is not None:
+            self.bm25.add(texts)
+        self.chunks.extend(texts)
+
+    def _dense_ids(self, query: str, k: int) -> List[int]:
+        """Returns the ids of the k chunks whose embeddings best match the query, best first."""
+        if self.index is not None:
+            return self.index.search(self.embeddings.embed_query(query), k)[1].tolist()
+        if self.vector_store is None:
+            return []
+        docs = self.vector_store.similarity_search(query, k=k)
+        return [int(doc.metadata["chunk_id"][len("chunk_"):]) for doc in docs]
+
+    def _rank(self, query: str, k: int) -> List[int]:
+        """Returns the ids of the k chunks best matching the query, best first."""
+        if self.bm25 is None:
+            return self._dense_ids(query, k)
+        from ..search import reciprocal_rank_fusion
+
+        # Fuse deeper rankings than k, so that chunks ranked fairly well by both rankers can win.
+        candidates = max(4 * k, 20)
+        rankings = [self.bm25.search(query, candidates)[1].tolist(), self._dense_ids(query, candidates)]
+        return reciprocal_rank_fusion(rankings, k=RRF_K)[:k]
+
+    def get_context(self, query: Optional[str] = None, k: int = 2, max_tokens: Optional[int] = None) -> str:
+        """
+        Retrieves the most relevant context for a given query.
+        If `max_tokens` is given, the best ranked chunks that fit in the budget are kept.
+        """
+        if query and self.chunks:
+            ids = self._rank(query, k)
+            if max_tokens is not None:
+                ids = self._fit_texts([self.chunks[i] for i in ids], max_tokens, items=ids)
+            if self.incremental:
+                # Present the retrieved chunks in conversation order, which is the order of their ids.
+                ids = sorted(ids)
+            return "\n".join([self.chunks[i] for i in ids])
         if query and self.vector_store:
             docs = self.vector_store.similarity_search(query, k=k)
+            if max_tokens is not None:
+                docs = self._fit_documents(docs, max_tokens)
+            if self.incremental:
+                # Present the retrieved chunks in conversation order.
+                docs = sorted(docs, key=lambda doc: self.chunk_ranges.get(doc.metadata.get("chunk_id"), (0, 0)))
             return "\n".join([doc.page_content for doc in docs])
         else:
-            return "\n".join([f"{msg['role']}: {msg['content']}" for msg in self.history])
+            messages = self._fit_messages(self.history, max_tokens)
+            return "\n".join([msg.format() for msg in messages])
+
+    def _fit_documents(self, docs: List, max_tokens: int) -> List:
+        """Keeps the documents, in rank order, whose newline-joined contents fit within `max_tokens`."""
+        kept = set(map(id, self._fit_texts([doc.page_content for doc in docs], max_tokens, items=docs)))
+        return [doc for doc in docs if id(doc) in kept]
+
+    def _fit_texts(self, texts: List[str], max_tokens: int, items: Optional[List] = None) -> List:
+        """Keeps the texts (or the corresponding `items`), in order, whose newline-joined contents fit within `max_tokens`."""
+        selected = []
+        total = 0
+        for text, item in zip(texts, items if items is not None else texts):
+            tokens = self.count_tokens(text) + (1 if selected else 0)
+            if total + tokens <= max_tokens:
+                selected.append(item)
+                total += tokens
+        return selected
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            "history": self.history,
+            "index": self.vector_store.serialize_to_bytes() if self.vector_store is not None else None,
+            "local_index": self.index,
+            "bm25": self.bm25,
+            "chunks": self.chunks,
+            "chunk_ranges": self.chunk_ranges,
+            "indexed_upto": self._indexed_upto,
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self.history = state["history"]
+        if state["index"] is not None:
+            # The index was serialized by this class, from the same trusted storage as the rest of the state.
+            self.vector_store = _lazy("FAISS").deserialize_from_bytes(state["index"], self.embeddings, allow_dangerous_deserialization=True)
+        if state.get("local_index") is not None:
+            self.index = state["local_index"]
+        if state.get("bm25") is not None:
+            self.bm25 = state["bm25"]
+        self.chunks = state.get("chunks", [])
+        self.chunk_ranges = state["chunk_ranges"]
+        self._indexed_upto = state["indexed_upto"]
 
     def clear(self) -> None:
         """Clears the memory."""
+        self._clear_storage()
         self.history = []
         self.vector_store = None
+        if self.index is not None:
+            self.index.clear()
+        if self.bm25 is not None:
+            self.bm25.clear()
+        self.chunks = []
+        self.chunk_ranges = {}
+        self._indexed_upto = 0
@@ -1,27 +1,65 @@
-from typing import List, Dict, Optional, TYPE_CHECKING
+from typing import Iterator, List, Dict, Optional, Sequence, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from agent_memory.llms.base import BaseLLM
+    from agent_memory.storage import BaseStorage
 from .base import BaseMemory
+from .message import Message
+from .context_buffer import ContextBuffer
+from ..tokenizers import BaseTokenCounter
 
 class SequentialMemory(BaseMemory):
     """
     The most basic memory strategy. It stores the entire conversation history.
     """
 
-    def __init__(self, llm: Optional["BaseLLM"] = None):
-        super().__init__(llm=llm)
-        self.history: List[Dict[str, str]] = []
+    def __init__(self, llm: Optional["BaseLLM"] = None, token_counter: Optional[BaseTokenCounter] = None, storage: Optional["BaseStorage"] = None):
+        """
+        Initializes the SequentialMemory.
+
+        Args:
+            llm: An optional instance of a class conforming to BaseLLM.
+            token_counter: An optional token counter used to fit the context into a token budget.
+            storage: An optional storage. If given, the history is read from the storage's log as needed
+                instead of being held in memory.
+        """
+        super().__init__(llm=llm, token_counter=token_counter, storage=storage)
+        self.history: Sequence[Message] = []
+        if storage is not None:
+            from ..storage import StoredMessages
+            self.history = StoredMessages(storage)
+        self._buffer = ContextBuffer()
 
     def add_message(self, role: str, content: str) -> None:
         """Adds a message to the memory."""
-        self.history.append({"role": role, "content": content})
+        message = self._record(Message(role, content))
+        if self.storage is None:
+            self.history.append(message)
+            self._buffer.append(message.format())
+
+    def get_context(self, max_tokens: Optional[int] = None) -> str:
+        """Retrieves the entire conversation history as a single string, or its most recent part that fits in `max_tokens`."""
+        if self.storage is not None:
+            messages = self._fit_recent(max_tokens) if max_tokens is not None else self.history
+            return "\n".join([msg.format() for msg in messages])
+        if max_tokens is None:
+            return self._buffer.text()
+        return self._buffer.tail(self._fitting_count(reversed(self.history), max_tokens))
 
-    def get_context(self) -> str:
-        """Retrieves the entire conversation history as a single string."""
-        return "\n".join([f"{msg['role']}: {msg['content']}" for msg in self.history])
+    def _fit_recent(self, max_tokens: int) -> List[Message]:
+        """Pages in only the most recent stored messages that fit within `max_tokens`."""
+        count = self._fitting_count(reversed(self.history), max_tokens)
+        return self.history[len(self.history) - count:] if count else []
+
+    def _replay(self, messages: Iterator[Message]) -> int:
+        # The history is read from the storage's log directly, so there is nothing to replay.
+        return 0
 
     def clear(self) -> None:
         """Clears the memory."""
-        self.history = []
-
+        self._clear_storage()
+        if self.storage is not None:
+            self.history.clear_cache()
+        else:
+            self.history = []
+        self._buffer.clear()
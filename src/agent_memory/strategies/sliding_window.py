@@ -1,34 +1,57 @@
-from typing import List, Dict, Optional, TYPE_CHECKING
+from typing import Any, List, Dict, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from agent_memory.llms.base import BaseLLM
+    from agent_memory.storage import BaseStorage
 from collections import deque
 from .base import BaseMemory
+from .message import Message
+from .context_buffer import ContextBuffer
+from ..tokenizers import BaseTokenCounter
 
 class SlidingWindowMemory(BaseMemory):
     """
     A memory strategy that keeps a fixed number of recent messages.
     """
 
-    def __init__(self, llm: Optional["BaseLLM"] = None, window_size: int = 5):
-        super().__init__(llm=llm)
+    def __init__(self, llm: Optional["BaseLLM"] = None, window_size: int = 5, token_counter: Optional[BaseTokenCounter] = None, storage: Optional["BaseStorage"] = None):
+        super().__init__(llm=llm, token_counter=token_counter, storage=storage)
         """
         Initializes the SlidingWindowMemory.
 
         Args:
             llm: An optional instance of a class conforming to BaseLLM.
             window_size: The number of messages to keep in the memory.
+            token_counter: An optional token counter used to fit the context into a token budget.
+            storage: An optional storage recording every message, from which the window can be restored.
         """
         self.history: deque = deque(maxlen=window_size)
+        self._buffer = ContextBuffer()
 
     def add_message(self, role: str, content: str) -> None:
         """Adds a message to the memory."""
-        self.history.append({"role": role, "content": content})
+        if len(self.history) == self.history.maxlen:
+            self._buffer.popleft() # The deque drops its oldest message on append
+        self.history.append(self._record(Message(role, content)))
+        if self.history.maxlen != 0:
+            self._buffer.append(f"{role}: {content}")
 
-    def get_context(self) -> str:
-        """Retrieves the conversation history within the window as a single string."""
-        return "\n".join([f"{msg['role']}: {msg['content']}" for msg in self.history])
+    def get_context(self, max_tokens: Optional[int] = None) -> str:
+        """Retrieves the conversation history within the window as a single string, trimmed to `max_tokens` if given."""
+        if max_tokens is None:
+            return self._buffer.text()
+        return self._buffer.tail(self._fitting_count(reversed(self.history), max_tokens))
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"history": list(self.history)}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self.history.extend(state["history"])
+        for message in self.history:
+            self._buffer.append(message.format())
 
     def clear(self) -> None:
         """Clears the memory."""
+        self._clear_storage()
         self.history.clear()
+        self._buffer.clear()
@@ -1,34 +1,103 @@
-from typing import List, Dict, TYPE_CHECKING
+from typing import Any, Iterator, List, Dict, Optional, Sequence, TYPE_CHECKING
 from .base import BaseMemory
+from .message import Message
+from ..tokenizers import BaseTokenCounter
 
 if TYPE_CHECKING:
     from agent_memory.llms.base import BaseLLM
+    from agent_memory.storage import BaseStorage
 
 class SummarizationMemory(BaseMemory):
     """
     A memory strategy that summarizes the conversation history to keep the context concise.
     """
 
-    def __init__(self, llm: "BaseLLM", summary_prompt: str = "Summarize the following conversation:"):
-        super().__init__(llm=llm)
-        self.history: List[Dict[str, str]] = []
+    def __init__(self, llm: "BaseLLM", summary_prompt: str = "Summarize the following conversation:", incremental: bool = False, update_prompt: str = "Update the summary of a conversation with the new messages below. Return only the updated summary.", token_counter: Optional[BaseTokenCounter] = None, storage: Optional["BaseStorage"] = None):
+        """
+        Initializes the SummarizationMemory.
+
+        Args:
+            llm: An instance of a class conforming to BaseLLM.
+            summary_prompt: The prompt used to summarize the conversation.
+            incremental: If True, only the messages added since the last summary are sent to the LLM,
+                together with that summary, so the prompt size stays roughly constant per call.
+            update_prompt: The prompt used to fold new messages into the previous summary in incremental mode.
+            token_counter: An optional token counter used to fit the context into a token budget.
+            storage: An optional storage. If given, the history is read from the storage's log as needed
+                instead of being held in memory, and snapshots keep the summary so that it is not recomputed on restore.
+        """
+        super().__init__(llm=llm, token_counter=token_counter, storage=storage)
+        self.history: Sequence[Message] = []
+        if storage is not None:
+            from ..storage import StoredMessages
+            self.history = StoredMessages(storage)
         self.summary_prompt = summary_prompt
+        self.update_prompt = update_prompt
+        self.incremental = incremental
         self.llm = llm
+        # The latest summary and the number of history messages it covers.
+        self.summary: str = ""
+        self._summarized_upto = 0
 
     def add_message(self, role: str, content: str) -> None:
         """Adds a message to the memory."""
-        self.history.append({"role": role, "content": content})
+        message = self._record(Message(role, content))
+        if self.storage is None:
+            self.history.append(message)
+
+    def get_context(self, max_tokens: Optional[int] = None) -> str:
+        """Summarizes the conversation history and returns the summary, truncated to `max_tokens` if given."""
+        count = len(self.history)
+        prompt = self._build_prompt(count)
+        if prompt is not None:
+            self._store_summary(self.llm.invoke(prompt).content, count)
+        return self._truncate(self.summary, max_tokens)
+
+    async def aget_context(self, max_tokens: Optional[int] = None) -> str:
+        """Asynchronously summarizes the conversation history and returns the summary."""
+        count = len(self.history)
+        prompt = self._build_prompt(count)
+        if prompt is not None:
+            self._store_summary((await self.llm.ainvoke(prompt)).content, count)
+        return self._truncate(self.summary, max_tokens)
+
+    def _build_prompt(self, count: int) -> Optional[str]:
+        """
+        Builds the summarization prompt for the first `count` messages, or returns None if the cached
+        summary already covers them. In incremental mode, only the messages added since the last summary are included.
+        """
+        if self._summarized_upto == count:
+            return None
+
+        if self.incremental and self.summary:
+            new_messages = "\n".join([msg.format() for msg in self.history[self._summarized_upto:count]])
+            return f"{self.update_prompt}\n\nPrevious summary:\n{self.summary}\n\nNew messages:\n{new_messages}"
+
+        conversation = "\n".join([msg.format() for msg in self.history[:count]])
+        return f"{self.summary_prompt}\n\n{conversation}"
+
+    def _store_summary(self, summary: str, count: int) -> None:
+        """Caches the summary of the first `count` messages until the next message is added."""
+        self.summary = summary
+        self._summarized_upto = count
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"summary": self.summary, "summarized_upto": self._summarized_upto}
 
-    def get_context(self) -> str:
-        """Summarizes the conversation history and returns the summary."""
-        if not self.history:
-            return ""
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self.summary = state["summary"]
+        self._summarized_upto = state["summarized_upto"]
 
-        conversation = "\n".join([f"{msg['role']}: {msg['content']}" for msg in self.history])
-        prompt = f"{self.summary_prompt}\n\n{conversation}"
-        response = self.llm.invoke(prompt)
-        return response.content
+    def _replay(self, messages: Iterator[Message]) -> int:
+        # The history is read from the storage's log directly, so there is nothing to replay.
+        return 0
 
     def clear(self) -> None:
         """Clears the memory."""
-        self.history = []
+        self._clear_storage()
+        if self.storage is not None:
+            self.history.clear_cache()
+        else:
+            self.history = []
+        self.summary = ""
+        self._summarized_upto = 0
@@ -0,0 +1,32 @@
+import re
+from typing import List
+
+_TERM_RE = re.compile(r"[a-z0-9]+")
+_ENTITY_RE = re.compile(r"\b[A-Z][A-Za-z0-9-]+")
+
+# Words too common to say anything about what a message is about. They are neither indexed nor
+# treated as entities, which also keeps their posting lists from dominating queries.
+STOPWORDS = frozenset("""
+a about after again all also am an and any are as at be because been before being but by can could
+did do does doing for from had has have having he her here hers him his how i if in into is it its just
+me more most my no nor not now of off on once only or other our ours out over own same she should so
+some such than that the their theirs them then there these they this those through to too under until
+up very was we were what when where which while who whom why will with would you your yours
+""".split())
+
+
+def extract_keywords(text: str) -> List[str]:
+    """Returns the indexable keywords of the text, lowercased and in order of appearance."""
+    return [term for term in _TERM_RE.findall(text.lower()) if len(term) > 1 and term not in STOPWORDS]
+
+
+def extract_entities(text: str) -> List[str]:
+    """Returns the distinct capitalized names mentioned in the text, as a simple stand-in for entity extraction."""
+    entities = []
+    seen = set()
+    for entity in _ENTITY_RE.findall(text):
+        key = entity.lower()
+        if key not in STOPWORDS and key not in seen:
+            seen.add(key)
+            entities.append(entity)
+    return entities
@@ -0,0 +1,102 @@
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+
+class BaseTokenCounter(ABC):
+    """
+    Abstract Base Class for token counters.
+    Memory strategies use a token counter to fit their context into a token budget.
+    """
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Returns the number of tokens in the text."""
+        pass
+
+    @abstractmethod
+    def truncate(self, text: str, max_tokens: int, from_end: bool = False) -> str:
+        """
+        Truncates the text to at most `max_tokens` tokens.
+
+        Args:
+            text: The text to truncate.
+            max_tokens: The maximum number of tokens to keep.
+            from_end: If True, the end of the text is kept instead of the start.
+        """
+        pass
+
+
+class ApproximateTokenCounter(BaseTokenCounter):
+    """
+    Estimates token counts from the text length. Needs no tokenizer files, which makes it
+    a fast, dependency-free fallback.
+    """
+
+    def __init__(self, chars_per_token: int = 4):
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def truncate(self, text: str, max_tokens: int, from_end: bool = False) -> str:
+        max_chars = max(max_tokens, 0) * self.chars_per_token
+        if len(text) <= max_chars:
+            return text
+        return text[len(text) - max_chars:] if from_end else text[:max_chars]
+
+
+class TiktokenCounter(BaseTokenCounter):
+    """
+    Counts tokens with a `tiktoken` encoding, matching what OpenAI models are billed for.
+    """
+
+    def __init__(self, encoding_name: str = "cl100k_base", model: Optional[str] = None):
+        """
+        Initializes the TiktokenCounter.
+
+        Args:
+            encoding_name: The name of the tiktoken encoding to use.
+            model: An optional model name whose encoding takes precedence over `encoding_name`.
+        """
+        import tiktoken
+
+        self.encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(encoding_name)
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int, from_end: bool = False) -> str:
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        if max_tokens <= 0:
+            return ""
+        return self.encoding.decode(tokens[-max_tokens:] if from_end else tokens[:max_tokens])
+
+
+_default_token_counter: Optional[BaseTokenCounter] = None
+_default_lock = threading.Lock()
+
+
+def get_default_token_counter() -> BaseTokenCounter:
+    """
+    Returns the process-wide default token counter.
+    This is a `TiktokenCounter` when tiktoken and its encoding files are available,
+    and an `ApproximateTokenCounter` otherwise.
+    """
+    global _default_token_counter
+    with _default_lock:
+        if _default_token_counter is None:
+            try:
+                _default_token_counter = TiktokenCounter()
+            except Exception:
+                _default_token_counter = ApproximateTokenCounter()
+        return _default_token_counter
+
+
+def set_default_token_counter(token_counter: Optional[BaseTokenCounter]) -> None:
+    """Sets the process-wide default token counter. Passing None restores the automatic choice."""
+    global _default_token_counter
+    with _default_lock:
+        _default_token_counter = token_counter
@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from unittest.mock import MagicMock, patch
 from agent_memory.agent import Agent
@@ -11,6 +12,7 @@ from agent_memory.strategies.graph_based import GraphBasedMemory
 from agent_memory.strategies.compression_consolidation import CompressionConsolidationMemory
 from agent_memory.strategies.os_like_memory import OSLikeMemory
 from agent_memory.llms.base import BaseLLM
+from agent_memory.tokenizers import ApproximateTokenCounter
 
 # Mock the LLM to avoid actual API calls during agent tests
 @pytest.fixture(autouse=True)
@@ -75,4 +77,71 @@ def test_agent_with_compression_consolidation_memory(mock_llm_for_tests):
     context = agent.memory.get_context()
     assert "Mocked LLM response" in context # Compressed summary should be in context
     agent.clear_memory()
-    assert agent.memory.get_context() == ""
\ No newline at end of file
+    assert agent.memory.get_context() == ""
+
+
+def test_agent_achat_with_hierarchical_memory(mock_llm_for_tests):
+    agent = Agent(memory_strategy=HierarchicalMemory, short_term_threshold=2)
+
+    async def converse():
+        return await asyncio.gather(*[agent.achat(f"Msg {i}") for i in range(3)])
+
+    responses = asyncio.run(converse())
+    assert responses == ["Mocked LLM response"] * 3
+    assert "Mocked LLM response" in agent.memory.get_context()
+    assert len(agent.memory.short_term_memory) <= 2
+
+
+
+def test_agent_with_token_budget(mock_llm_for_tests):
+    agent = Agent(memory_strategy=SequentialMemory, max_context_tokens=10)
+    agent.memory.token_counter = ApproximateTokenCounter(chars_per_token=1)
+    agent.chat("A long first message")
+    agent.chat("Hi")
+    prompt = agent.llm.invoke.call_args.args[0]
+    assert prompt == "user: Hi"
+
+
+class StreamingLLM(BaseLLM):
+    def invoke(self, prompt):
+        raise AssertionError("stream_chat should not wait for the full response")
+
+    def stream(self, prompt):
+        yield from ["Streamed ", "LLM ", "response"]
+
+    async def astream(self, prompt):
+        for chunk in self.stream(prompt):
+            yield chunk
+
+
+def test_agent_stream_chat_commits_response_on_completion():
+    agent = Agent(memory_strategy=SequentialMemory, llm=StreamingLLM())
+    assert list(agent.stream_chat("Hello")) == ["Streamed ", "LLM ", "response"]
+    assert agent.memory.get_context() == "user: Hello\nassistant: Streamed LLM response"
+
+    async def consume():
+        return [chunk async for chunk in agent.astream_chat("Again")]
+
+    assert asyncio.run(consume()) == ["Streamed ", "LLM ", "response"]
+    assert agent.memory.get_context().endswith("user: Again\nassistant: Streamed LLM response")
+
+
+def test_agent_stream_chat_discards_partial_response():
+    agent = Agent(memory_strategy=SequentialMemory, llm=StreamingLLM())
+    stream = agent.stream_chat("Hello")
+    assert next(stream) == "Streamed "
+    stream.close()
+    assert agent.memory.get_context() == "user: Hello"
+
+
+def test_agent_queries_retrieval_memory_with_the_user_message(mock_llm_for_tests):
+    from agent_memory.embeddings import HashingEmbeddings
+
+    agent = Agent(memory_strategy=RetrievalMemory, llm=mock_llm_for_tests, incremental=True, embeddings=HashingEmbeddings(), vector_index="exact", hybrid=True)
+    agent.chat("My order number is 88231.")
+    agent.chat("I also like hiking in the Alps.")
+    agent.chat("Where is order 88231?")
+    # The prompt holds the chunks retrieved for the user's message, not the whole conversation.
+    prompt = mock_llm_for_tests.invoke.call_args.args[0]
+    assert "user: My order number is 88231." in prompt
+    assert "hiking" not in prompt
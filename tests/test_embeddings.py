@@ -0,0 +1,62 @@
+import numpy as np
+from unittest.mock import MagicMock
+from agent_memory.embeddings import CachedEmbeddings, EmbeddingCache
+
+
+def test_embedding_cache_lru_eviction():
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("model", "a", [1.0, 0.0])
+    cache.put("model", "b", [0.0, 1.0])
+    assert cache.get("model", "a") is not None  # "a" is now the most recently used entry
+    cache.put("model", "c", [1.0, 1.0])
+
+    assert cache.get("model", "b") is None
+    assert cache.get("model", "a") is not None
+    assert cache.get("model", "c") is not None
+    assert cache.get("other-model", "a") is None  # Keys are namespaced by model id
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 2
+    assert len(cache) == 2
+
+
+def test_embedding_cache_disk_tier_survives_restart(tmp_path):
+    cache = EmbeddingCache(max_entries=1, path=str(tmp_path))
+    cache.put("model", "hello", [0.5, 0.25, 0.125])
+    cache.put("model", "world", [1.0, 2.0])
+
+    # A fresh cache (e.g. after a process restart) reads the vectors back from disk.
+    restarted = EmbeddingCache(max_entries=1, path=str(tmp_path))
+    np.testing.assert_allclose(restarted.get("model", "hello"), [0.5, 0.25, 0.125])
+    np.testing.assert_allclose(restarted.get("model", "world"), [1.0, 2.0])
+    assert restarted.stats() == {"hits": 2, "misses": 0, "memory_entries": 1, "disk_entries": 2}
+
+
+def test_cached_embeddings_skip_repeated_texts():
+    embeddings = MagicMock()
+    embeddings.embed_documents.side_effect = lambda texts: [[float(len(text)), 1.0] for text in texts]
+    embeddings.embed_query.return_value = [3.0, 4.0]
+    cache = EmbeddingCache()
+    cached = CachedEmbeddings(embeddings, cache, model_id="test-model")
+
+    assert cached.embed_documents(["ab", "abc", "ab"]) == [[2.0, 1.0], [3.0, 1.0], [2.0, 1.0]]
+    assert cached.embed_documents(["abc", "abcd"]) == [[3.0, 1.0], [4.0, 1.0]]
+    assert [call.args[0] for call in embeddings.embed_documents.call_args_list] == [["ab", "abc"], ["abcd"]]
+
+    assert cached.embed_query("q") == [3.0, 4.0]
+    assert cached.embed_query("q") == [3.0, 4.0]
+    embeddings.embed_query.assert_called_once()
+    assert cache.hits == 2
+
+
+def test_hashing_embeddings_are_deterministic_and_normalized():
+    from agent_memory.embeddings import HashingEmbeddings
+
+    embeddings = HashingEmbeddings(dimensions=256, char_ngrams=3)
+    matrix = embeddings.embed_matrix(["The cat sat on the mat.", "Cats sit on mats.", "Quarterly tax filing", ""])
+    assert matrix.shape == (4, 256) and matrix.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(matrix[:3], axis=1), 1.0, rtol=1e-5)
+    assert not matrix[3].any()
+    # Character n-grams let inflections match, and unrelated texts stay apart.
+    assert matrix[0] @ matrix[1] > matrix[0] @ matrix[2]
+    assert embeddings.embed_query("The cat sat on the mat.") == matrix[0].tolist()
+    assert HashingEmbeddings(dimensions=256, char_ngrams=3).embed_documents(["Quarterly tax filing"])[0] == matrix[2].tolist()
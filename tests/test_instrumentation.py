@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import pytest
+from unittest.mock import MagicMock
+from agent_memory.agent import Agent
+from agent_memory.instrumentation import AggregatingSink, LoggingSink, OpenTelemetrySink, instrumentation
+from agent_memory.llms.caching_llm import CachingLLM
+from agent_memory.llms.fake_llm import FakeLLM
+from agent_memory.strategies.sequential import SequentialMemory
+from agent_memory.strategies.summarization import SummarizationMemory
+
+
+@pytest.fixture
+def sink():
+    sink = instrumentation.add_sink(AggregatingSink())
+    yield sink
+    instrumentation.remove_sink(sink)
+
+
+def test_agent_turn_is_broken_down_into_spans(sink):
+    llm = FakeLLM()
+    agent = Agent(SummarizationMemory, llm=llm)
+    agent.chat("Hello there")
+    metrics = sink.snapshot()
+    for span in ("agent.chat", "memory.add_message", "memory.get_context", "llm.invoke"):
+        assert metrics["spans"][span]["count"] >= 1
+    assert metrics["spans"]["memory.add_message"]["count"] == 2
+    # One summary and one reply.
+    assert metrics["counters"]["llm.calls"] == 2 == llm.stats()["calls"]
+    assert metrics["counters"]["llm.prompt_chars"] > 0
+    assert metrics["gauges"]["memory.context_chars"]["last"] > 0
+
+
+def test_async_and_streaming_calls_are_instrumented(sink):
+    llm = FakeLLM()
+    asyncio.run(Agent(SequentialMemory, llm=llm).achat("Hello"))
+    list(Agent(SequentialMemory, llm=llm).stream_chat("Hello"))
+
+    async def consume():
+        return [chunk async for chunk in Agent(SequentialMemory, llm=llm).astream_chat("Hello")]
+
+    asyncio.run(consume())
+    spans = sink.snapshot()["spans"]
+    assert spans["memory.aadd_message"]["count"] == 4
+    assert spans["llm.ainvoke"]["count"] == 1
+    assert spans["llm.stream"]["count"] == 1
+    for span in ("agent.achat", "agent.stream_chat", "agent.astream_chat"):
+        assert spans[span]["count"] == 1
+
+
+def test_cache_lookups_are_counted_once(sink):
+    llm = CachingLLM(FakeLLM())
+    llm.invoke("a")
+    llm.invoke("a")
+    counters = sink.snapshot()["counters"]
+    assert counters["llm.calls"] == 1
+    assert counters["llm.cache.hits"] == 1 and counters["llm.cache.misses"] == 1
+
+
+def test_sinks_by_attributes_and_disabled_path():
+    assert not instrumentation.enabled
+    memory = SequentialMemory()
+    memory.add_message("user", "Not recorded")
+    sink = instrumentation.add_sink(AggregatingSink(by_attributes=True))
+    try:
+        memory.add_message("user", "Recorded")
+    finally:
+        instrumentation.remove_sink(sink)
+    assert list(sink.snapshot()["spans"]) == ["memory.add_message{strategy=SequentialMemory}"]
+    assert not instrumentation.enabled
+
+
+def test_logging_and_opentelemetry_sinks(caplog):
+    meter = MagicMock(spec=["create_histogram", "create_counter"])
+    sinks = [LoggingSink(level=logging.INFO), OpenTelemetrySink(meter=meter)]
+    for sink in sinks:
+        instrumentation.add_sink(sink)
+    try:
+        with caplog.at_level(logging.INFO, logger="agent_memory.instrumentation"):
+            memory = SequentialMemory()
+            memory.add_message("user", "Hello")
+            memory.get_context()
+    finally:
+        for sink in sinks:
+            instrumentation.remove_sink(sink)
+    assert "span memory.add_message" in caplog.text
+    meter.create_histogram.assert_any_call("memory.add_message.duration", unit="ms")
+    # Without synchronous gauges in the API, gauges are recorded as histograms.
+    meter.create_histogram.assert_any_call("memory.context_chars")
@@ -0,0 +1,149 @@
+import asyncio
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from langchain_core.messages import AIMessage
+from agent_memory.agent import Agent
+from agent_memory.llms.base import BaseLLM
+from agent_memory.llms.caching_llm import CachingLLM
+from agent_memory.llms.fake_llm import FakeLLM
+from agent_memory.llms.openai_llm import OpenAILLM
+from agent_memory.llms.pool import HTTPClientPool, http_clients
+from agent_memory.storage import MemoryMappedLog
+from agent_memory.strategies.summarization import SummarizationMemory
+
+
+def test_http_client_pool_shares_clients_per_key_and_settings():
+    pool = HTTPClientPool()
+    client = pool.client("endpoint")
+    assert pool.client("endpoint") is client
+    assert pool.client("other") is not client
+    assert pool.client("endpoint", max_connections=5) is not client
+
+    async def get_async_client():
+        first = pool.async_client("endpoint")
+        assert pool.async_client("endpoint") is first
+        return first
+
+    # Async connections cannot cross event loops, so every loop gets its own client.
+    assert asyncio.run(get_async_client()) is not asyncio.run(get_async_client())
+    # The async clients of loops that are still open are closed on their loop.
+    loop = asyncio.new_event_loop()
+    async_client = loop.run_until_complete(get_async_client())
+    pool.close()
+    assert client.is_closed and async_client.is_closed
+    assert len(pool) == 0
+    loop.close()
+
+
+def test_openai_wrappers_reuse_pooled_connections():
+    first = OpenAILLM(api_key="test-key")
+    second = OpenAILLM(api_key="test-key", model="gpt-4o-mini")
+    assert first.llm.http_client is second.llm.http_client is http_clients.client(("openai", None))
+
+    async def get_async_llms():
+        return first._async_llm(), second._async_llm(), first._async_llm()
+
+    first_async, second_async, first_again = asyncio.run(get_async_llms())
+    assert first_async is first_again
+    assert first_async.http_async_client is second_async.http_async_client
+
+
+class CountingLLM(BaseLLM):
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        return AIMessage(content=f"Summary of {prompt}")
+
+
+def test_caching_llm_serves_repeated_prompts_from_cache():
+    upstream = CountingLLM()
+    llm = CachingLLM(upstream, max_entries=2)
+    assert llm.invoke("a").content == "Summary of a"
+    assert llm.invoke("a").content == "Summary of a"
+    assert asyncio.run(llm.ainvoke("a")).content == "Summary of a"
+    assert upstream.calls == 1
+    llm.invoke("b")
+    llm.invoke("c") # Evicts "a", the least recently used prompt
+    llm.invoke("a")
+    assert upstream.calls == 4
+    assert llm.stats()["hits"] == 2 and llm.stats()["entries"] == 2
+
+
+def test_caching_llm_expires_entries_and_keys_on_identity():
+    upstream = CountingLLM()
+    llm = CachingLLM(upstream, ttl=0.05)
+    llm.invoke("a")
+    time.sleep(0.1)
+    llm.invoke("a")
+    assert upstream.calls == 2
+    other = CountingLLM()
+    other.identity = lambda: ("other-model",)
+    assert CachingLLM(other).cache_key("a") != llm.cache_key("a")
+
+
+def test_caching_llm_coalesces_concurrent_identical_requests():
+    upstream = CountingLLM(delay=0.1)
+    llm = CachingLLM(upstream)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(llm.invoke, ["same prompt"] * 8))
+    assert upstream.calls == 1
+    assert all(response is responses[0] for response in responses)
+
+    async def gather():
+        return await asyncio.gather(*(llm.ainvoke("other prompt") for _ in range(8)))
+
+    assert len(set(response.content for response in asyncio.run(gather()))) == 1
+    assert upstream.calls == 2
+
+
+def test_caching_llm_does_not_cache_failures():
+    upstream = MagicMock(spec=BaseLLM)
+    upstream.identity.return_value = ("mock",)
+    upstream.invoke.side_effect = [RuntimeError("rate limited"), AIMessage(content="ok")]
+    llm = CachingLLM(upstream)
+    with pytest.raises(RuntimeError):
+        llm.invoke("a")
+    assert llm.invoke("a").content == "ok"
+
+
+def test_caching_llm_disk_tier_survives_restart(tmp_path):
+    upstream = CountingLLM()
+    CachingLLM(upstream, storage=MemoryMappedLog(str(tmp_path))).invoke("a")
+    restarted = CachingLLM(upstream, storage=MemoryMappedLog(str(tmp_path)))
+    assert restarted.invoke("a").content == "Summary of a"
+    assert upstream.calls == 1
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_caching_llm_releases_the_key_when_the_disk_tier_fails():
+    storage = MagicMock()
+    storage.load_state.side_effect = [OSError("disk unavailable"), None]
+    llm = CachingLLM(CountingLLM(), storage=storage)
+    with pytest.raises(OSError):
+        llm.invoke("a")
+    # The failed lookup no longer holds the key, so the next call is not left waiting for it.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(llm.invoke, "a").result(timeout=5).content == "Summary of a"
+
+
+def test_agent_uses_memory_llm_for_the_strategy():
+    llm = CountingLLM()
+    memory_llm = CachingLLM(llm)
+    agent = Agent(SummarizationMemory, llm=llm, memory_llm=memory_llm)
+    assert agent.llm is llm and agent.memory.llm is memory_llm
+
+
+def test_fake_llm_is_deterministic_and_counts_usage():
+    llm = FakeLLM(response_words=5)
+    response = llm.invoke("Summarize this")
+    assert llm.invoke("Summarize this").content == response.content
+    assert llm.invoke("Something else").content != response.content
+    assert "".join(llm.stream("Summarize this")) == response.content
+    stats = llm.stats()
+    assert stats["calls"] == 4 and stats["prompt_tokens"] > 0 and stats["completion_tokens"] > 0
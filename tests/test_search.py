@@ -0,0 +1,77 @@
+import pickle
+import numpy as np
+import pytest
+from agent_memory.search import ExactIndex, IVFIndex, VECTOR_INDEXES
+
+
+def _clustered(n, dimensions=32, clusters=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions))
+    return (centers[rng.integers(clusters, size=n)] + 0.1 * rng.normal(size=(n, dimensions))).astype(np.float32)
+
+
+def test_exact_index_grows_and_searches():
+    index = ExactIndex()
+    assert index.search(np.ones(4), k=3)[1].tolist() == []
+    index.add(np.eye(4)[:2])
+    ids = index.add(np.array([[0.0, 0.0, 1.0, 0.0], [1.0, 1.0, 0.0, 0.0]] * 40))
+    assert ids[0] == 2 and len(index) == 82
+    scores, ids = index.search([1.0, 0.1, 0.0, 0.0], k=2)
+    assert ids.tolist() == [0, 3]
+    assert scores[0] == pytest.approx(1 / np.sqrt(1.01))
+
+    batch_scores, batch_ids = index.search(np.eye(4)[[2, 1]], k=1)
+    assert batch_ids.tolist() == [[2], [1]]
+    assert batch_scores.shape == (2, 1)
+    with pytest.raises(ValueError):
+        index.add(np.ones(3))
+
+    restored = pickle.loads(pickle.dumps(index))
+    assert len(restored) == 82 and restored.vectors.shape == (82, 4)
+    assert restored.search([1.0, 0.1, 0.0, 0.0], k=2)[1].tolist() == [0, 3]
+
+
+def test_ivf_index_matches_exact_search():
+    vectors = _clustered(2000)
+    queries = _clustered(50, seed=1)
+    exact, ivf = ExactIndex(), VECTOR_INDEXES["ivf"](n_probe=4, train_size=500)
+    for batch in np.array_split(vectors, 8):
+        exact.add(batch)
+        ivf.add(batch)
+    # Trained at 500 vectors, and retrained at 1000 and 2000 to follow the data.
+    assert ivf.trained and ivf._trained_size == 2000
+    assert sum(len(ids) for ids in ivf._lists) == 2000
+
+    _, expected = exact.search(queries, k=10)
+    _, found = ivf.search(queries, k=10)
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(expected.tolist(), found.tolist())])
+    assert recall >= 0.9
+    assert ivf.search(queries[0], k=10)[1].tolist() == found[0].tolist()
+
+    ivf.clear()
+    assert len(ivf) == 0 and not ivf.trained
+
+
+def test_bm25_index_ranks_rare_terms_and_updates_incrementally():
+    from agent_memory.search import BM25Index
+
+    index = BM25Index()
+    index.add(["The weather is nice today.", "My order ORD-4417 has not arrived.", "Nice weather for a walk."])
+    scores, ids = index.search("where is ORD-4417", k=3)
+    assert ids.tolist() == [1] and scores[0] > 0
+    assert index.search("weather", k=3)[1].tolist() in ([0, 2], [2, 0])
+
+    # Document frequencies are read at query time, so new texts change the ranking without a rebuild.
+    assert index.add(["Order ORD-4417 shipped: ORD-4417 left the warehouse."]) == [3]
+    assert index.search("ORD-4417", k=2)[1].tolist() == [3, 1]
+    assert len(pickle.loads(pickle.dumps(index))) == 4
+    index.clear()
+    assert len(index) == 0 and index.search("weather", k=3)[1].tolist() == []
+
+
+def test_reciprocal_rank_fusion():
+    from agent_memory.search import reciprocal_rank_fusion
+
+    # An id ranked well by both rankings beats one ranked first by only one of them.
+    assert reciprocal_rank_fusion([[1, 2, 3], [2, 4, 1]]) == [2, 1, 4, 3]
+    assert reciprocal_rank_fusion([]) == []
@@ -0,0 +1,178 @@
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock
+from agent_memory.llms.base import BaseLLM
+from agent_memory.sessions import SessionManager
+from agent_memory.storage import MemoryMappedLog
+from agent_memory.strategies.sequential import SequentialMemory
+from agent_memory.strategies.summarization import SummarizationMemory
+
+
+def make_llm():
+    llm = MagicMock(spec=BaseLLM)
+    llm.invoke.return_value.content = "Mocked LLM response"
+    llm.ainvoke = AsyncMock(return_value=llm.invoke.return_value)
+    return llm
+
+
+def test_sessions_share_one_llm_and_stay_separate():
+    llm = make_llm()
+    manager = SessionManager(SequentialMemory, llm=llm)
+    manager.chat("alice", "Hello from Alice")
+    manager.chat("bob", "Hello from Bob")
+    assert manager.get("alice").llm is manager.get("bob").llm is llm
+    assert "Alice" in manager.get("alice").memory.get_context()
+    assert "Bob" not in manager.get("alice").memory.get_context()
+    assert "alice" in manager and len(manager) == 2
+
+
+def test_least_recently_used_session_is_evicted_and_rehydrated():
+    llm = make_llm()
+    manager = SessionManager(SummarizationMemory, llm=llm, max_sessions=2)
+    for session_id in ("a", "b"):
+        manager.chat(session_id, f"Hello from {session_id}")
+        manager.chat(session_id, f"Goodbye from {session_id}")
+    contexts = {session_id: manager.get(session_id).memory.get_context() for session_id in ("b", "a")}
+    manager.chat("c", "Hello from c") # "b" is the least recently used session
+    assert manager.loaded_sessions() == ["a", "c"]
+    assert not manager.usage("b")["loaded"]
+
+    calls = llm.invoke.call_count
+    assert manager.get("b").memory.get_context() == contexts["b"]
+    assert llm.invoke.call_count == calls # Rehydrated from the snapshot, not by summarizing again
+    assert manager.loaded_sessions() == ["c", "b"]
+    assert manager.get("a").memory.get_context() == contexts["a"]
+    assert manager.usage()["evictions"] == 3
+    assert manager.usage()["rehydrations"] == 2
+
+
+def test_usage_caps_evict_other_sessions():
+    manager = SessionManager(SequentialMemory, llm=make_llm(), max_tokens=30)
+    manager.chat("a", "A message with several words in it")
+    manager.chat("b", "Another message with several words in it")
+    usage = manager.usage()
+    assert manager.loaded_sessions() == ["b"]
+    assert usage["sessions"] == 2 and usage["loaded_sessions"] == 1
+    assert usage["tokens"] == manager.usage("b")["tokens"]
+    assert manager.usage("a")["messages"] == 2
+    assert manager.usage("a")["bytes"] == len("userA message with several words in itassistantMocked LLM response")
+
+
+def test_sessions_persist_through_storage_factory(tmp_path):
+    llm = make_llm()
+    factory = lambda session_id: MemoryMappedLog(str(tmp_path / session_id))
+    manager = SessionManager(SequentialMemory, llm=llm, max_sessions=1, storage_factory=factory)
+    manager.chat("a", "Remember the number 42")
+    manager.chat("b", "Hello")
+    assert manager.get("a").memory.get_context().startswith("user: Remember the number 42")
+    manager.evict("a")
+
+    # A new process picks the session up from its directory.
+    restarted = SessionManager(SequentialMemory, llm=llm, storage_factory=factory)
+    assert "Remember the number 42" in restarted.get("a").memory.get_context()
+    restarted.delete("a")
+    assert "a" not in restarted
+
+
+def test_achat_and_idle_eviction():
+    manager = SessionManager(SequentialMemory, llm=make_llm())
+    asyncio.run(manager.achat("a", "Hello"))
+    assert "assistant: Mocked LLM response" in manager.get("a").memory.get_context()
+    assert manager.evict_idle(0) == 1
+    assert manager.loaded_sessions() == []
+
+
+def test_os_like_sessions_keep_swapped_pages_through_eviction():
+    from agent_memory.strategies.os_like_memory import OSLikeMemory
+    manager = SessionManager(OSLikeMemory, llm=make_llm(), max_sessions=1, page_size=1, max_pages=1)
+    manager.chat("a", "The Paris trip is in May.")
+    manager.chat("b", "Hello") # Evicts "a"
+    assert manager.chat("a", "Tell me more") == "Mocked LLM response" # Rehydrated, and page 0 is swapped out
+    assert manager.get("a").memory.get_context(query="Is it in May?") == "user: The Paris trip is in May."
+
+
+def test_sessions_in_a_turn_are_not_evicted(tmp_path):
+    started, release = threading.Event(), threading.Event()
+    llm = make_llm()
+
+    def invoke(prompt):
+        if "Slow" in prompt:
+            started.set()
+            release.wait(5)
+        return llm.invoke.return_value
+
+    llm.invoke.side_effect = invoke
+    manager = SessionManager(SequentialMemory, llm=llm, max_sessions=1, storage_factory=lambda session_id: MemoryMappedLog(tmp_path / session_id))
+    turn = threading.Thread(target=manager.chat, args=("a", "Slow question"))
+    turn.start()
+    assert started.wait(5)
+    manager.chat("b", "Hello") # Over the cap, but "a" is pinned by its turn
+    assert manager.loaded_sessions() == ["a", "b"]
+    release.set()
+    turn.join(5)
+    # The turn completed on the open storage, and its end unloaded "b".
+    assert manager.loaded_sessions() == ["a"]
+    assert "assistant: Mocked LLM response" in manager.get("a").memory.get_context()
+
+
+def test_concurrent_achat_turns_of_a_session_are_serialized():
+    llm = make_llm()
+    turns = []
+
+    async def ainvoke(prompt):
+        turns.append(prompt.count("user:"))
+        await asyncio.sleep(0.01)
+        return llm.invoke.return_value
+
+    llm.ainvoke = AsyncMock(side_effect=ainvoke)
+    manager = SessionManager(SequentialMemory, llm=llm)
+
+    async def run():
+        await asyncio.gather(*(manager.achat("a", f"Question {i}") for i in range(3)))
+
+    asyncio.run(run())
+    # Every turn saw the previous turns' messages.
+    assert turns == [1, 2, 3]
+    assert manager.usage("a")["messages"] == 6
+
+
+def test_evicted_sessions_stop_their_background_workers():
+    from agent_memory.strategies.hierarchical import HierarchicalMemory
+
+    def workers():
+        return sum(1 for thread in threading.enumerate() if thread.name.startswith("agent-memory-background"))
+
+    before = workers()
+    manager = SessionManager(HierarchicalMemory, llm=make_llm(), max_sessions=1, short_term_threshold=1, background=True)
+    for _ in range(2):
+        manager.chat("a", "Hello")
+    assert workers() == before + 1
+    manager.get("b") # Evicts "a"
+    assert workers() == before
+    assert "Mocked LLM response" in manager.get("a").memory.long_term_memory
+
+
+def test_sessions_deleted_during_a_turn_are_deleted_when_it_ends(tmp_path):
+    started, release = threading.Event(), threading.Event()
+    llm = make_llm()
+
+    def invoke(prompt):
+        started.set()
+        release.wait(5)
+        return llm.invoke.return_value
+
+    llm.invoke.side_effect = invoke
+    manager = SessionManager(SequentialMemory, llm=llm, storage_factory=lambda session_id: MemoryMappedLog(tmp_path / session_id))
+    responses = []
+    turn = threading.Thread(target=lambda: responses.append(manager.chat("a", "Hello")))
+    turn.start()
+    assert started.wait(5)
+    manager.delete("a") # Deferred until the turn ends
+    assert "a" in manager and manager.loaded_sessions() == ["a"]
+    release.set()
+    turn.join(5)
+    assert responses == ["Mocked LLM response"]
+    assert "a" not in manager and manager.loaded_sessions() == []
+    storage = MemoryMappedLog(tmp_path / "a")
+    assert len(storage) == 0
+    storage.close()
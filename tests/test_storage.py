@@ -0,0 +1,134 @@
+import os
+import pytest
+from unittest.mock import MagicMock
+from agent_memory.llms.base import BaseLLM
+from agent_memory.storage import InMemoryStorage, MemoryMappedLog, StoredMessages
+from agent_memory.strategies.compression_consolidation import CompressionConsolidationMemory
+from agent_memory.strategies.graph_backends import CompactGraphBackend
+from agent_memory.strategies.graph_based import GraphBasedMemory
+from agent_memory.strategies.hierarchical import HierarchicalMemory
+from agent_memory.strategies.message import Message
+from agent_memory.strategies.os_like_memory import OSLikeMemory
+from agent_memory.strategies.sequential import SequentialMemory
+from agent_memory.strategies.sliding_window import SlidingWindowMemory
+from agent_memory.strategies.summarization import SummarizationMemory
+
+
+def make_llm():
+    llm = MagicMock(spec=BaseLLM)
+    llm.invoke.return_value.content = "Mocked summary"
+    return llm
+
+
+def test_memory_mapped_log_survives_restart(tmp_path):
+    log = MemoryMappedLog(str(tmp_path))
+    assert log.append(Message("user", "Hello")) == 0
+    assert log.append(Message("assistant", "Héllo wörld\nwith a newline", timestamp=12.5)) == 1
+    assert log.get(1) == Message("assistant", "Héllo wörld\nwith a newline", timestamp=12.5, id=1)
+    log.save_state("memory", {"summary": "A greeting"})
+    log.close()
+
+    log = MemoryMappedLog(str(tmp_path))
+    assert len(log) == 2
+    assert [msg.content for msg in log.read()] == ["Hello", "Héllo wörld\nwith a newline"]
+    assert [msg.id for msg in log.read(1)] == [1]
+    assert log.load_state("memory") == {"summary": "A greeting"}
+    assert log.load_state("missing") is None
+    assert log.append(Message("user", "Again")) == 2
+    assert log.get(2).content == "Again"
+
+    log.clear()
+    assert len(log) == 0
+    assert log.load_state("memory") is None
+    log.close()
+
+
+def test_memory_mapped_log_recovers_from_partial_write(tmp_path):
+    log = MemoryMappedLog(str(tmp_path))
+    for i in range(3):
+        log.append(Message("user", f"Message {i}"))
+    log.close()
+    # Simulate a crash in the middle of writing the last record, before its index entry.
+    log_path = os.path.join(str(tmp_path), "messages.log")
+    with open(log_path, "r+b") as log_file:
+        log_file.truncate(os.path.getsize(log_path) - 3)
+    index_path = os.path.join(str(tmp_path), "messages.idx")
+    with open(index_path, "r+b") as index_file:
+        index_file.truncate(8)
+
+    log = MemoryMappedLog(str(tmp_path))
+    assert [msg.content for msg in log.read()] == ["Message 0", "Message 1"]
+    log.append(Message("user", "Message 3"))
+    log.close()
+    log = MemoryMappedLog(str(tmp_path))
+    assert [msg.content for msg in log.read()] == ["Message 0", "Message 1", "Message 3"]
+    log.close()
+
+
+def test_stored_messages_view():
+    storage = InMemoryStorage()
+    for i in range(5):
+        storage.append(Message("user", f"Message {i}"))
+    history = StoredMessages(storage, cache_size=2)
+    assert len(history) == 5
+    assert history[-1].content == "Message 4"
+    assert history[-1] is history[4] # Served from the cache
+    assert [msg.content for msg in history[1:3]] == ["Message 1", "Message 2"]
+    assert [msg.content for msg in reversed(history)][:2] == ["Message 4", "Message 3"]
+    with pytest.raises(IndexError):
+        history[5]
+
+
+def test_sequential_memory_reads_history_from_storage(tmp_path):
+    memory = SequentialMemory(storage=MemoryMappedLog(str(tmp_path)))
+    memory.add_message(role="user", content="Hello")
+    memory.add_message(role="assistant", content="Hi there!")
+    assert memory.get_context() == "user: Hello\nassistant: Hi there!"
+    assert memory.get_context(max_tokens=5) == "assistant: Hi there!"
+    memory.storage.close()
+
+    # A new process resumes the session from the log.
+    restarted = SequentialMemory(storage=MemoryMappedLog(str(tmp_path)))
+    assert restarted.restore() == 0
+    assert restarted.get_context() == "user: Hello\nassistant: Hi there!"
+    restarted.clear()
+    assert restarted.get_context() == ""
+    assert len(restarted.storage) == 0
+    restarted.storage.close()
+
+
+@pytest.mark.parametrize("memory_factory", [
+    lambda llm, storage: SlidingWindowMemory(window_size=3, storage=storage),
+    lambda llm, storage: OSLikeMemory(page_size=2, max_pages=2, storage=storage),
+    lambda llm, storage: GraphBasedMemory(storage=storage),
+    lambda llm, storage: GraphBasedMemory(backend=CompactGraphBackend(), storage=storage),
+    lambda llm, storage: HierarchicalMemory(llm=llm, short_term_threshold=2, storage=storage),
+    lambda llm, storage: CompressionConsolidationMemory(llm=llm, compression_threshold=3, storage=storage),
+    lambda llm, storage: SummarizationMemory(llm=llm, storage=storage),
+])
+def test_restore_resumes_without_replaying_llm_calls(tmp_path, memory_factory):
+    storage = MemoryMappedLog(str(tmp_path))
+    llm = make_llm()
+    memory = memory_factory(llm, storage)
+    for i in range(7):
+        memory.add_message(role="user", content=f"Message about Topic{i}")
+    memory.get_context()
+    memory.snapshot()
+    memory.add_message(role="assistant", content="One more after the snapshot")
+    expected = memory.get_context()
+    storage.close()
+
+    restarted_llm = make_llm()
+    restarted = memory_factory(restarted_llm, MemoryMappedLog(str(tmp_path)))
+    restarted.restore()
+    assert restarted.get_context() == expected
+    # Only the message recorded after the snapshot can need the LLM again, never the snapshotted ones.
+    assert restarted_llm.invoke.call_count <= 1
+    restarted.storage.close()
+
+
+def test_restore_rejects_snapshot_of_other_strategy():
+    storage = InMemoryStorage()
+    SlidingWindowMemory(storage=storage).snapshot()
+    with pytest.raises(ValueError):
+        OSLikeMemory(storage=storage).restore()
@@ -1,4 +1,6 @@
+import asyncio
 import os
+import threading
 import pytest
 from unittest.mock import MagicMock, patch
 from agent_memory.strategies.sequential import SequentialMemory
@@ -9,8 +11,18 @@ from agent_memory.strategies.memory_augmented_transformer import MemoryAugmented
 from agent_memory.strategies.hierarchical import HierarchicalMemory
 from agent_memory.strategies.compression_consolidation import CompressionConsolidationMemory
 from agent_memory.strategies.graph_based import GraphBasedMemory
+from agent_memory.strategies.graph_backends import CompactGraphBackend, NetworkXGraphBackend
 from agent_memory.strategies.os_like_memory import OSLikeMemory
+from agent_memory.strategies.message import Message
 from agent_memory.llms.base import BaseLLM
+from agent_memory.tokenizers import ApproximateTokenCounter
+from agent_memory.lazy import shared_models
+
+GRAPH_BACKENDS = [
+    pytest.param(NetworkXGraphBackend, id="networkx"),
+    pytest.param(CompactGraphBackend, id="compact"),
+    pytest.param(lambda: CompactGraphBackend(min_rebuild_edges=0), id="compact-compiled"),
+]
 
 @pytest.fixture(autouse=True)
 def mock_llm_for_strategies(monkeypatch):
@@ -87,8 +99,9 @@ def test_hierarchical_memory(mock_llm_for_strategies):
     assert memory.long_term_memory == ""
 
 
-def test_graph_based_memory():
-    memory = GraphBasedMemory()
+@pytest.mark.parametrize("graph_backend", GRAPH_BACKENDS)
+def test_graph_based_memory(graph_backend):
+    memory = GraphBasedMemory(backend=graph_backend())
     memory.add_message(role="user", content="Hello")
     memory.add_message(role="assistant", content="Hi there!")
     context = memory.get_context()
@@ -140,3 +153,671 @@ def test_summarization_memory(mock_llm_for_strategies):
     assert "Mocked LLM response for summarization/compression" in context
     memory.clear()
     assert memory.get_context() == ""
+
+
+def test_retrieval_memory_incremental_indexing(monkeypatch):
+    mock_embeddings = MagicMock()
+    monkeypatch.setattr("agent_memory.strategies.retrieval.OpenAIEmbeddings", lambda **kwargs: mock_embeddings)
+
+    with patch('langchain_community.vectorstores.faiss.FAISS.from_texts') as mock_faiss_from_texts:
+        mock_instance = MagicMock()
+        mock_faiss_from_texts.return_value = mock_instance
+
+        memory = RetrievalMemory(incremental=True)
+        memory.add_message(role="user", content="What is the capital of France?")
+        memory.add_message(role="assistant", content="The capital of France is Paris.")
+
+        # The index is built once and then only the new message is appended to it.
+        assert mock_faiss_from_texts.call_count == 1
+        assert mock_faiss_from_texts.call_args.args[0] == ["user: What is the capital of France?"]
+        mock_instance.add_texts.assert_called_once()
+        assert mock_instance.add_texts.call_args.args[0] == ["assistant: The capital of France is Paris."]
+        assert memory.chunk_ranges == {"chunk_0": (0, 1), "chunk_1": (1, 2)}
+
+        mock_instance.similarity_search.return_value = [
+            MagicMock(page_content="assistant: The capital of France is Paris.", metadata={"chunk_id": "chunk_1"}),
+            MagicMock(page_content="user: What is the capital of France?", metadata={"chunk_id": "chunk_0"}),
+        ]
+        context = memory.get_context(query="capital", k=2)
+        assert context == "user: What is the capital of France?\nassistant: The capital of France is Paris."
+        memory.clear()
+        assert memory.chunk_ranges == {}
+        assert memory.get_context("irrelevant query") == ""
+
+
+def test_async_llm_strategies(mock_llm_for_strategies):
+    mock_llm_for_strategies.ainvoke.return_value = mock_llm_for_strategies.invoke.return_value
+
+    summarization = SummarizationMemory(llm=mock_llm_for_strategies)
+    hierarchical = HierarchicalMemory(llm=mock_llm_for_strategies, short_term_threshold=2)
+    compression = CompressionConsolidationMemory(llm=mock_llm_for_strategies, compression_threshold=2)
+
+    async def run():
+        for memory in (summarization, hierarchical, compression):
+            for i in range(3):
+                await memory.aadd_message(role="user", content=f"Message {i}")
+        return await summarization.aget_context()
+
+    assert asyncio.run(run()) == "Mocked LLM response for summarization/compression"
+    assert hierarchical.short_term_memory == [Message("user", "Message 2")]
+    assert hierarchical.long_term_memory != ""
+    assert compression.history == [Message("user", "Message 2")]
+    assert len(compression.compressed_memory) == 1
+    mock_llm_for_strategies.invoke.assert_not_called()
+
+
+def test_background_summarization(mock_llm_for_strategies):
+    release = threading.Event()
+
+    def slow_invoke(prompt):
+        release.wait(timeout=5)
+        return MagicMock(content="Background summary")
+
+    mock_llm_for_strategies.invoke.side_effect = slow_invoke
+    hierarchical = HierarchicalMemory(llm=mock_llm_for_strategies, short_term_threshold=2, background=True)
+    compression = CompressionConsolidationMemory(llm=mock_llm_for_strategies, compression_threshold=2, background=True)
+    for memory in (hierarchical, compression):
+        for i in range(3):
+            memory.add_message(role="user", content=f"Message {i}")
+
+    # While the summaries are pending, the raw messages are still served.
+    for memory in (hierarchical, compression):
+        context = memory.get_context()
+        assert "Message 0" in context
+        assert "Background summary" not in context
+
+    release.set()
+    hierarchical.flush(timeout=5)
+    compression.flush(timeout=5)
+    hierarchical_context = hierarchical.get_context()
+    assert "Background summary" in hierarchical_context
+    assert "Message 0" not in hierarchical_context
+    assert "Message 2" in hierarchical_context
+    compression_context = compression.get_context()
+    assert compression_context == "Compressed Past:\nBackground summary\n\nCurrent Conversation:\nuser: Message 2"
+
+
+def test_background_worker_bounds_pending_jobs():
+    from agent_memory.strategies.background import BackgroundWorker
+
+    release = threading.Event()
+    worker = BackgroundWorker(max_pending=1)
+    worker.submit(release.wait, 5)
+    blocked = threading.Thread(target=worker.submit, args=(lambda: None,))
+    blocked.start()
+    blocked.join(timeout=0.2)
+    assert blocked.is_alive() # The second submission waits for a free slot
+    release.set()
+    blocked.join(timeout=5)
+    worker.flush(timeout=5)
+    assert worker.pending == 0
+
+    worker.submit(lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        worker.flush(timeout=5)
+    worker.flush(timeout=5) # Errors are only reported once
+
+
+def test_summarization_memory_caches_and_folds_in_new_messages(mock_llm_for_strategies):
+    memory = SummarizationMemory(llm=mock_llm_for_strategies, incremental=True)
+    memory.add_message(role="user", content="What is the capital of France?")
+    memory.add_message(role="assistant", content="The capital of France is Paris.")
+    memory.get_context()
+    memory.get_context() # Nothing changed, so the cached summary is reused
+    assert mock_llm_for_strategies.invoke.call_count == 1
+
+    memory.add_message(role="user", content="And of Italy?")
+    memory.get_context()
+    assert mock_llm_for_strategies.invoke.call_count == 2
+    prompt = mock_llm_for_strategies.invoke.call_args.args[0]
+    assert "Mocked LLM response for summarization/compression" in prompt # The previous summary
+    assert "user: And of Italy?" in prompt
+    assert "capital of France" not in prompt # Already summarized messages are not resent
+
+
+@pytest.mark.parametrize("memory_factory", [
+    lambda llm, counter: SequentialMemory(token_counter=counter),
+    lambda llm, counter: SlidingWindowMemory(window_size=10, token_counter=counter),
+    lambda llm, counter: OSLikeMemory(page_size=2, max_pages=5, token_counter=counter),
+    lambda llm, counter: GraphBasedMemory(token_counter=counter),
+    lambda llm, counter: GraphBasedMemory(backend=CompactGraphBackend(), token_counter=counter),
+    lambda llm, counter: HierarchicalMemory(llm=llm, short_term_threshold=3, token_counter=counter),
+    lambda llm, counter: CompressionConsolidationMemory(llm=llm, compression_threshold=3, token_counter=counter),
+    lambda llm, counter: SummarizationMemory(llm=llm, token_counter=counter),
+])
+def test_get_context_honours_token_budget(mock_llm_for_strategies, memory_factory):
+    counter = ApproximateTokenCounter(chars_per_token=1)
+    memory = memory_factory(mock_llm_for_strategies, counter)
+    for i in range(8):
+        memory.add_message(role="user", content=f"Message number {i}")
+
+    full_context = memory.get_context()
+    assert memory.get_context(max_tokens=None) == full_context
+    for max_tokens in (0, 20, 60, 90):
+        context = memory.get_context(max_tokens=max_tokens)
+        assert counter.count(context) <= max_tokens
+    if not isinstance(memory, SummarizationMemory):
+        assert "user: Message number 7" in memory.get_context(max_tokens=90)
+    assert memory.get_context(max_tokens=10_000) == full_context
+
+
+def test_retrieval_memory_honours_token_budget(monkeypatch):
+    monkeypatch.setattr("agent_memory.strategies.retrieval.OpenAIEmbeddings", lambda **kwargs: MagicMock())
+    with patch('langchain_community.vectorstores.faiss.FAISS.from_texts') as mock_faiss_from_texts:
+        mock_faiss_from_texts.return_value.similarity_search.return_value = [
+            MagicMock(page_content="A" * 30), MagicMock(page_content="B" * 10), MagicMock(page_content="C" * 10),
+        ]
+        memory = RetrievalMemory(token_counter=ApproximateTokenCounter(chars_per_token=1))
+        memory.add_message(role="user", content="Hello")
+        assert memory.get_context(query="anything", k=3, max_tokens=25) == "B" * 10 + "\n" + "C" * 10
+        assert memory.get_context(max_tokens=3) == ""
+        assert memory.get_context(max_tokens=11) == "user: Hello"
+
+
+def test_context_buffer():
+    from agent_memory.strategies.context_buffer import ContextBuffer
+
+    buffer = ContextBuffer()
+    assert buffer.text() == ""
+    for line in ["user: a", "assistant: bb", "user: multi\nline"]:
+        buffer.append(line)
+    text = buffer.text()
+    assert text == "user: a\nassistant: bb\nuser: multi\nline"
+    assert buffer.text() is text # Unchanged buffers return the cached string
+    assert buffer.tail(2) == "assistant: bb\nuser: multi\nline"
+    buffer.popleft()
+    buffer.append("assistant: c")
+    assert buffer.text() == "assistant: bb\nuser: multi\nline\nassistant: c"
+    buffer.popleft(3)
+    assert buffer.text() == "" and len(buffer) == 0
+    buffer.append("user: d")
+    assert buffer.text() == "user: d"
+
+
+def test_sliding_window_and_os_like_contexts_track_evictions():
+    window = SlidingWindowMemory(window_size=3)
+    pages = OSLikeMemory(page_size=2, max_pages=2)
+    for i in range(11):
+        for memory in (window, pages):
+            memory.add_message(role="user", content=f"Msg {i}")
+            memory.get_context()
+    assert window.get_context() == "\n".join(f"user: Msg {i}" for i in range(8, 11))
+    assert pages.get_context() == "\n".join(f"user: Msg {i}" for i in range(6, 11))
+
+
+def test_message_record():
+    message = Message("user", "Hello", timestamp=1.5)
+    assert message.format() == "user: Hello"
+    assert message["role"] == "user" and message["content"] == "Hello"
+    assert message.role is Message("".join(["us", "er"]), "Hi").role # Roles are interned
+    assert Message.from_dict(message.to_dict()) == message
+    assert message.to_dict() == {"role": "user", "content": "Hello", "timestamp": 1.5}
+    assert not hasattr(message, "__dict__")
+    with pytest.raises(KeyError):
+        message["missing"]
+
+
+class FakeBertTokenizer:
+    """Tokenizes on whitespace, using word lengths as token ids."""
+
+    @classmethod
+    def from_pretrained(cls, model_name):
+        return cls()
+
+    def __call__(self, texts, **kwargs):
+        import torch
+        texts = [texts] if isinstance(texts, str) else texts
+        ids = [[len(word) for word in text.split()] for text in texts]
+        width = max(len(row) for row in ids)
+        return {
+            "input_ids": torch.tensor([row + [0] * (width - len(row)) for row in ids]),
+            "attention_mask": torch.tensor([[1] * len(row) + [0] * (width - len(row)) for row in ids]),
+        }
+
+
+class FakeBertModel:
+    """Returns hidden states derived from the token ids and counts forward passes."""
+
+    @classmethod
+    def from_pretrained(cls, model_name):
+        return cls()
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, input_ids, attention_mask):
+        self.calls += 1
+        return MagicMock(last_hidden_state=input_ids.unsqueeze(-1).float().repeat(1, 1, 3))
+
+
+def test_memory_augmented_transformer_incremental_batching(monkeypatch):
+    monkeypatch.setattr("agent_memory.strategies.memory_augmented_transformer.BertTokenizer", FakeBertTokenizer)
+    monkeypatch.setattr("agent_memory.strategies.memory_augmented_transformer.BertModel", FakeBertModel)
+    memory = MemoryAugmentedTransformerMemory(incremental=True)
+
+    memory.add_messages([("user", "aa bbbb"), ("assistant", "c")])
+    assert memory.model.calls == 1 # Both messages are encoded in one forward pass
+    # "user: aa bbbb" pools to mean(5, 2, 4) and "assistant: c" to mean(10, 1), ignoring padding.
+    assert memory.memory_embedding.tolist()[0] == pytest.approx([(11 / 3 + 5.5) / 2] * 3)
+
+    memory.add_message(role="user", content="dddddddddddd")
+    assert memory.model.calls == 2
+    assert memory.memory_embedding.tolist()[0] == pytest.approx([(11 / 3 + 5.5 + 8.5) / 3] * 3)
+    assert memory.get_context() == "user: aa bbbb\nassistant: c\nuser: dddddddddddd"
+    memory.clear()
+    assert memory.memory_embedding is None
+
+
+def test_memory_augmented_transformer_loads_shared_model_on_first_use(monkeypatch):
+    loads = []
+
+    class CountingBertModel(FakeBertModel):
+        @classmethod
+        def from_pretrained(cls, model_name):
+            loads.append(model_name)
+            return cls()
+
+    monkeypatch.setattr("agent_memory.strategies.memory_augmented_transformer.BertTokenizer", FakeBertTokenizer)
+    monkeypatch.setattr("agent_memory.strategies.memory_augmented_transformer.BertModel", CountingBertModel)
+    first = MemoryAugmentedTransformerMemory()
+    second = MemoryAugmentedTransformerMemory()
+    assert loads == [] # Constructing a memory does not load the model
+
+    first.add_message(role="user", content="hello")
+    second.add_message(role="user", content="world")
+    assert loads == ["bert-base-uncased"]
+    assert first.model is second.model
+    assert (CountingBertModel, "bert-base-uncased") in shared_models
+
+
+@pytest.mark.parametrize("graph_backend", GRAPH_BACKENDS)
+def test_graph_based_memory_orders_messages_numerically(graph_backend):
+    memory = GraphBasedMemory(backend=graph_backend())
+    for i in range(12):
+        memory.add_message(role="user", content=f"Message {i}")
+    lines = memory.get_context().split("\n")
+    assert lines == [f"user: Message {i}" for i in range(12)]
+    assert memory.get_context(max_nodes=2) == "user: Message 10\nuser: Message 11"
+
+
+@pytest.mark.parametrize("graph_backend", GRAPH_BACKENDS)
+def test_graph_based_memory_retrieves_by_query(graph_backend):
+    memory = GraphBasedMemory(hops=0, backend=graph_backend())
+    memory.add_message(role="user", content="I am planning a trip to Paris.")
+    memory.add_message(role="assistant", content="Great, what dates are you considering?")
+    memory.add_message(role="user", content="Also, my cat needs feeding tomorrow.")
+    memory.add_message(role="assistant", content="Noted, I will remind you about the cat.")
+
+    assert memory.get_context(query="Where is my trip going?") == "user: I am planning a trip to Paris."
+    assert memory.get_context(query="cat feeding") == (
+        "user: Also, my cat needs feeding tomorrow.\nassistant: Noted, I will remind you about the cat."
+    )
+    # The best match is kept when the result is capped.
+    assert memory.get_context(query="cat feeding", max_nodes=1) == "user: Also, my cat needs feeding tomorrow."
+    # Nothing matches, so the most recent messages are returned.
+    assert memory.get_context(query="zebra", max_nodes=1) == "assistant: Noted, I will remind you about the cat."
+
+
+@pytest.mark.parametrize("graph_backend", GRAPH_BACKENDS)
+def test_graph_based_memory_expands_along_typed_edges(graph_backend):
+    memory = GraphBasedMemory(hops=1, backend=graph_backend())
+    memory.add_message(role="user", content="Tell me about Paris.")
+    memory.add_message(role="assistant", content="It is the capital of France.")
+    memory.add_message(role="user", content="Unrelated question about cooking pasta.")
+    memory.add_message(role="user", content="Is Paris expensive?")
+
+    # One hop along "follows" edges reaches the answer to the matching question.
+    context = memory.get_context(query="tell")
+    assert context == "user: Tell me about Paris.\nassistant: It is the capital of France."
+
+    # Two hops along "mentions" edges reach the other messages mentioning the same entity.
+    memory = GraphBasedMemory(hops=2, relations={"mentions"}, backend=graph_backend())
+    memory.add_message(role="user", content="Tell me about Paris.")
+    memory.add_message(role="assistant", content="It is the capital of France.")
+    memory.add_message(role="user", content="Is Paris expensive?")
+    assert memory.get_context(query="tell") == "user: Tell me about Paris.\nuser: Is Paris expensive?"
+
+    counter = ApproximateTokenCounter(chars_per_token=1)
+    memory.token_counter = counter
+    assert memory.get_context(query="tell", max_tokens=30) == "user: Tell me about Paris."
+
+
+def test_graph_backends_agree_on_neighbors():
+    import random
+    rng = random.Random(0)
+    backends = [NetworkXGraphBackend(), CompactGraphBackend(min_rebuild_edges=8)]
+    for i in range(60):
+        for backend in backends:
+            backend.add_node("message" if i % 3 else "entity", label=f"node_{i}")
+    edges = set()
+    while len(edges) < 150:
+        source, target = rng.randrange(60), rng.randrange(60)
+        if (source, target) in edges:
+            continue
+        edges.add((source, target))
+        relation = rng.choice(["follows", "mentions"])
+        for backend in backends:
+            backend.add_edge(source, target, relation)
+        node = rng.randrange(60)
+        for relations in (None, frozenset({"mentions"})):
+            expected = sorted(backends[0].neighbors(node, relations))
+            assert sorted(backends[1].neighbors(node, relations)) == expected
+
+    assert backends[1].number_of_edges() == 150
+    assert backends[1].find_node("node_3") == 3
+    assert backends[1].node_type(3) == "entity"
+
+
+def test_os_like_memory_faults_swapped_pages_back_in(tmp_path):
+    from agent_memory.storage import MemoryMappedLog
+    memory = OSLikeMemory(page_size=2, max_pages=2, swap=MemoryMappedLog(str(tmp_path)))
+    topics = ["Paris trip", "cat food", "tax return", "garden plants"]
+    for topic in topics:
+        memory.add_message(role="user", content=f"Let's talk about {topic}.")
+        memory.add_message(role="assistant", content=f"Sure, {topic} it is.")
+    assert "Paris" not in memory.get_context() # Pages 0 and 1 were swapped out
+    assert memory.stats()["swapped_pages"] == 2
+
+    context = memory.get_context(query="When is the Paris trip?")
+    assert "user: Let's talk about Paris trip." in context
+    assert context.index("Paris") < context.index("garden") # Resident pages stay in conversation order
+    assert "tax return" not in context # The least recently used page made room
+    assert memory.get_context(query="What about the garden?").count("garden") == 2 # A hit, nothing faults in
+    stats = memory.stats()
+    assert stats["page_faults"] == 1 and stats["hits"] == 1 and stats["hit_rate"] == 0.5
+    assert stats["evictions"] == 3 and stats["swap_outs"] == 3
+
+    # A page that was swapped out before is not written again.
+    memory.get_context(query="tax return")
+    assert memory.stats()["swap_outs"] == 3
+    memory.clear()
+    assert memory.get_context() == "" and memory.stats()["page_faults"] == 0
+    memory.swap.close()
+
+
+def test_os_like_memory_restores_swapped_pages():
+    from agent_memory.storage import InMemoryStorage
+    memory = OSLikeMemory(page_size=1, max_pages=1, storage=InMemoryStorage())
+    memory.add_message(role="user", content="The Paris trip is in May.")
+    memory.add_message(role="user", content="The cat needs food.")
+    memory.snapshot()
+
+    # The default swap does not outlive the memory, so the swapped-out page travels in the snapshot.
+    restored = OSLikeMemory(page_size=1, max_pages=1, storage=memory.storage)
+    restored.restore()
+    assert restored.get_context(query="When is the Paris trip?") == "user: The Paris trip is in May."
+    restored.swap.clear()
+    with pytest.raises(LookupError):
+        restored.get_context(query="cat food")
+
+
+@pytest.mark.parametrize("eviction, victim, next_victim", [("lru", 0, 1), ("lfu", 1, 2), ("clock", 0, 1)])
+def test_eviction_policies(eviction, victim, next_victim):
+    from agent_memory.strategies.paging import EVICTION_POLICIES
+    policy = EVICTION_POLICIES[eviction]()
+    for page in (0, 1, 2):
+        policy.insert(page)
+    for page in (0, 0, 0, 1, 2):
+        policy.access(page)
+    # LRU picks the least recently used page, LFU the least often used one (the least recent among ties),
+    # and the clock gives every referenced page a second chance, which brings its hand back to the oldest one.
+    assert policy.victim() == victim
+    assert policy.victim(protected={victim}) == next_victim
+    policy.remove(victim)
+    assert policy.victim() == next_victim
+
+
+def test_os_like_memory_matches_pages_by_embedding():
+    class TopicEmbeddings:
+        def embed_documents(self, texts):
+            return [self.embed_query(text) for text in texts]
+
+        def embed_query(self, text):
+            return [float("cat" in text.lower()), float("tax" in text.lower()), 0.1]
+
+    memory = OSLikeMemory(page_size=1, max_pages=1, eviction="clock", embeddings=TopicEmbeddings())
+    memory.add_message(role="user", content="My cat is hungry.")
+    memory.add_message(role="user", content="Taxes are due.")
+    assert memory.get_context(query="feline friend") == "user: Taxes are due." # Not similar to any page
+    assert memory.get_context(query="What does the CAT eat?") == "user: My cat is hungry."
+    assert memory.stats()["page_faults"] == 1
+
+
+def test_retrieval_memory_local_index():
+    from agent_memory.embeddings import HashingEmbeddings
+    from agent_memory.storage import InMemoryStorage
+
+    storage = InMemoryStorage()
+    memory = RetrievalMemory(incremental=True, embeddings=HashingEmbeddings(), vector_index="exact", storage=storage)
+    memory.add_message(role="user", content="My cat is named Whiskers.")
+    memory.add_message(role="user", content="The invoice is due on Friday.")
+    memory.add_message(role="user", content="Whiskers the cat likes tuna.")
+    assert memory.vector_store is None
+    assert len(memory.index) == len(memory.chunks) == 3
+
+    context = memory.get_context(query="What does Whiskers the cat eat?", k=2)
+    # The two chunks about the cat are retrieved, in conversation order.
+    assert context == "user: My cat is named Whiskers.\nuser: Whiskers the cat likes tuna."
+    assert memory.chunk_ranges == {"chunk_0": (0, 1), "chunk_1": (1, 2), "chunk_2": (2, 3)}
+
+    # The index is restored from the snapshot, without re-embedding anything.
+    memory.snapshot()
+    restored = RetrievalMemory(incremental=True, embeddings=HashingEmbeddings(), vector_index="exact", storage=storage)
+    assert restored.restore() == 0
+    assert restored.get_context(query="What does Whiskers the cat eat?", k=2) == context
+    restored.clear()
+    assert restored.get_context(query="cat") == "" and len(restored.index) == 0
+
+
+def test_retrieval_memory_hybrid_finds_exact_identifiers():
+    from agent_memory.embeddings import HashingEmbeddings
+
+    class ConstantEmbeddings:
+        # Embeddings that cannot tell any texts apart, so that only BM25 can rank the chunks.
+        def embed_documents(self, texts):
+            return [[1.0, 0.0]] * len(texts)
+
+        def embed_query(self, text):
+            return [1.0, 0.0]
+
+    for embeddings in (ConstantEmbeddings(), HashingEmbeddings()):
+        memory = RetrievalMemory(incremental=True, embeddings=embeddings, vector_index="exact", hybrid=True)
+        for i in range(20):
+            memory.add_message(role="user", content=f"Small talk number {i} about the weather.")
+        memory.add_message(role="user", content="Please track parcel ZX-90210 for me.")
+        assert memory.get_context(query="Any news on ZX-90210?", k=1) == "user: Please track parcel ZX-90210 for me."
+    assert len(memory.bm25) == 21
+    memory.clear()
+    assert len(memory.bm25) == 0 and memory.get_context(query="ZX-90210") == ""
+
+
+class SlowMemory(SequentialMemory):
+    """A strategy whose context takes `delay` seconds to build."""
+
+    def __init__(self, delay=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+
+    def get_context(self, max_tokens=None):
+        import time
+        time.sleep(self.delay)
+        return "slow: " + super().get_context(max_tokens=max_tokens)
+
+    async def aget_context(self, max_tokens=None):
+        await asyncio.sleep(self.delay)
+        return "slow: " + super().get_context(max_tokens=max_tokens)
+
+
+def test_composite_memory_merges_deduplicates_and_skips_slow_children():
+    from functools import partial
+    from agent_memory.strategies.composite import CompositeMemory
+
+    memory = CompositeMemory(
+        {"recent": partial(SlidingWindowMemory, window_size=1), "all": SequentialMemory, "slow": SlowMemory(delay=0.5)},
+        timeout={"slow": 0.1},
+        token_counter=ApproximateTokenCounter(chars_per_token=1),
+    )
+    memory.add_message(role="user", content="Hello")
+    memory.add_message(role="assistant", content="Hi there")
+    assert [len(child.get_context()) > 0 for child in memory.children.values()] == [True, True, True]
+
+    # The slow child is skipped, and the line both other children return is only kept once.
+    assert memory.get_context() == "assistant: Hi there\nuser: Hello"
+    # The budget is split between the children: 19 tokens each, which only fits the last message.
+    assert memory.get_context(max_tokens=60) == "assistant: Hi there"
+
+    memory.children["slow"].delay = 0
+    memory.flush()
+    assert memory.get_context().split("\n")[-1] == "slow: user: Hello"
+
+    async def run():
+        memory.children["slow"].delay = 0.5
+        await memory.aadd_message(role="user", content="Bye")
+        return await memory.aget_context()
+
+    assert asyncio.run(run()) == "user: Bye\nuser: Hello\nassistant: Hi there"
+    memory.children["slow"].delay = 0
+    memory.clear()
+    assert memory.get_context() == "slow: "
+    memory.close()
+
+    # A line repeated within one child is kept, and only dropped from the children after it.
+    memory = CompositeMemory([SequentialMemory, partial(SlidingWindowMemory, window_size=1)])
+    for content in ("Yes", "No", "Yes"):
+        memory.add_message(role="user", content=content)
+    assert memory.get_context() == "user: Yes\nuser: No\nuser: Yes"
+    memory.close()
+
+
+def test_concurrent_async_summaries_keep_every_message():
+    from langchain_core.messages import AIMessage
+
+    class EchoLLM(BaseLLM):
+        """Summarizes a conversation as the contents of its messages, after yielding to the event loop."""
+
+        def invoke(self, prompt):
+            return AIMessage(content=",".join(line.split(": ", 1)[1] for line in prompt.split("\n\n", 1)[1].split("\n")))
+
+        async def ainvoke(self, prompt):
+            await asyncio.sleep(0.01)
+            return self.invoke(prompt)
+
+    hierarchical = HierarchicalMemory(llm=EchoLLM(), short_term_threshold=2)
+    compression = CompressionConsolidationMemory(llm=EchoLLM(), compression_threshold=3)
+
+    async def run(memory):
+        await asyncio.gather(*(memory.aadd_message(role="user", content=f"m{i}") for i in range(6)))
+
+    asyncio.run(run(hierarchical))
+    # Every message was summarized once, in order, or is still in the short-term memory.
+    assert hierarchical.long_term_memory == "m0,m1\nm2,m3"
+    assert hierarchical.short_term_memory == [Message("user", "m4"), Message("user", "m5")]
+    asyncio.run(run(compression))
+    assert compression.compressed_memory == ["m0,m1,m2", "m3,m4,m5"]
+    assert compression.history == [] and compression._pending == []
+
+
+def test_compression_consolidation_merges_near_duplicate_entries():
+    from langchain_core.messages import AIMessage
+
+    class NotesLLM(BaseLLM):
+        """Summarizes a conversation as its last message, and merges notes into their distinct sentences."""
+
+        def __init__(self):
+            self.prompts = []
+
+        def invoke(self, prompt):
+            self.prompts.append(prompt)
+            if prompt.startswith("Merge"):
+                notes = [line for line in prompt.split("\n")[1:] if line and not line.startswith("Note")]
+                return AIMessage(content=" ".join(dict.fromkeys(notes)))
+            return AIMessage(content=prompt.split("\n")[-1].split(": ", 1)[1])
+
+    llm = NotesLLM()
+    memory = CompressionConsolidationMemory(llm=llm, compression_threshold=1, consolidation_threshold=0.5, token_counter=ApproximateTokenCounter(chars_per_token=1))
+    memory.add_message(role="user", content="Alice ordered a red bicycle for delivery to Berlin.")
+    memory.add_message(role="user", content="The quarterly budget review is on Monday.")
+    memory.add_message(role="user", content="Alice ordered a red bicycle for delivery to Berlin!")
+    # The repeated entry was merged into the first one with one extra LLM call.
+    assert len(llm.prompts) == 4
+    assert memory.compressed_memory == ["The quarterly budget review is on Monday.", "Alice ordered a red bicycle for delivery to Berlin. Alice ordered a red bicycle for delivery to Berlin!"]
+
+    # With a cap, the oldest entries are merged until the compressed memory fits.
+    capped = CompressionConsolidationMemory(llm=NotesLLM(), compression_threshold=1, max_compressed_tokens=60, token_counter=ApproximateTokenCounter(chars_per_token=1))
+    for i in range(10):
+        capped.add_message(role="user", content=f"Fact number {i}.")
+        assert sum(map(capped.count_tokens, capped.compressed_memory)) + len(capped.compressed_memory) - 1 <= 60
+    assert capped.compressed_memory[-1] == "Fact number 9."
+    assert len(capped.compressed_memory) < 10
+
+    # get_context fits the entries with their cached token counts instead of counting them again.
+    with patch.object(memory, "count_tokens", wraps=memory.count_tokens) as count_tokens:
+        assert memory.get_context(max_tokens=1000).startswith("Compressed Past:\nThe quarterly budget review")
+    assert not any(call.args[0] in memory.compressed_memory for call in count_tokens.call_args_list)
+
+    class GrowingCounter(ApproximateTokenCounter):
+        """Truncates to text that counts more tokens than asked for, as a cut inside a character can."""
+
+        def truncate(self, text, max_tokens, from_end=False):
+            return text[:max_tokens + 2]
+
+    # An entry that does not shrink when truncated is dropped instead of truncated again forever.
+    growing = CompressionConsolidationMemory(llm=NotesLLM(), compression_threshold=1, max_compressed_tokens=30, token_counter=GrowingCounter(chars_per_token=1))
+    growing.add_message(role="user", content="A single fact that is much longer than the cap.")
+    assert growing.compressed_memory == []
+
+    memory.clear()
+    assert memory.compressed_memory == [] and memory._signatures == []
+
+
+def test_hierarchical_memory_tree_keeps_long_term_memory_logarithmic():
+    from langchain_core.messages import AIMessage
+
+    class TreeLLM(BaseLLM):
+        """Summarizes a message as its content, and rolls summaries up as their ranges, e.g. "0-3"."""
+
+        def __init__(self):
+            self.calls = 0
+
+        def invoke(self, prompt):
+            self.calls += 1
+            lines = prompt.split("\n")
+            if prompt.startswith("Combine"):
+                parts = [line for line in lines[1:] if line and not line.startswith("Part")]
+                return AIMessage(content=f"{parts[0].split('-')[0]}-{parts[-1].split('-')[-1]}")
+            return AIMessage(content=lines[-1].split(": ", 1)[1])
+
+    llm = TreeLLM()
+    memory = HierarchicalMemory(llm=llm, short_term_threshold=1, fan_out=2)
+    for i in range(17):
+        memory.add_message(role="user", content=str(i))
+    # 16 summarized messages: 16 leaves rolled up pairwise into a single root, with 15 rollups.
+    assert memory.levels == [[], [], [], [], ["0-15"]]
+    assert llm.calls == 16 + 15
+    memory.add_message(role="user", content="17")
+    memory.add_message(role="user", content="18")
+    assert memory.levels == [[], ["16-17"], [], [], ["0-15"]]
+    assert memory.long_term_memory == "0-15\n16-17"
+    assert "Current conversation:\nuser: 18" in memory.get_context()
+    # With a budget, the root survives and the lower levels are dropped first.
+    counter = ApproximateTokenCounter(chars_per_token=1)
+    memory.token_counter = counter
+    header = counter.count("Summary of past conversation:\n\n\nCurrent conversation:\nuser: 18")
+    assert memory.get_context(max_tokens=header + 4) == "Summary of past conversation:\n0-15\n\nCurrent conversation:\nuser: 18"
+    assert memory.get_context(max_tokens=header + 10).startswith("Summary of past conversation:\n0-15\n16-17\n")
+
+    # With several summaries at the highest level, the newest of them is kept first, and truncated if it alone does not fit.
+    wide = HierarchicalMemory(llm=TreeLLM(), short_term_threshold=1, fan_out=3, token_counter=counter)
+    for i in range(7):
+        wide.add_message(role="user", content=str(i))
+    assert wide.levels == [[], ["0-2", "3-5"]]
+    header = counter.count("Summary of past conversation:\n\n\nCurrent conversation:\nuser: 6")
+    assert wide.get_context(max_tokens=header + 3) == "Summary of past conversation:\n3-5\n\nCurrent conversation:\nuser: 6"
+    assert wide.get_context(max_tokens=header + 7) == "Summary of past conversation:\n0-2\n3-5\n\nCurrent conversation:\nuser: 6"
+    assert wide.get_context(max_tokens=header + 1) == "Summary of past conversation:\n3\n\nCurrent conversation:\nuser: 6"
+
+    restored = HierarchicalMemory(llm=llm, fan_out=2)
+    restored.set_state(memory.get_state())
+    assert restored.levels == memory.levels and restored.long_term_memory == memory.long_term_memory
+    memory.clear()
+    assert memory.levels == [] and memory.long_term_memory == ""